@@ -0,0 +1,92 @@
+# Copyright (C) 2008 Mark Seaborn
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as
+# published by the Free Software Foundation; either version 2.1 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA
+# 02110-1301, USA.
+
+# Measures how fast the verifier runs over a body of code.
+# Usage: python checkbench.py [-n repeats] [file-or-directory...]
+# With no arguments it uses the modules in the stdlib directory here.
+
+import os
+import sys
+import time
+
+import pypybits.transformer as transformer
+
+import cappython.pycheck as pycheck
+import cappython.varbindings as varbindings
+
+
+def find_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for dir_path, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    if file_name.endswith(".py"):
+                        yield os.path.join(dir_path, file_name)
+        else:
+            yield path
+
+
+def count_nodes(tree):
+    count = 0
+    stack = [tree]
+    while len(stack) > 0:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.getChildNodes())
+    return count
+
+
+def main(args, stdout):
+    repeats = 3
+    if len(args) >= 2 and args[0] == "-n":
+        repeats = int(args[1])
+        args = args[2:]
+    if len(args) == 0:
+        args = [os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "stdlib")]
+    sources = [(filename, open(filename).read())
+               for filename in find_files(args)]
+    times = {"parse": 0.0, "annotate": 0.0, "check": 0.0}
+    nodes = 0
+    errors = 0
+    for i in range(repeats):
+        for filename, source in sources:
+            t0 = time.time()
+            tree = transformer.parse(source)
+            t1 = time.time()
+            global_vars, bindings = varbindings.annotate(tree)
+            t2 = time.time()
+            log = pycheck.check(tree, bindings)
+            t3 = time.time()
+            times["parse"] += t1 - t0
+            times["annotate"] += t2 - t1
+            times["check"] += t3 - t2
+            nodes += count_nodes(tree)
+            errors += len(log)
+    stdout.write("%i files, %i nodes, %i errors found, %i repeats\n"
+                 % (len(sources), nodes / repeats, errors / repeats, repeats))
+    for stage in ("parse", "annotate", "check"):
+        stdout.write("%-10s %8.3fs %12.0f nodes/s\n"
+                     % (stage, times[stage], nodes / max(times[stage], 1e-9)))
+    total = times["annotate"] + times["check"]
+    stdout.write("%-10s %8.3fs %12.0f nodes/s\n"
+                 % ("verify", total, nodes / max(total, 1e-9)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:], sys.stdout)
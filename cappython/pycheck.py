@@ -24,28 +24,6 @@ import sys
 import cappython.varbindings as varbindings
 
 
-def find_all(node, node_type):
-    got = []
-
-    def recurse(node):
-        if isinstance(node, node_type):
-            got.append(node)
-        for subnode in node.getChildNodes():
-            recurse(subnode)
-
-    recurse(node)
-    return got
-
-
-def find_attribute_assignments(tree):
-    for node in find_all(tree, ast.AssAttr):
-        yield node, node.expr, node.attrname
-    for node in find_all(tree, ast.AugAssign):
-        # In this lvalue context, Getattr is really Getattr + Setattr.
-        if isinstance(node.node, ast.Getattr):
-            yield node, node.node.expr, node.node.attrname
-
-
 def is_private_attr(name):
     return (name.startswith("_") or
             name.startswith("func_") or
@@ -74,30 +52,41 @@ def is_special_attr(name):
     return name.startswith("__") and name.endswith("__")
 
 
-def check_safesuper(tree, bindings, log):
-    acceptable_uses = set()
-    for call in find_all(tree, ast.CallFunc):
-        if isinstance(call.node, ast.Name):
-            binding = varbindings.get_only(call.node.bindings)
-            if (binding.is_global and
-                binding.name == "safesuper" and
-                len(call.args) >= 1 and
-                varbindings.map_node(call.args[0]).is_self_var()):
-                acceptable_uses.add(call.node)
-    for node in find_all(tree, ast.Name):
-        binding = varbindings.get_only(node.bindings)
-        if binding.name == "safesuper":
-            if binding.is_global:
-                if node not in acceptable_uses:
-                    log.append(("Super", node))
-            else:
-                # Shadowing is not allowed.
-                log.append(("SuperShadowed", node))
-
-
-def check(tree, bindings):
-    log = []
-    for class_node in find_all(tree, ast.Class):
+# The checks are made by rules, which are all run during a single walk
+# over the tree.  A rule's visit() method is called, in pre-order, for
+# each node that is an instance of one of its node_types, and its
+# finish() method is called after the walk.  A new instance of each
+# rule is made for each check, so rules may keep state.  Rules report
+# errors by appending (error, node) pairs to the log they are given.
+class Rule(object):
+
+    node_types = ()
+
+    def __init__(self, bindings):
+        self._bindings = bindings
+
+    def visit(self, node, log):
+        pass
+
+    def finish(self, log):
+        pass
+
+
+rules = []
+
+def register_rule(rule_class):
+    rules.append(rule_class)
+    return rule_class
+
+
+# This must come first: it marks the "self" variables of methods,
+# which later rules look at.  A class is visited before any of the
+# code in its methods.
+class FindSelfVars(Rule):
+
+    node_types = (ast.Class,)
+
+    def visit(self, class_node, log):
         for defn in class_node.code.nodes:
             if isinstance(defn, ast.Function):
                 method_binding = varbindings.get_only(defn.bindings)
@@ -108,31 +97,157 @@ def check(tree, bindings):
                     binding = defn.code.environ.lookup(defn.argnames[0])
                     if not binding.is_assigned:
                         binding.is_self_var = True
-    for node, expr_node, attr_name in find_attribute_assignments(tree):
-        if not varbindings.map_node(expr_node).is_self_var():
-            log.append(("SetAttr", node))
-        elif is_special_attr(attr_name):
-            log.append(("SpecialAttr", node))
-    for node in find_all(tree, ast.Getattr):
+
+register_rule(FindSelfVars)
+
+
+def check_attribute_assignment(node, expr_node, attr_name, log):
+    if not varbindings.map_node(expr_node).is_self_var():
+        log.append(("SetAttr", node))
+    elif is_special_attr(attr_name):
+        log.append(("SpecialAttr", node))
+
+
+class CheckSetAttr(Rule):
+
+    node_types = (ast.AssAttr,)
+
+    def visit(self, node, log):
+        check_attribute_assignment(node, node.expr, node.attrname, log)
+
+register_rule(CheckSetAttr)
+
+
+class CheckAugmentedSetAttr(Rule):
+
+    node_types = (ast.AugAssign,)
+
+    def visit(self, node, log):
+        # In this lvalue context, Getattr is really Getattr + Setattr.
+        if isinstance(node.node, ast.Getattr):
+            check_attribute_assignment(node, node.node.expr,
+                                       node.node.attrname, log)
+
+register_rule(CheckAugmentedSetAttr)
+
+
+class CheckGetAttr(Rule):
+
+    node_types = (ast.Getattr,)
+
+    def visit(self, node, log):
         if (not varbindings.map_node(node.expr).is_self_var() and
             is_private_attr(node.attrname)):
             log.append(("GetAttr", node))
         elif is_special_attr(node.attrname):
             log.append(("SpecialAttr", node))
-    for node in find_all(tree, (ast.Print, ast.Printnl)):
+
+register_rule(CheckGetAttr)
+
+
+class CheckPrint(Rule):
+
+    node_types = (ast.Print, ast.Printnl)
+
+    def visit(self, node, log):
         log.append(("Print", node))
-    for node in find_all(tree, ast.Exec):
+
+register_rule(CheckPrint)
+
+
+class CheckExec(Rule):
+
+    node_types = (ast.Exec,)
+
+    def visit(self, node, log):
         log.append(("Exec", node))
-    for node in find_all(tree, ast.From):
+
+register_rule(CheckExec)
+
+
+class CheckBlanketImport(Rule):
+
+    node_types = (ast.From,)
+
+    def visit(self, node, log):
         for attr_name, as_name in node.names:
             if attr_name == "*":
                 log.append(("BlanketImport", node))
-    for binding in bindings:
-        if is_special_var(binding.name):
-            assert len(binding.references) > 0
-            for var_ref in binding.references:
-                log.append(("SpecialVar", var_ref.node))
-    check_safesuper(tree, bindings, log)
+
+register_rule(CheckBlanketImport)
+
+
+class CheckSpecialVars(Rule):
+
+    def finish(self, log):
+        for binding in self._bindings:
+            if is_special_var(binding.name):
+                assert len(binding.references) > 0
+                for var_ref in binding.references:
+                    log.append(("SpecialVar", var_ref.node))
+
+register_rule(CheckSpecialVars)
+
+
+# safesuper may only be called, with the method's self variable as
+# its first argument.  A call is visited before the name it calls.
+class CheckSafeSuper(Rule):
+
+    node_types = (ast.CallFunc, ast.Name)
+
+    def __init__(self, bindings):
+        Rule.__init__(self, bindings)
+        self._acceptable_uses = set()
+
+    def visit(self, node, log):
+        if isinstance(node, ast.CallFunc):
+            if isinstance(node.node, ast.Name):
+                binding = varbindings.get_only(node.node.bindings)
+                if (binding.is_global and
+                    binding.name == "safesuper" and
+                    len(node.args) >= 1 and
+                    varbindings.map_node(node.args[0]).is_self_var()):
+                    self._acceptable_uses.add(node.node)
+        else:
+            binding = varbindings.get_only(node.bindings)
+            if binding.name == "safesuper":
+                if binding.is_global:
+                    if node not in self._acceptable_uses:
+                        log.append(("Super", node))
+                else:
+                    # Shadowing is not allowed.
+                    log.append(("SuperShadowed", node))
+
+register_rule(CheckSafeSuper)
+
+
+def check(tree, bindings, rule_classes=None):
+    if rule_classes is None:
+        rule_classes = rules
+    # Each rule has its own log, so that the combined log lists errors
+    # rule by rule, in the order the rules were registered.
+    active_rules = [(rule_class(bindings), []) for rule_class in rule_classes]
+    handlers_by_type = {}
+    stack = [tree]
+    while len(stack) > 0:
+        node = stack.pop()
+        node_class = node.__class__
+        try:
+            handlers = handlers_by_type[node_class]
+        except KeyError:
+            handlers = [(rule.visit, rule_log)
+                        for rule, rule_log in active_rules
+                        if issubclass(node_class, rule.node_types)]
+            handlers_by_type[node_class] = handlers
+        for visit, rule_log in handlers:
+            visit(node, rule_log)
+        children = list(node.getChildNodes())
+        children.reverse()
+        stack.extend(children)
+    log = []
+    for rule, rule_log in active_rules:
+        rule.finish(rule_log)
+        log.extend(rule_log)
     return log
 
 
@@ -21,6 +21,7 @@ import os
 import unittest
 
 from varbindings_test import parse_statement, assert_sets_equal
+import pypybits.transformer as transformer
 import tempdir_test
 import varbindings
 import pycheck
@@ -437,6 +438,22 @@ safesuper = 1
 raise Exception(object()) # FAIL: Raise
 """)
 
+    def test_extra_rules(self):
+        class CheckRaise(pycheck.Rule):
+            node_types = (pycheck.ast.Raise,)
+            def visit(self, node, log):
+                log.append(("Raise", node))
+        code = """
+raise Exception # FAIL: Raise
+print "x" # FAIL: Print
+"""
+        tree = transformer.parse(code)
+        global_vars, all_bindings = varbindings.annotate(tree)
+        logged = pycheck.check(tree, all_bindings,
+                               pycheck.rules + [CheckRaise])
+        assert_sets_equal([(error, node.lineno) for error, node in logged],
+                          list(find_expected_errors(code)))
+
     def test_private_attributes_of_functions(self):
         def example_function():
             pass
@@ -17,8 +17,18 @@
 # 02110-1301, USA.
 
 import __builtin__
+import dis
+import hashlib
+import imp
+import marshal
 import os
+import pypybits.ast as ast
+import pypybits.misc as compilermisc
+import pypybits.pycodegen as pycodegen
+import pypybits.syntax as syntax
 import pypybits.transformer as compiler
+import sys
+import tempfile
 import types
 
 import cappython.pycheck as pycheck
@@ -38,8 +48,13 @@ class VerifyError(Exception):
 
     def __str__(self):
         # Could use something like linecache here, except it uses filenames.
-        lines = self._source_code.split("\n")
+        if self._source_code is None:
+            lines = []
+        else:
+            lines = self._source_code.split("\n")
         def get_line(lineno):
+            if lineno > len(lines):
+                return "<source not available>"
             return lines[lineno - 1]
         return "".join("\n" + message for message in
                        pycheck.format_log(self._log, self._tree, get_line,
@@ -72,6 +87,12 @@ class Environment(object):
         self.bind("__import__", import_wrapper)
 
 
+# pycodegen produces CPython 2.5 bytecode.  Jython cannot run that at
+# all, and CPython 2.7 replaced the conditional jump opcodes it uses.
+can_compile_trees = (not sys.platform.startswith("java") and
+                     "JUMP_IF_FALSE" in dis.opmap)
+
+
 class Evaluator(object):
 
     # This allows two unsafe modes:
@@ -84,11 +105,56 @@ class Evaluator(object):
         self._use_filename = use_filename
         self._warn_only = warn_only
 
-    def exec_code(self, source_code, builtins, filename=None):
+    # Identifies what compile_code() produces, for use in cache keys.
+    def get_cache_tag(self):
+        return "%s:%i:%i" % (CHECKER_VERSION, self._use_filename,
+                             self._warn_only)
+
+    def _get_code_filename(self, filename):
         if not self._use_filename or filename is None:
-            code_filename = "<string>"
+            return "<string>"
         else:
-            code_filename = filename
+            return filename
+
+    def _verify(self, tree, builtins, source_code, filename):
+        global_vars, bindings = varbindings.annotate(tree)
+        log = pycheck.check(tree, bindings)
+        if len(log) > 0:
+            if self._warn_only:
+                print VerifyError(log, tree, source_code, filename)
+            else:
+                raise VerifyError(log, tree, source_code, filename)
+        for var_name, binding in sorted(global_vars.iteritems()):
+            if not binding.is_assigned:
+                assert binding.is_read
+                if var_name not in builtins._module.__dict__:
+                    print self._get_code_filename(filename), \
+                        "unbound:", var_name
+
+    def compile_code(self, source_code, builtins, filename=None):
+        assert type(source_code) is str
+        assert type(builtins) is Environment
+        tree = compiler.parse(source_code)
+        self._verify(tree, builtins, source_code, filename)
+        return compile(source_code, self._get_code_filename(filename), "exec")
+
+    # Verifies and compiles a tree that the caller has already parsed,
+    # without going back through source code.  The code object is
+    # generated from the same tree that was checked.  The tree must not
+    # have been annotated before, and is annotated in place.
+    # source_code is only used for error messages.
+    def compile_tree(self, tree, builtins, filename=None, source_code=None):
+        assert can_compile_trees
+        assert isinstance(tree, ast.Module), tree
+        assert type(builtins) is Environment
+        self._verify(tree, builtins, source_code, filename)
+        compilermisc.set_filename(self._get_code_filename(filename), tree)
+        syntax.check(tree)
+        return pycodegen.ModuleCodeGenerator(tree).getCode()
+
+    # The code object must have come from compile_code(): nothing is
+    # checked here.
+    def run_code(self, code, builtins):
         # The Reference Manual for Python 2.5 says:
         # "As a side effect, an implementation may insert additional keys
         # into the dictionaries given besides those corresponding to
@@ -100,30 +166,29 @@ class Evaluator(object):
         # dictionary, because it might leave the __builtins__ slot empty
         # and Python would fill it out with the default, giving the caller
         # access to all the real builtins.
-        assert type(source_code) is str
+        assert type(code) is types.CodeType
         assert type(builtins) is Environment
         module = types.ModuleType("__safe_eval_module__")
 #         module.__dict__["__builtins__"] = builtins._module
         module.__dict__.update(builtins._bound)
-        tree = compiler.parse(source_code)
-        global_vars, bindings = varbindings.annotate(tree)
-        log = pycheck.check(tree, bindings)
-        if len(log) > 0:
-            if self._warn_only:
-                print VerifyError(log, tree, source_code, filename)
-            else:
-                raise VerifyError(log, tree, source_code, filename)
-        for var_name, binding in sorted(global_vars.iteritems()):
-            if not binding.is_assigned:
-                assert binding.is_read
-                if var_name not in builtins._module.__dict__:
-                    print code_filename, "unbound:", var_name
-        code = compile(source_code, code_filename, "exec")
         exec code in module.__dict__
         return module
 
+    def exec_code(self, source_code, builtins, filename=None):
+        code = self.compile_code(source_code, builtins, filename)
+        return self.run_code(code, builtins)
+
+    def exec_tree(self, tree, builtins, filename=None, source_code=None):
+        code = self.compile_tree(tree, builtins, filename, source_code)
+        return self.run_code(code, builtins)
+
 
-safe_eval = Evaluator(use_filename=False, warn_only=False).exec_code
+_safe_evaluator = Evaluator(use_filename=False, warn_only=False)
+safe_eval = _safe_evaluator.exec_code
+safe_compile = _safe_evaluator.compile_code
+safe_compile_tree = _safe_evaluator.compile_tree
+safe_exec_tree = _safe_evaluator.exec_tree
+safe_run = _safe_evaluator.run_code
 
 
 def read_file(filename):
@@ -134,6 +199,27 @@ def read_file(filename):
         fh.close()
 
 
+def _source_filename(filename):
+    if filename.endswith("$py.class"):
+        return filename[:-len("$py.class")] + ".py"
+    if filename.endswith(".pyc") or filename.endswith(".pyo"):
+        return filename[:-1]
+    return filename
+
+
+# Identifies the verifier and compiler.  Anything that caches the
+# results of verification must include this in its key, so that
+# changes to the checks invalidate the cached results.
+def _get_checker_version():
+    digest = hashlib.sha1()
+    for filename in (__file__, pycheck.__file__, varbindings.__file__,
+                     compiler.__file__, pycodegen.__file__):
+        digest.update(read_file(_source_filename(filename)))
+    return digest.hexdigest()
+
+CHECKER_VERSION = _get_checker_version()
+
+
 def safe_hasattr(obj, attrname):
     assert type(attrname) is str
     return not pycheck.is_private_attr(attrname) and hasattr(obj, attrname)
@@ -182,12 +268,112 @@ def safe_environment():
     return env
 
 
+# Keeps verified code objects for source files in a directory, in
+# the manner of .pyc files, so that loading an unchanged module is a
+# marshal load rather than a parse, check and compile.  Entries are
+# found by a key, which ModuleLoader makes from the file's path
+# relative to its search directory, so that a cache filled by the
+# build is still found once the files are deployed elsewhere.  An
+# entry is only used if it was made by the same version of Python from
+# a file with the same modification time and size, by an evaluator
+# with the same cache tag.  If only the modification time differs, as
+# it does after copying or deploying the files, the contents are
+# compared instead.  Failure to write an entry (e.g. on a read-only
+# filesystem, or under Jython, which cannot marshal code) is ignored.
+class ModuleCache(object):
+
+    def __init__(self, cache_dir):
+        self._cache_dir = cache_dir
+        self._magic = imp.get_magic()
+
+    def _get_cache_filename(self, key):
+        digest = hashlib.sha1(key).hexdigest()
+        return os.path.join(self._cache_dir, digest + ".cpy")
+
+    def _read_entry(self, cache_filename, tag):
+        try:
+            fh = open(cache_filename, "rb")
+            try:
+                entry = marshal.load(fh)
+            finally:
+                fh.close()
+        except (IOError, EOFError, ValueError, TypeError):
+            return None
+        if (type(entry) is not tuple or len(entry) != 6 or
+            entry[:2] != (self._magic, tag)):
+            return None
+        return entry
+
+    def _write_entry(self, cache_filename, entry):
+        try:
+            data = marshal.dumps(entry)
+            fd, temp_filename = tempfile.mkstemp(dir=self._cache_dir,
+                                                 suffix=".tmp")
+        except (IOError, OSError, ValueError):
+            return
+        try:
+            fh = os.fdopen(fd, "wb")
+            try:
+                fh.write(data)
+            finally:
+                fh.close()
+            os.rename(temp_filename, cache_filename)
+        except (IOError, OSError):
+            try:
+                os.unlink(temp_filename)
+            except OSError:
+                pass
+
+    # key defaults to the file's absolute path.
+    def get_or_compile(self, filename, tag, compile_source, key=None):
+        if key is None:
+            key = os.path.abspath(filename)
+        stat = os.stat(filename)
+        cache_filename = self._get_cache_filename(key)
+        entry = self._read_entry(cache_filename, tag)
+        if entry is not None:
+            magic, tag, mtime, size, digest, code = entry
+            if (mtime, size) == (stat.st_mtime, stat.st_size):
+                return code
+        source = read_file(filename)
+        source_digest = hashlib.sha1(source).hexdigest()
+        if entry is None or digest != source_digest:
+            code = compile_source(source)
+        self._write_entry(cache_filename, (self._magic, tag, stat.st_mtime,
+                                           stat.st_size, source_digest, code))
+        return code
+
+
+# The tamed standard library modules that come with CapPython, and a
+# module cache for them that the build fills (see run.py).
+STDLIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "stdlib")
+STDLIB_CACHE_DIR = STDLIB_DIR + "-cache"
+
+
 class ModuleLoader(object):
 
-    def __init__(self, search_path, eval_func=safe_eval):
+    # Modules are run either with eval_func(source, env, filename),
+    # or, by default, with an Evaluator.  Only the latter can use a
+    # ModuleCache, since it compiles separately from running.
+    def __init__(self, search_path, eval_func=None, evaluator=None,
+                 cache_dir=None):
+        assert eval_func is None or (evaluator is None and
+                                     cache_dir is None)
+        if eval_func is None and evaluator is None:
+            evaluator = _safe_evaluator
         self._modules = {}
         self._paths = search_path
         self._eval_func = eval_func
+        self._evaluator = evaluator
+        if cache_dir is None:
+            self._module_cache = None
+        else:
+            self._module_cache = ModuleCache(cache_dir)
+        # Directory listings, made on first use, instead of probing
+        # for each possible filename.  Files added to a directory
+        # after it has been looked in are not found.
+        self._listings = {}
         self._env = safe_environment()
         self._env.set_importer(self._import_module)
 
@@ -196,6 +382,34 @@ class ModuleLoader(object):
         assert "." not in name
         self._modules[name] = (module, module)
 
+    def _list_dir(self, dir_path):
+        try:
+            return self._listings[dir_path]
+        except KeyError:
+            try:
+                names = frozenset(os.listdir(dir_path))
+            except OSError:
+                names = frozenset()
+            self._listings[dir_path] = names
+            return names
+
+    # Returns the filename and its module cache key, which is its path
+    # relative to the search directory, or (None, None).
+    def _find_file(self, path):
+        # Python's normal importer is stricter than this.
+        for search_dir in self._paths:
+            dir_path = os.path.join(search_dir, *path[:-1])
+            names = self._list_dir(dir_path)
+            if path[-1] + ".py" in names:
+                rel_path = path[:-1] + [path[-1] + ".py"]
+            elif (path[-1] in names and "__init__.py" in
+                  self._list_dir(os.path.join(dir_path, path[-1]))):
+                rel_path = path + ["__init__.py"]
+            else:
+                continue
+            return (os.path.join(search_dir, *rel_path), "/".join(rel_path))
+        return None, None
+
     def _import_path(self, path):
         assert len(path) > 0
         name = ".".join(path)
@@ -208,23 +422,16 @@ class ModuleLoader(object):
             parent_module = None
             top_module = None
 
-        # Python's normal importer is stricter than this.
-        filenames = (
-            filename
-            for search_dir in self._paths
-            for filename in (
-                os.path.join(search_dir, "/".join(path) + ".py"),
-                os.path.join(search_dir, "/".join(path), "__init__.py")))
-        for filename in filenames:
-            if os.path.exists(filename):
-                module = self.load_file(filename)
-                if parent_module is not None:
-                    setattr(parent_module, path[-1], module)
-                else:
-                    top_module = module
-                self._modules[name] = (module, top_module)
-                return module, top_module
-        raise ImportError("No module named %s" % name)
+        filename, key = self._find_file(path)
+        if filename is None:
+            raise ImportError("No module named %s" % name)
+        module = self._load_file(filename, key)
+        if parent_module is not None:
+            setattr(parent_module, path[-1], module)
+        else:
+            top_module = module
+        self._modules[name] = (module, top_module)
+        return module, top_module
 
     def _import_module(self, name, fromlist=None):
         assert type(name) is str
@@ -241,7 +448,43 @@ class ModuleLoader(object):
             return module
 
     def load_file(self, filename):
-        return self.eval(read_file(filename), filename)
+        return self._load_file(filename, None)
+
+    def _compile_file(self, filename, key):
+        def compile_source(source):
+            return self._evaluator.compile_code(source, self._env, filename)
+        return self._module_cache.get_or_compile(
+            filename, self._evaluator.get_cache_tag(), compile_source, key)
+
+    def _load_file(self, filename, key):
+        if self._module_cache is None:
+            return self.eval(read_file(filename), filename)
+        return self._evaluator.run_code(self._compile_file(filename, key),
+                                        self._env)
+
+    # Compiles every module under the search directories into the
+    # module cache without running them, as a build step does.
+    # Returns the filenames of the modules that could not be compiled.
+    def fill_cache(self):
+        assert self._module_cache is not None
+        failed = []
+        for search_dir in self._paths:
+            prefix = os.path.join(search_dir, "")
+            for dir_path, dir_names, file_names in os.walk(search_dir):
+                dir_names.sort()
+                rel_dir = os.path.join(dir_path, "")[len(prefix):]
+                for name in sorted(file_names):
+                    if not name.endswith(".py"):
+                        continue
+                    filename = os.path.join(dir_path, name)
+                    key = "/".join(rel_dir.split(os.sep)[:-1] + [name])
+                    try:
+                        self._compile_file(filename, key)
+                    except (VerifyError, SyntaxError):
+                        failed.append(filename)
+        return failed
 
     def eval(self, source, filename=None):
-        return self._eval_func(source, self._env, filename)
+        if self._eval_func is not None:
+            return self._eval_func(source, self._env, filename)
+        return self._evaluator.exec_code(source, self._env, filename)
@@ -19,6 +19,7 @@
 import os
 import unittest
 
+import pypybits.transformer as compiler
 import safeeval
 import tempdir_test
 import traceback
@@ -233,6 +234,52 @@ x = D().f()
         m = safeeval.safe_eval(code, safeeval.safe_environment())
         self.assertEquals(m.x, "foo2bar")
 
+    def test_compile_and_run_separately(self):
+        env = safeeval.safe_environment()
+        code = safeeval.safe_compile("x = len([1, 2])", env)
+        module1 = safeeval.safe_run(code, env)
+        module2 = safeeval.safe_run(code, env)
+        self.assertEquals(module1.x, 2)
+        assert module1 is not module2
+        self.assertRaises(
+            safeeval.VerifyError,
+            lambda: safeeval.safe_compile("x._y", env))
+
+    # These need pycodegen, so are only defined where it can be used
+    # (see safeeval.can_compile_trees).
+    if safeeval.can_compile_trees:
+
+        def test_exec_tree(self):
+            source = """
+def f(a):
+    return [a * 2 for b in range(3)]
+x = f(21)
+"""
+            tree = compiler.parse(source)
+            module = safeeval.safe_exec_tree(tree, safeeval.safe_environment())
+            self.assertEquals(module.x, [42, 42, 42])
+            # Line numbers come from the tree.
+            code = safeeval.safe_compile_tree(compiler.parse("\n\nx = 1"),
+                                              safeeval.Environment())
+            self.assertEquals(code.co_firstlineno, 3)
+
+        def test_exec_tree_rejects_bad_code(self):
+            source = """
+def func():
+    x.y = 1
+"""
+            try:
+                safeeval.safe_exec_tree(compiler.parse(source),
+                                        safeeval.Environment(),
+                                        source_code=source)
+            except safeeval.VerifyError, exn:
+                self.assertEquals(str(exn), """
+line 3: SetAttr, in func
+  x.y = 1\
+""")
+            else:
+                self.fail("Expected exception")
+
 
 class ModuleLoaderTest(tempdir_test.TempDirTestCase):
 
@@ -334,6 +381,71 @@ from bar import b
         self.assertRaises(AssertionError,
                           lambda: loader.add_module("foo.bar", Module()))
 
+    def test_module_cache(self):
+        compiled = []
+        class CountingEvaluator(safeeval.Evaluator):
+            def compile_code(self, source_code, builtins, filename=None):
+                compiled.append(filename)
+                return safeeval.Evaluator.compile_code(
+                    self, source_code, builtins, filename)
+        evaluator = CountingEvaluator(use_filename=False, warn_only=False)
+        temp_dir = self.make_temp_dir()
+        cache_dir = self.make_temp_dir()
+        filename = os.path.join(temp_dir, "foo.py")
+        write_file(filename, "a = 123")
+        def load():
+            loader = safeeval.ModuleLoader([temp_dir], evaluator=evaluator,
+                                           cache_dir=cache_dir)
+            return loader.load_file(filename).a
+        self.assertEquals(load(), 123)
+        self.assertEquals(load(), 123)
+        self.assertEquals(len(compiled), 1)
+        # Same contents, different modification time.
+        os.utime(filename, (0, 0))
+        self.assertEquals(load(), 123)
+        self.assertEquals(len(compiled), 1)
+        write_file(filename, "a = 456")
+        os.utime(filename, (1, 1))
+        self.assertEquals(load(), 456)
+        self.assertEquals(len(compiled), 2)
+        # Evaluators with other settings do not share entries.
+        evaluator = CountingEvaluator(use_filename=True, warn_only=False)
+        self.assertEquals(load(), 456)
+        self.assertEquals(len(compiled), 3)
+
+    def test_filled_module_cache_survives_a_move(self):
+        compiled = []
+        class CountingEvaluator(safeeval.Evaluator):
+            def compile_code(self, source_code, builtins, filename=None):
+                compiled.append(filename)
+                return safeeval.Evaluator.compile_code(
+                    self, source_code, builtins, filename)
+        evaluator = CountingEvaluator(use_filename=False, warn_only=False)
+        build_dir = self.make_temp_dir()
+        cache_dir = self.make_temp_dir()
+        os.mkdir(os.path.join(build_dir, "pkg"))
+        write_file(os.path.join(build_dir, "pkg", "__init__.py"), "")
+        write_file(os.path.join(build_dir, "pkg", "foo.py"), "a = 123")
+        write_file(os.path.join(build_dir, "bad.py"), "x._y = 1")
+        loader = safeeval.ModuleLoader([build_dir], evaluator=evaluator,
+                                       cache_dir=cache_dir)
+        self.assertEquals(loader.fill_cache(),
+                          [os.path.join(build_dir, "bad.py")])
+        self.assertEquals(len(compiled), 3)
+        # Deployed elsewhere, with new modification times.
+        deploy_dir = self.make_temp_dir()
+        os.mkdir(os.path.join(deploy_dir, "pkg"))
+        for name in ("__init__.py", "foo.py"):
+            filename = os.path.join(deploy_dir, "pkg", name)
+            write_file(filename, safeeval.read_file(
+                    os.path.join(build_dir, "pkg", name)))
+            os.utime(filename, (1, 1))
+        loader = safeeval.ModuleLoader([deploy_dir], evaluator=evaluator,
+                                       cache_dir=cache_dir)
+        # As "import pkg.foo" does.
+        self.assertEquals(loader._import_module("pkg.foo").foo.a, 123)
+        self.assertEquals(len(compiled), 3)
+
     def test_using_filename(self):
         for use_filename in (False, True):
             execfunc = safeeval.Evaluator(use_filename=use_filename,
@@ -55,19 +55,42 @@ class Binding(object):
 
 
 # An environment is a mapping from variable names to bindings.
+# Environments are immutable.  Each one holds only the names it
+# changes, and refers to its parent for the rest, so that extending an
+# environment does not copy it.  A name that maps to None has been
+# declared global, which hides any binding in the parent.
 class Environ(object):
 
-    def __init__(self, env, global_vars, all_bindings):
+    def __init__(self, env, global_vars, all_bindings, parent=None):
         self._env = env
         self._global_vars = global_vars
         self._all_bindings = all_bindings
+        self._parent = parent
+        # Lookups that had to go to the parents.
+        self._found = {}
+
+    def _find(self, name):
+        if name in self._env:
+            return self._env[name]
+        if self._parent is None:
+            return None
+        try:
+            return self._found[name]
+        except KeyError:
+            binding = self._parent._find(name)
+            self._found[name] = binding
+            return binding
 
     def lookup(self, name):
-        return self._env[name]
+        binding = self._find(name)
+        if binding is None:
+            raise KeyError(name)
+        return binding
 
     def _get(self, name):
-        if name in self._env:
-            return self._env[name]
+        binding = self._find(name)
+        if binding is not None:
+            return binding
         else:
             if name not in self._global_vars:
                 binding = Binding(name, is_global=True)
@@ -83,18 +106,29 @@ class Environ(object):
         var_ref = VariableReference(node, is_assignment=assigns, is_read=reads)
         binding.references.append(var_ref)
 
+    def _extend(self, env):
+        if len(env) == 0:
+            return self
+        return Environ(env, self._global_vars, self._all_bindings, self)
+
     def bind(self, name):
-        binding = Binding(name, is_global=False)
-        self._all_bindings.append(binding)
-        env = self._env.copy()
-        env[name] = binding
-        return Environ(env, self._global_vars, self._all_bindings)
+        return self.bind_many([name])
+
+    def bind_many(self, names):
+        # Gives each name a new binding, in a single new environment.
+        env = {}
+        for name in names:
+            binding = Binding(name, is_global=False)
+            self._all_bindings.append(binding)
+            env[name] = binding
+        return self._extend(env)
 
     def set_global(self, name):
+        return self.set_globals([name])
+
+    def set_globals(self, names):
         # Could add to global_vars too
-        env = self._env.copy()
-        env.pop(name, None)
-        return Environ(env, self._global_vars, self._all_bindings)
+        return self._extend(dict.fromkeys(names))
 
 
 class Scope(object):
@@ -201,14 +235,13 @@ def annotate_function(node, scope):
         map_node(default).annotate(scope)
     global_vars = find_globals(node.code)
     assigned_vars = find_assigned(node.code)
-    new_env = scope.next_env
-    for var in assigned_vars:
-        new_env = new_env.bind(var)
-    for var in global_vars:
-        new_env = new_env.set_global(var)
-    for var in get_argument_variables(node.argnames):
+    new_env = scope.next_env.bind_many(assigned_vars)
+    new_env = new_env.set_globals(global_vars)
+    argument_vars = list(get_argument_variables(node.argnames))
+    for var in argument_vars:
         assert var not in global_vars
-        new_env = new_env.bind(var)
+    new_env = new_env.bind_many(argument_vars)
+    for var in argument_vars:
         # Record the argument binding as a reference so that the line
         # number can be reported.
         new_env.lookup(var).references.append(
@@ -274,13 +307,11 @@ class HandleClass(Node):
         # that appear within the class scope.
         # Assigned variables' values default to those of their namesakes
         # in global (not enclosing) scope.
-        new_env = scope.next_env
-        for var in find_assigned(self._node.code):
-            # Approximation: introduces a new binding, but its value
-            # defaults to the value in the global scope.
-            new_env = new_env.bind(var)
-        for var in find_globals(self._node.code):
-            new_env = new_env.set_global(var)
+        # Approximation: introduces a new binding for each assigned
+        # variable, but its value defaults to the value in the global
+        # scope.
+        new_env = scope.next_env.bind_many(find_assigned(self._node.code))
+        new_env = new_env.set_globals(find_globals(self._node.code))
         map_node(self._node.code).annotate(Scope(new_env, scope.next_env))
 
 
@@ -298,9 +329,8 @@ class HandleNewScopeExpr(Node):
         assert find_globals_from_handler(self._node_handler) == set()
 
     def annotate(self, scope):
-        new_env = scope.next_env
-        for var in find_assigned_from_handler(self._node_handler):
-            new_env = new_env.bind(var)
+        new_env = scope.next_env.bind_many(
+            find_assigned_from_handler(self._node_handler))
         self._node_handler.annotate(make_normal_scope(new_env))
 
 
@@ -483,11 +513,24 @@ def find_globals_from_handler(handler):
     handler.find_globals(var_set)
     return var_set
 
+# The results for a node are remembered on it, since a body can be
+# asked about more than once (a lambda's body, for example, by the
+# enclosing scope's find_globals() and then by annotate()).  The
+# returned sets must not be modified.
+def _get_scope_vars(node):
+    try:
+        return node.scope_vars
+    except AttributeError:
+        handler = map_node(node)
+        node.scope_vars = (find_assigned_from_handler(handler),
+                           find_globals_from_handler(handler))
+        return node.scope_vars
+
 def find_assigned(node):
-    return find_assigned_from_handler(map_node(node))
+    return _get_scope_vars(node)[0]
 
 def find_globals(node):
-    return find_globals_from_handler(map_node(node))
+    return _get_scope_vars(node)[1]
 
 
 def annotate(node):
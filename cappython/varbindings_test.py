@@ -530,6 +530,18 @@ print x
         self.assertEquals(refs[1].is_read, True)
         self.assertEquals(refs[1].node.lineno, 3)
 
+    def test_environ_extension(self):
+        global_vars = {}
+        env = varbindings.Environ({}, global_vars, [])
+        env1 = env.bind_many(["x", "y"])
+        env2 = env1.bind("x").set_global("y")
+        self.assertRaises(KeyError, env.lookup, "x")
+        assert env2.lookup("x") is not env1.lookup("x")
+        self.assertRaises(KeyError, env2.lookup, "y")
+        # Extending an environment leaves it unchanged.
+        self.assertEquals(env1.lookup("y").name, "y")
+        assert env1.set_globals([]) is env1
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -2,7 +2,9 @@
 
 """
 
-from compiler import ast, walk
+# from compiler import ast, walk
+from pypybits import ast
+from pypybits.compilervisitor import walk
 
 def is_future(stmt):
     """Return true if statement is a well-formed future statement"""
@@ -4,8 +4,11 @@ import dis
 import new
 import sys
 
-from compiler import misc
-from compiler.consts \
+# from compiler import misc
+# from compiler.consts \
+#      import CO_OPTIMIZED, CO_NEWLOCALS, CO_VARARGS, CO_VARKEYWORDS
+from pypybits import misc
+from pypybits.compilerconsts \
      import CO_OPTIMIZED, CO_NEWLOCALS, CO_VARARGS, CO_VARKEYWORDS
 
 class FlowGraph:
@@ -5,13 +5,22 @@ import struct
 import sys
 from cStringIO import StringIO
 
-from compiler import ast, parse, walk, syntax
-from compiler import pyassem, misc, future, symbols
-from compiler.consts import SC_LOCAL, SC_GLOBAL, SC_FREE, SC_CELL
-from compiler.consts import (CO_VARARGS, CO_VARKEYWORDS, CO_NEWLOCALS,
+# from compiler import ast, parse, walk, syntax
+# from compiler import pyassem, misc, future, symbols
+# from compiler.consts import SC_LOCAL, SC_GLOBAL, SC_FREE, SC_CELL
+# from compiler.consts import (CO_VARARGS, CO_VARKEYWORDS, CO_NEWLOCALS,
+#      CO_NESTED, CO_GENERATOR, CO_FUTURE_DIVISION,
+#      CO_FUTURE_ABSIMPORT, CO_FUTURE_WITH_STATEMENT)
+# from compiler.pyassem import TupleArg
+from pypybits import ast, syntax
+from pypybits.transformer import parse
+from pypybits.compilervisitor import walk
+from pypybits import pyassem, misc, future, symbols
+from pypybits.compilerconsts import SC_LOCAL, SC_GLOBAL, SC_FREE, SC_CELL
+from pypybits.compilerconsts import (CO_VARARGS, CO_VARKEYWORDS, CO_NEWLOCALS,
      CO_NESTED, CO_GENERATOR, CO_FUTURE_DIVISION,
      CO_FUTURE_ABSIMPORT, CO_FUTURE_WITH_STATEMENT)
-from compiler.pyassem import TupleArg
+from pypybits.pyassem import TupleArg
 
 # XXX The version-specific code can go, since this code only works with 2.x.
 # Do we have Python 1.x or Python 2.x?
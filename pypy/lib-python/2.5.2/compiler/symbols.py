@@ -1,8 +1,12 @@
 """Module symbol-table generator"""
 
-from compiler import ast
-from compiler.consts import SC_LOCAL, SC_GLOBAL, SC_FREE, SC_CELL, SC_UNKNOWN
-from compiler.misc import mangle
+# from compiler import ast
+# from compiler.consts import SC_LOCAL, SC_GLOBAL, SC_FREE, SC_CELL, SC_UNKNOWN
+# from compiler.misc import mangle
+from pypybits import ast
+from pypybits.compilerconsts import (SC_LOCAL, SC_GLOBAL, SC_FREE, SC_CELL,
+                                     SC_UNKNOWN)
+from pypybits.misc import mangle
 import types
 
 
@@ -9,7 +9,9 @@ But it seems clearer to write checkers that use the AST to detect
 errors.
 """
 
-from compiler import ast, walk
+# from compiler import ast, walk
+from pypybits import ast
+from pypybits.compilervisitor import walk
 
 def check(tree, multi=None):
     v = SyntaxErrorChecker(multi)
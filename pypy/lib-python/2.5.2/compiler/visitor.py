@@ -1,4 +1,5 @@
-from compiler import ast
+# from compiler import ast
+from pypybits import ast
 
 # XXX should probably rename ASTVisitor to ASTWalker
 # XXX can it be made even more generic?
@@ -0,0 +1,223 @@
+import hashlib
+import threading
+import time
+
+import lrucache
+
+
+class FetchError(Exception):
+
+    # Raised by the fetch function given to ProxyCache when the upstream
+    # server could not be reached at all.
+    pass
+
+
+class _Flight(object):
+
+    # A fetch in progress, which other requests for the same URL wait
+    # for rather than fetching it again.
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+
+
+class ProxyCache(object):
+
+    # Caches the responses of an upstream server, such as a CDN, by URL.
+    # Successful responses are kept for ok_ttl seconds and failures for
+    # error_ttl seconds, so that a failing upstream is not asked on
+    # every request but is not remembered as failing for long either.
+    # Expired responses are kept for max_stale seconds more, to be
+    # revalidated with their ETag or Last-Modified date, and are served
+    # in place of a failure if the upstream is down.  Bodies larger than
+    # max_body_bytes are passed on but not cached.
+    #
+    # The in-process tier is an LRU bounded by the size of the bodies.
+    # If a memcache client is given it is used as a second, shared tier,
+    # with bodies too large for one item split across several.
+    # Concurrent misses for the same URL within this process share a
+    # single fetch.
+    #
+    # fetch(url, headers) makes the request with the given extra
+    # headers, and returns (status, headers, body) with the response's
+    # header names in lower case, or raises FetchError.  Entries are
+    # dicts with "url", "result" (the status), "body", "content_type",
+    # "etag", "last_modified", "expires" and "stale_until"; callers
+    # must not change them.
+
+    def __init__(self, fetch, max_bytes, memcache=None, ok_ttl=24 * 3600,
+                 error_ttl=60, max_stale=7 * 24 * 3600,
+                 max_body_bytes=4 * 1024 * 1024, chunk_bytes=900 * 1000,
+                 clock=time.time):
+        self._fetch_func = fetch
+        self._local = lrucache.LRUCache(max_bytes)
+        self._memcache = memcache
+        self._ok_ttl = ok_ttl
+        self._error_ttl = error_ttl
+        self._max_stale = max_stale
+        self._max_body_bytes = max_body_bytes
+        self._chunk_bytes = chunk_bytes
+        self._clock = clock
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.memcache_hits = 0
+        self.memcache_misses = 0
+        self.fetches = 0
+        self.coalesced = 0
+        self.revalidated = 0
+
+    def set_memcache(self, memcache):
+        self._memcache = memcache
+
+    def _get_key(self, url):
+        # Memcache keys are limited in length, and URLs are not.
+        return "cdn1:" + hashlib.sha1(url).hexdigest()
+
+    def get(self, url):
+        now = self._clock()
+        entry = self._local.get(url)
+        if entry is not None:
+            if entry["expires"] > now:
+                return entry
+            if entry["stale_until"] <= now:
+                entry = None
+        # Another instance may have fetched or revalidated it since.
+        shared = self._get_memcache(url, now)
+        if shared is not None and (entry is None or
+                                   shared["expires"] > entry["expires"]):
+            entry = shared
+            self._set_local(url, entry)
+        if entry is not None and entry["expires"] > now:
+            return entry
+        return self._fetch_once(url, entry)
+
+    def _fetch_once(self, url, stale):
+        self._lock.acquire()
+        try:
+            flight = self._flights.get(url)
+            leader = flight is None
+            if leader:
+                flight = self._flights[url] = _Flight()
+        finally:
+            self._lock.release()
+        if not leader:
+            self.coalesced += 1
+            flight.done.wait()
+            if flight.entry is not None:
+                return flight.entry
+            # The fetch failed unexpectedly; try again alone.
+            return self._fetch(url, stale)
+        try:
+            flight.entry = self._fetch(url, stale)
+            return flight.entry
+        finally:
+            self._lock.acquire()
+            try:
+                del self._flights[url]
+            finally:
+                self._lock.release()
+            flight.done.set()
+
+    def _fetch(self, url, stale):
+        headers = {}
+        if stale is not None and stale["result"] == 200:
+            if stale["etag"] is not None:
+                headers["If-None-Match"] = stale["etag"]
+            if stale["last_modified"] is not None:
+                headers["If-Modified-Since"] = stale["last_modified"]
+        self.fetches += 1
+        try:
+            status, response_headers, body = self._fetch_func(url, headers)
+        except FetchError:
+            status, response_headers, body = 502, {}, None
+        now = self._clock()
+        if status == 304 and headers:
+            self.revalidated += 1
+            entry = dict(stale, expires=now + self._ok_ttl,
+                         stale_until=now + self._ok_ttl + self._max_stale)
+        elif status == 200:
+            entry = {"url": url,
+                     "result": 200,
+                     "body": body,
+                     "content_type": response_headers.get(
+                         "content-type", "application/octet-stream"),
+                     "etag": response_headers.get("etag"),
+                     "last_modified": response_headers.get("last-modified"),
+                     "expires": now + self._ok_ttl,
+                     "stale_until": now + self._ok_ttl + self._max_stale}
+            if len(body) > self._max_body_bytes:
+                return entry
+        elif (status >= 500 and stale is not None and
+              stale["result"] == 200):
+            # Serve the old copy until the upstream recovers, and ask
+            # it again only after error_ttl.
+            entry = dict(stale, expires=min(now + self._error_ttl,
+                                            stale["stale_until"]))
+        else:
+            entry = {"url": url,
+                     "result": status,
+                     "body": None,
+                     "content_type": None,
+                     "etag": None,
+                     "last_modified": None,
+                     "expires": now + self._error_ttl,
+                     "stale_until": now + self._error_ttl}
+        self._set_local(url, entry)
+        self._set_memcache(url, entry, now)
+        return entry
+
+    def _set_local(self, url, entry):
+        self._local.set(url, entry, len(url) + len(entry["body"] or ""))
+
+    def _get_memcache(self, url, now):
+        if self._memcache is None:
+            return None
+        entry = self._memcache.get(self._get_key(url))
+        if entry is not None and "chunks" in entry:
+            keys = entry["chunks"]
+            chunks = self._memcache.get_multi(keys)
+            if len(chunks) < len(keys):
+                # Some of the body has been evicted.
+                entry = None
+            else:
+                entry = dict(entry)
+                entry["body"] = "".join([chunks[key] for key in keys])
+                del entry["chunks"]
+        if entry is None or entry["stale_until"] <= now:
+            self.memcache_misses += 1
+            return None
+        self.memcache_hits += 1
+        return entry
+
+    def _set_memcache(self, url, entry, now):
+        if self._memcache is None:
+            return
+        key = self._get_key(url)
+        seconds = int(entry["stale_until"] - now) + 1
+        body = entry["body"]
+        if body is not None and len(body) > self._chunk_bytes:
+            # The chunks are named after the body, so a reader never
+            # mixes them with the chunks of another version of it.
+            prefix = "%s:%s:" % (key, hashlib.sha1(body).hexdigest())
+            chunks = {}
+            keys = []
+            for start in xrange(0, len(body), self._chunk_bytes):
+                keys.append(prefix + str(len(keys)))
+                chunks[keys[-1]] = body[start:start + self._chunk_bytes]
+            if self._memcache.set_multi(chunks, time=seconds):
+                # Some were not stored, so the body would be incomplete.
+                return
+            entry = dict(entry)
+            entry["body"] = None
+            entry["chunks"] = keys
+        self._memcache.set(key, entry, time=seconds)
+
+    def stats(self):
+        stats = self._local.stats()
+        stats["memcache_hits"] = self.memcache_hits
+        stats["memcache_misses"] = self.memcache_misses
+        stats["fetches"] = self.fetches
+        stats["coalesced"] = self.coalesced
+        stats["revalidated"] = self.revalidated
+        return stats
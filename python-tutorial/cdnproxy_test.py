@@ -0,0 +1,178 @@
+import threading
+import unittest
+
+import cdnproxy
+
+
+URL = "http://cdn.example/dojo.js"
+
+
+class FakeMemcache(object):
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def get_multi(self, keys):
+        return dict((key, self.data[key]) for key in keys
+                    if key in self.data)
+
+    def set(self, key, value, time=0):
+        self.data[key] = value
+        return True
+
+    def set_multi(self, mapping, time=0):
+        self.data.update(mapping)
+        return []
+
+
+class StubCdn(object):
+
+    # Stands in for the upstream server.  Answers with the response set
+    # for each URL, and records the requests made to it.
+
+    def __init__(self):
+        self.responses = {}
+        self.requests = []
+
+    def fetch(self, url, headers):
+        self.requests.append((url, headers))
+        response = self.responses.get(url)
+        if response is None:
+            raise cdnproxy.FetchError("unreachable")
+        return response
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ProxyCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cdn = StubCdn()
+        self.cdn.responses[URL] = (200, {"content-type": "text/javascript",
+                                         "etag": '"v1"'}, "var x;")
+        self.clock = Clock()
+        self.memcache = FakeMemcache()
+
+    def make_cache(self, **kwargs):
+        return cdnproxy.ProxyCache(self.cdn.fetch, max_bytes=100000,
+                                   memcache=self.memcache, ok_ttl=100,
+                                   error_ttl=10, max_stale=1000,
+                                   clock=self.clock, **kwargs)
+
+    def test_success_is_cached_until_it_expires(self):
+        cache = self.make_cache()
+        entry = cache.get(URL)
+        self.assertEquals(entry["result"], 200)
+        self.assertEquals(entry["body"], "var x;")
+        self.assertEquals(entry["content_type"], "text/javascript")
+        self.clock.now += 99
+        self.assertEquals(cache.get(URL)["body"], "var x;")
+        self.assertEquals(len(self.cdn.requests), 1)
+        # Once expired it is revalidated rather than fetched again.
+        self.clock.now += 1
+        self.cdn.responses[URL] = (304, {}, "")
+        self.assertEquals(cache.get(URL)["body"], "var x;")
+        self.assertEquals(self.cdn.requests[-1],
+                          (URL, {"If-None-Match": '"v1"'}))
+        self.assertEquals(cache.revalidated, 1)
+        self.clock.now += 99
+        cache.get(URL)
+        self.assertEquals(len(self.cdn.requests), 2)
+
+    def test_failures_are_cached_briefly(self):
+        cache = self.make_cache()
+        self.cdn.responses[URL] = (404, {}, "not found")
+        self.assertEquals(cache.get(URL)["result"], 404)
+        self.assertEquals(cache.get(URL)["result"], 404)
+        self.assertEquals(len(self.cdn.requests), 1)
+        self.clock.now += 10
+        self.cdn.responses[URL] = (200, {}, "var y;")
+        entry = cache.get(URL)
+        self.assertEquals(entry["body"], "var y;")
+        self.assertEquals(entry["content_type"], "application/octet-stream")
+        self.assertEquals(self.cdn.requests[-1], (URL, {}))
+
+    def test_stale_copy_is_served_while_upstream_fails(self):
+        cache = self.make_cache()
+        cache.get(URL)
+        self.clock.now += 100
+        del self.cdn.responses[URL]
+        self.assertEquals(cache.get(URL)["body"], "var x;")
+        self.clock.now += 9
+        cache.get(URL)
+        self.assertEquals(len(self.cdn.requests), 2)
+        # Not beyond max_stale, however often it fails.
+        for i in range(99):
+            self.clock.now += 10
+            self.assertEquals(cache.get(URL)["body"], "var x;")
+        self.clock.now += 10
+        self.assertEquals(cache.get(URL)["result"], 502)
+
+    def test_memcache_tier(self):
+        self.make_cache().get(URL)
+        cache = self.make_cache()
+        self.assertEquals(cache.get(URL)["body"], "var x;")
+        self.assertEquals(cache.memcache_hits, 1)
+        self.assertEquals(len(self.cdn.requests), 1)
+
+    def test_large_bodies_are_chunked_in_memcache(self):
+        body = "".join([chr(i % 256) for i in xrange(2500)])
+        self.cdn.responses[URL] = (200, {}, body)
+        self.make_cache(chunk_bytes=1000).get(URL)
+        self.assertEquals(len(self.memcache.data), 4)
+        for value in self.memcache.data.values():
+            assert isinstance(value, dict) or len(value) <= 1000
+        self.assertEquals(self.make_cache().get(URL)["body"], body)
+        self.assertEquals(len(self.cdn.requests), 1)
+        # If a chunk is evicted the body is fetched again.
+        for key in self.memcache.data.keys():
+            if key.endswith(":1"):
+                del self.memcache.data[key]
+        self.assertEquals(self.make_cache().get(URL)["body"], body)
+        self.assertEquals(len(self.cdn.requests), 2)
+
+    def test_huge_bodies_are_not_cached(self):
+        cache = self.make_cache(max_body_bytes=5)
+        self.assertEquals(cache.get(URL)["body"], "var x;")
+        self.assertEquals(cache.get(URL)["body"], "var x;")
+        self.assertEquals(len(self.cdn.requests), 2)
+        self.assertEquals(self.memcache.data, {})
+
+    def test_concurrent_misses_share_one_fetch(self):
+        started = threading.Event()
+        release = threading.Event()
+        fetch = self.cdn.fetch
+        def slow_fetch(url, headers):
+            started.set()
+            release.wait()
+            return fetch(url, headers)
+        cache = cdnproxy.ProxyCache(slow_fetch, max_bytes=100000)
+        results = []
+        def get():
+            results.append(cache.get(URL)["body"])
+        threads = [threading.Thread(target=get) for i in range(5)]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        while cache.coalesced < 4:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEquals(results, ["var x;"] * 5)
+        self.assertEquals(len(self.cdn.requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,484 @@
+
+import errno
+import marshal
+import os
+import select
+import signal
+import struct
+import threading
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:
+    # Not available on App Engine.
+    resource = None
+
+
+can_fork = hasattr(os, "fork") and resource is not None
+
+
+class JobError(Exception):
+
+    # Raised in place of a call's result when the call could not be
+    # completed.  The message is fit to show to the user.  A handler
+    # may raise it too, and its message is then passed on rather than
+    # a traceback.
+    pass
+
+
+class LimitExceeded(JobError):
+
+    # The worker running the call was killed for exceeding its limits.
+    pass
+
+
+class InlineExecutor(object):
+
+    # Runs calls in the current thread, with no limits.  Used where
+    # processes cannot be created, such as on App Engine.
+
+    def __init__(self, handler_factory):
+        self._handler_factory = handler_factory
+
+    def map(self, calls, max_running=None):
+        for method, params in calls:
+            try:
+                yield getattr(self._handler_factory(), method)(*params)
+            except JobError, exn:
+                yield exn
+            except Exception:
+                yield JobError(unicode(traceback.format_exc()))
+
+    def call(self, method, params):
+        return _raise_error(list(self.map([(method, params)]))[0])
+
+    def stream(self, method, params):
+        # The output can only be passed on once the call is finished.
+        chunks = []
+        try:
+            result = getattr(self._handler_factory(write=chunks.append),
+                             method)(*params)
+        except JobError, exn:
+            result = exn
+        except Exception:
+            result = JobError(unicode(traceback.format_exc()))
+        for chunk in chunks:
+            yield ("output", chunk)
+        yield ("result", result)
+
+    def close(self):
+        pass
+
+
+def _raise_error(result):
+    if isinstance(result, JobError):
+        raise result
+    return result
+
+
+HEADER = struct.Struct("!I")
+
+
+def _write_message(fd, obj):
+    data = marshal.dumps(obj)
+    data = HEADER.pack(len(data)) + data
+    while len(data) > 0:
+        written = os.write(fd, data)
+        data = data[written:]
+
+
+def _read_exactly(fd, size):
+    chunks = []
+    while size > 0:
+        chunk = os.read(fd, size)
+        if chunk == "":
+            raise EOFError()
+        chunks.append(chunk)
+        size -= len(chunk)
+    return "".join(chunks)
+
+
+def _read_message(fd):
+    size, = HEADER.unpack(_read_exactly(fd, HEADER.size))
+    return marshal.loads(_read_exactly(fd, size))
+
+
+def _get_cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _get_max_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux.  A forked process starts with
+    # the pages it shares with its parent counted in it.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _get_vm_bytes():
+    # The size of this process's address space, or None where /proc is
+    # not available.
+    try:
+        fh = open("/proc/self/statm")
+        try:
+            return int(fh.read().split()[0]) * resource.getpagesize()
+        finally:
+            fh.close()
+    except IOError:
+        return None
+
+
+def _worker_main(handler_factory, requests_fd, results_fd, limits):
+    signal.signal(signal.SIGXCPU, signal.SIG_DFL)
+    # The worker starts with a copy of its parent's memory, which may
+    # be large, so its limits are on how far it grows beyond that.
+    start_vm_bytes = _get_vm_bytes()
+    start_rss_bytes = _get_max_rss_bytes()
+    if limits.memory_bytes is not None:
+        if start_vm_bytes is None:
+            max_vm_bytes = limits.memory_bytes
+        else:
+            max_vm_bytes = start_vm_bytes + limits.memory_bytes
+        resource.setrlimit(resource.RLIMIT_AS, (max_vm_bytes, max_vm_bytes))
+    for job_number in xrange(limits.max_jobs):
+        try:
+            method, params, stream = _read_message(requests_fd)
+        except EOFError:
+            return
+        if limits.cpu_seconds is not None:
+            # RLIMIT_CPU counts the whole life of the process, so move
+            # the soft limit along for each job.  Going over it
+            # delivers SIGXCPU, which kills the worker.
+            soft = int(_get_cpu_seconds() + limits.cpu_seconds) + 1
+            resource.setrlimit(resource.RLIMIT_CPU,
+                               (soft, resource.RLIM_INFINITY))
+        if stream:
+            handler = handler_factory(
+                write=lambda chunk: _write_message(results_fd,
+                                                   ("output", chunk)))
+        else:
+            handler = handler_factory()
+        try:
+            status, value = "ok", getattr(handler, method)(*params)
+        except JobError, exn:
+            status, value = "error", unicode(exn)
+        except Exception:
+            status, value = "error", unicode(traceback.format_exc())
+        # Start afresh rather than carry a bloated heap into the next
+        # job, where it would eat into that job's allowance.  The result
+        # says so, so that the parent does not send this worker more.
+        retiring = (limits.memory_bytes is not None and
+                    _get_max_rss_bytes() - start_rss_bytes >
+                    limits.memory_bytes / 2)
+        _write_message(results_fd, (status, value, retiring))
+        if retiring:
+            return
+
+
+class Limits(object):
+
+    def __init__(self, wall_seconds, cpu_seconds, memory_bytes, max_jobs):
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.max_jobs = max_jobs
+
+
+# The parent's ends of every worker's pipes.  Each new worker closes
+# its inherited copies of these, otherwise a worker would only see EOF
+# on its requests pipe once all its younger siblings had exited too.
+_parent_fds = set()
+
+
+class Worker(object):
+
+    def __init__(self, handler_factory, limits):
+        requests_read, requests_write = os.pipe()
+        results_read, results_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Child.  Never return into the caller's code.
+            status = 0
+            try:
+                try:
+                    for fd in _parent_fds:
+                        os.close(fd)
+                    os.close(requests_write)
+                    os.close(results_read)
+                    _worker_main(handler_factory, requests_read,
+                                 results_write, limits)
+                except:
+                    traceback.print_exc()
+                    status = 1
+            finally:
+                os._exit(status)
+        os.close(requests_read)
+        os.close(results_write)
+        self.pid = pid
+        self.requests_fd = requests_write
+        self.results_fd = results_read
+        _parent_fds.update([requests_write, results_read])
+        self.jobs_left = limits.max_jobs
+
+    def send(self, method, params, stream=False):
+        # Raises EOFError if the worker has already exited.
+        assert self.jobs_left > 0
+        self.jobs_left -= 1
+        try:
+            _write_message(self.requests_fd, (method, params, stream))
+        except OSError, exn:
+            if exn.errno != errno.EPIPE:
+                raise
+            raise EOFError()
+
+    def receive(self):
+        return _read_message(self.results_fd)
+
+    def kill(self):
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except OSError, exn:
+            if exn.errno != errno.ESRCH:
+                raise
+        self.close()
+
+    def close(self):
+        _parent_fds.difference_update([self.requests_fd, self.results_fd])
+        os.close(self.requests_fd)
+        os.close(self.results_fd)
+        os.waitpid(self.pid, 0)
+
+
+class ProcessPoolExecutor(object):
+
+    # Runs calls in a pool of forked worker processes.  The workers are
+    # forked from this process, so whatever it has imported (safeeval,
+    # pypybits, the pyparser tables) is already loaded in them.  Each
+    # call is limited in wall-clock time, CPU time and address space; a
+    # worker that goes over is killed and replaced, and its call
+    # raises LimitExceeded.  Workers are also replaced after max_jobs
+    # calls so that nothing accumulates in them.
+    #
+    # The workers are forked when the pool is made, and replacements
+    # are forked by a thread of the pool's own, so that requests only
+    # ever wait for an idle worker and never for a fork.
+
+    def __init__(self, handler_factory, num_workers=4, wall_seconds=10,
+                 cpu_seconds=5, memory_bytes=256 * 1024 * 1024,
+                 max_jobs=100):
+        assert can_fork
+        assert num_workers > 0 and max_jobs > 0
+        self._handler_factory = handler_factory
+        self._num_workers = num_workers
+        self._limits = Limits(wall_seconds, cpu_seconds, memory_bytes,
+                              max_jobs)
+        self._idle = []
+        self._num_started = num_workers
+        self._closed = False
+        lock = threading.Lock()
+        # Notified when a worker becomes idle, and when one is needed.
+        self._condition = threading.Condition(lock)
+        self._refill_condition = threading.Condition(lock)
+        for i in range(num_workers):
+            self._idle.append(Worker(handler_factory, self._limits))
+        self._refill_thread = threading.Thread(target=self._refill)
+        self._refill_thread.setDaemon(True)
+        self._refill_thread.start()
+
+    def _refill(self):
+        # Forks a worker whenever there are fewer than num_workers.
+        self._condition.acquire()
+        try:
+            while True:
+                while (not self._closed and
+                       self._num_started >= self._num_workers):
+                    self._refill_condition.wait()
+                if self._closed:
+                    return
+                self._num_started += 1
+                self._condition.release()
+                try:
+                    try:
+                        worker = Worker(self._handler_factory, self._limits)
+                    except Exception:
+                        # E.g. out of processes; wait for some to go.
+                        traceback.print_exc()
+                        worker = None
+                        time.sleep(1)
+                finally:
+                    self._condition.acquire()
+                if worker is None:
+                    self._num_started -= 1
+                elif self._closed:
+                    self._condition.release()
+                    try:
+                        worker.close()
+                    finally:
+                        self._condition.acquire()
+                else:
+                    self._idle.append(worker)
+                    self._condition.notify()
+        finally:
+            self._condition.release()
+
+    def _checkout(self, block):
+        self._condition.acquire()
+        try:
+            while len(self._idle) == 0:
+                if not block:
+                    return None
+                self._condition.wait()
+            return self._idle.pop()
+        finally:
+            self._condition.release()
+
+    def _checkin(self, worker):
+        self._condition.acquire()
+        try:
+            if worker.jobs_left > 0 and not self._closed:
+                self._idle.append(worker)
+                self._condition.notify()
+                return
+        finally:
+            self._condition.release()
+        worker.close()
+        self._discard(worker)
+
+    def _discard(self, worker):
+        self._condition.acquire()
+        try:
+            self._num_started -= 1
+            self._refill_condition.notify()
+        finally:
+            self._condition.release()
+
+    def _receive(self, worker):
+        # Returns ("output", chunk) or ("result", result) for the next
+        # message from the worker.  After a result the worker is back
+        # in the pool, or gone.
+        try:
+            message = worker.receive()
+        except EOFError:
+            # The worker died: most likely SIGXCPU or the kernel
+            # refusing it memory outside of Python's control.
+            worker.kill()
+            self._discard(worker)
+            return ("result", LimitExceeded(
+                    "The program was stopped because it used too much "
+                    "CPU time or memory."))
+        if message[0] == "output":
+            return message
+        status, value, retiring = message
+        if retiring:
+            worker.jobs_left = 0
+        self._checkin(worker)
+        if status == "ok":
+            return ("result", value)
+        # The handler raised rather than returning an error.
+        return ("result", JobError(value))
+
+    def _run(self, calls, stream, max_running=None):
+        # Yields (kind, index, value) as the calls produce output and
+        # results, in whatever order they do so.  At most max_running
+        # calls run at a time.
+        running = {}
+        next_to_start = 0
+        try:
+            while next_to_start < len(calls) or len(running) > 0:
+                while (next_to_start < len(calls) and
+                       (max_running is None or len(running) < max_running)):
+                    worker = self._checkout(block=len(running) == 0)
+                    if worker is None:
+                        break
+                    method, params = calls[next_to_start]
+                    try:
+                        worker.send(method, params, stream)
+                    except EOFError:
+                        worker.kill()
+                        self._discard(worker)
+                        if worker.jobs_left + 1 < self._limits.max_jobs:
+                            # It died while idle; try again on another.
+                            continue
+                        # A new worker that dies at once would do so
+                        # again.
+                        raise
+                    deadline = None
+                    if self._limits.wall_seconds is not None:
+                        deadline = time.time() + self._limits.wall_seconds
+                    running[worker.results_fd] = (next_to_start, worker,
+                                                  deadline)
+                    next_to_start += 1
+                deadlines = [deadline for index, worker, deadline
+                             in running.itervalues() if deadline is not None]
+                if len(deadlines) == 0:
+                    timeout = None
+                else:
+                    timeout = max(0, min(deadlines) - time.time())
+                try:
+                    ready, _, _ = select.select(running.keys(), [], [],
+                                                timeout)
+                except select.error, exn:
+                    if exn.args[0] == errno.EINTR:
+                        continue
+                    raise
+                for fd in ready:
+                    index, worker, deadline = running[fd]
+                    kind, value = self._receive(worker)
+                    if kind == "result":
+                        del running[fd]
+                    yield (kind, index, value)
+                now = time.time()
+                for fd, (index, worker, deadline) in running.items():
+                    if deadline is not None and now >= deadline:
+                        del running[fd]
+                        worker.kill()
+                        self._discard(worker)
+                        yield ("result", index, LimitExceeded(
+                                "The program was stopped because it ran "
+                                "for more than %s seconds." %
+                                self._limits.wall_seconds))
+        finally:
+            # Abandoned part-way through, e.g. by an exception.
+            for index, worker, deadline in running.itervalues():
+                worker.kill()
+                self._discard(worker)
+
+    def map(self, calls, max_running=None):
+        # Yields results in the order of calls, running as many calls
+        # concurrently as there are workers available.  A call that
+        # fails yields a JobError instead of stopping the rest.  If
+        # max_running is given, no more than that many run at once, so
+        # that one long list can not hold every worker.
+        calls = list(calls)
+        results = {}
+        next_to_yield = 0
+        for kind, index, value in self._run(calls, stream=False,
+                                             max_running=max_running):
+            results[index] = value
+            while next_to_yield in results:
+                yield results.pop(next_to_yield)
+                next_to_yield += 1
+
+    def call(self, method, params):
+        return _raise_error(list(self.map([(method, params)]))[0])
+
+    def stream(self, method, params):
+        # Yields ("output", chunk) for each piece of output the call's
+        # handler writes, as it writes it, then ("result", result).
+        for kind, index, value in self._run([(method, params)], stream=True):
+            yield (kind, value)
+
+    def close(self):
+        self._condition.acquire()
+        try:
+            self._closed = True
+            self._refill_condition.notify()
+            idle = self._idle[:]
+            self._idle[:] = []
+        finally:
+            self._condition.release()
+        self._refill_thread.join()
+        for worker in idle:
+            worker.close()
+            self._discard(worker)
@@ -0,0 +1,212 @@
+
+import os
+import signal
+import time
+import unittest
+
+import executor
+
+
+class FakeHandler(object):
+
+    def __init__(self, write=None):
+        self._write = write
+
+    def chatter(self, count):
+        for i in range(count):
+            self._write(u"line %i\n" % i)
+        return u"done"
+
+    def echo(self, value):
+        return value
+
+    def pid(self):
+        return os.getpid()
+
+    def fail(self):
+        raise ValueError("failed")
+
+    def refuse(self):
+        raise executor.JobError(u"refused")
+
+    def allocate(self, size):
+        return len(" " * size)
+
+    def spin(self):
+        while True:
+            pass
+
+    def sleep(self, seconds):
+        import time
+        time.sleep(seconds)
+        return seconds
+
+
+class InlineExecutorTest(unittest.TestCase):
+
+    def test_call(self):
+        pool = executor.InlineExecutor(FakeHandler)
+        self.assertEquals(pool.call("echo", [u"hello"]), u"hello")
+        self.assertRaises(executor.JobError, pool.call, "fail", [])
+        self.assertEquals(unicode(list(pool.map([("refuse", [])]))[0]),
+                          u"refused")
+
+    def test_map(self):
+        pool = executor.InlineExecutor(FakeHandler)
+        results = list(pool.map([("echo", [1]), ("fail", []),
+                                 ("echo", [2])]))
+        self.assertEquals(results[0], 1)
+        assert isinstance(results[1], executor.JobError)
+        self.assertEquals(results[2], 2)
+
+    def test_stream(self):
+        pool = executor.InlineExecutor(FakeHandler)
+        self.assertEquals(list(pool.stream("chatter", [2])),
+                          [("output", u"line 0\n"), ("output", u"line 1\n"),
+                           ("result", u"done")])
+
+
+class ProcessPoolExecutorTest(unittest.TestCase):
+
+    def make_pool(self, **kwargs):
+        pool = executor.ProcessPoolExecutor(FakeHandler, **kwargs)
+        self.pools.append(pool)
+        return pool
+
+    def setUp(self):
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.close()
+
+    def test_call(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=1)
+        self.assertEquals(pool.call("echo", [u"hello"]), u"hello")
+        self.assertNotEquals(pool.call("pid", []), os.getpid())
+        try:
+            pool.call("fail", [])
+        except executor.JobError, exn:
+            assert "ValueError: failed" in str(exn), str(exn)
+        else:
+            self.fail("Expected JobError")
+        # A handler's own JobError is passed on without a traceback.
+        [(kind, value)] = list(pool.stream("refuse", []))
+        self.assertEquals((kind, type(value), unicode(value)),
+                          ("result", executor.JobError, u"refused"))
+
+    def test_wall_clock_limit(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=1, wall_seconds=0.5,
+                              cpu_seconds=None)
+        self.assertRaises(executor.LimitExceeded, pool.call, "spin", [])
+        # The worker is replaced.
+        self.assertEquals(pool.call("echo", [1]), 1)
+
+    def test_cpu_limit(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=1, wall_seconds=None,
+                              cpu_seconds=1)
+        self.assertRaises(executor.LimitExceeded, pool.call, "spin", [])
+        self.assertEquals(pool.call("echo", [1]), 1)
+
+    def test_workers_are_recycled(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=1, max_jobs=2)
+        pids = [pool.call("pid", []) for i in range(4)]
+        self.assertEquals(pids[0], pids[1])
+        self.assertNotEquals(pids[1], pids[2])
+        self.assertEquals(pids[2], pids[3])
+
+    def test_workers_are_recycled_after_growing(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=1, memory_bytes=220 * 1024 * 1024)
+        pid = pool.call("pid", [])
+        size = 120 * 1024 * 1024
+        self.assertEquals(pool.call("allocate", [size]), size)
+        self.assertNotEquals(pool.call("pid", []), pid)
+        self.assertEquals(pool._num_started, 1)
+
+    def test_memory_limits_are_beyond_the_parents_size(self):
+        if not executor.can_fork:
+            return
+        # Workers start with a copy of this, which is more than they
+        # may use themselves.
+        ballast = " " * (150 * 1024 * 1024)
+        pool = self.make_pool(num_workers=1, memory_bytes=100 * 1024 * 1024)
+        pid = pool.call("pid", [])
+        size = 20 * 1024 * 1024
+        self.assertEquals(pool.call("allocate", [size]), size)
+        self.assertEquals(pool.call("pid", []), pid)
+        self.assertRaises(executor.JobError, pool.call, "allocate",
+                          [120 * 1024 * 1024])
+        del ballast
+
+    def test_workers_are_forked_in_advance(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=3)
+        self.assertEquals(len(pool._idle), 3)
+        pids = [worker.pid for worker in pool._idle]
+        self.assertEquals(sorted(pool.map([("pid", [])] * 3)), sorted(pids))
+        # A retired worker is replaced by the pool, not by the caller.
+        pool = self.make_pool(num_workers=1, max_jobs=1)
+        pid = pool.call("pid", [])
+        for i in range(100):
+            if len(pool._idle) == 1:
+                break
+            time.sleep(0.01)
+        self.assertNotEquals(pool._idle[0].pid, pid)
+
+    def test_dead_idle_workers_are_replaced(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=1)
+        pid = pool.call("pid", [])
+        os.kill(pid, signal.SIGKILL)
+        # Leave it for the pool to reap, once it has gone.
+        time.sleep(0.2)
+        self.assertNotEquals(pool.call("pid", []), pid)
+        self.assertEquals(pool._num_started, 1)
+
+    def test_map_keeps_order(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=3)
+        calls = [("sleep", [0.3]), ("echo", [u"fast"]), ("fail", []),
+                 ("sleep", [0.1])]
+        results = list(pool.map(calls))
+        self.assertEquals(results[0], 0.3)
+        self.assertEquals(results[1], u"fast")
+        assert isinstance(results[2], executor.JobError)
+        self.assertEquals(results[3], 0.1)
+
+    def test_stream(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=1)
+        self.assertEquals(list(pool.stream("chatter", [2])),
+                          [("output", u"line 0\n"), ("output", u"line 1\n"),
+                           ("result", u"done")])
+        # The worker is still usable.
+        self.assertEquals(pool.call("echo", [1]), 1)
+
+    def test_stream_wall_clock_limit(self):
+        if not executor.can_fork:
+            return
+        pool = self.make_pool(num_workers=1, wall_seconds=0.5,
+                              cpu_seconds=None)
+        events = list(pool.stream("spin", []))
+        self.assertEquals(len(events), 1)
+        self.assertEquals(events[0][0], "result")
+        assert isinstance(events[0][1], executor.LimitExceeded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,9 @@
-from pyparser.pythonparse import make_pyparser
 from pyparser.tuplebuilder import TupleBuilder
+import parsersnapshot
 import symbol
 import token
 
-parser = make_pyparser("native")
+parser = parsersnapshot.load_parser("native")
 symbol_lookup = dict((num, getattr(symbol, name)) 
                      for name, num in parser.symbols.iteritems()
                      if not name.startswith(":"))
@@ -11,11 +11,8 @@ token_lookup = dict((num, getattr(token, name))
                     for name, num in parser.tokens.iteritems()
                     if name not in ("NULLTOKEN", "COMMENT", "NL"))
 
-def pypy_parse(source, mode='exec', lineno=False):
-    builder = TupleBuilder(parser)
-    parser.parse_source(source, mode, builder)
-    return builder.stack[-1].as_tuple(lineno)
-
+# The parser from pypy allocates its own integer constants to the node
+# types, so map them by name to those expected by the compiler package.
 int_map = {}
 int_map.update(symbol_lookup)
 int_map.update(token_lookup)
@@ -23,30 +20,80 @@ int_map.update(token_lookup)
 def suite(source):
     return source
 
-def _renumber(a):
-    return int_map[a]
-
-def _renumber_tree(a):
-    # The parser from pypy seems to allocate different integer
-    # constants to the different node types.  Look up the correct
-    # numbers (expected by the compiler package) by name.
-    mapped = _renumber(a[0])
-    if type(a[1]) is tuple:
-        rest = list(_renumber_tree(x) for x in a[1:])
-    else:
-        rest = list(a[1:])
-    # It looks like the pypy parser has trouble with yield as an
-    # expression at the moment.  This part of the grammar file differs
-    # from the cpython one and changing it back causes a SyntaxError.
-    # Since the return value from yield is rarely used anyway, for now
-    # we just add in the extra level to the tree to conform to the
-    # compiler package's expectations.
-    if symbol.sym_name.get(mapped) == "yield_stmt":
-        if symbol.sym_name.get(rest[0][0]) != "yield_expr":
-            rest = [tuple([symbol.yield_expr] + rest)]
-    return tuple([mapped] + rest)
-
-def ast2tuple(source, line_info=False):
-    r = pypy_parse(source, lineno=line_info)
-    r2 = _renumber_tree(r)
-    return r2
+
+class ConvertingTupleBuilder(TupleBuilder):
+
+    # Builds the final tuple tree directly from the parser's callbacks,
+    # instead of building a tree of StackElements, turning that into
+    # tuples and then copying those to renumber them: each node is
+    # given its number from int_map as it is built.  If convert is
+    # given, it is applied to each non-leaf node once its children are
+    # done, and returns the node or a replacement for it.
+    # The stack holds finished nodes as tuples, and the contents of
+    # anonymous rules (which have negative numbers and are spliced
+    # into their parent) as lists.
+
+    def __init__(self, parser, lineno=True, convert=None):
+        TupleBuilder.__init__(self, parser, lineno=lineno)
+        self._convert = convert
+
+    def _expand(self, elements):
+        nodes = []
+        for element in elements:
+            if type(element) is list:
+                nodes.extend(element)
+            else:
+                nodes.append(element)
+        return nodes
+
+    def _make_node(self, num, nodes):
+        mapped = int_map[num]
+        # It looks like the pypy parser has trouble with yield as an
+        # expression at the moment.  This part of the grammar file
+        # differs from the cpython one and changing it back causes a
+        # SyntaxError.  Since the return value from yield is rarely
+        # used anyway, for now we just add in the extra level to the
+        # tree to conform to the compiler package's expectations.
+        if mapped == symbol.yield_stmt and nodes[0][0] != symbol.yield_expr:
+            nodes = [tuple([symbol.yield_expr] + nodes)]
+        node = tuple([mapped] + nodes)
+        if self._convert is not None:
+            node = self._convert(node)
+        return node
+
+    def alternative(self, rule, source):
+        # Do nothing, keep rule on top of the stack
+        if rule.is_root():
+            self.stack[-1] = self._make_node(rule.codename,
+                                             self._expand([self.stack[-1]]))
+        return True
+
+    def sequence(self, rule, source, elts_number):
+        if elts_number > 0:
+            nodes = self._expand(self.stack[-elts_number:])
+            del self.stack[-elts_number:]
+        else:
+            nodes = []
+        if rule.codename < 0:
+            self.stack.append(nodes)
+        else:
+            self.stack.append(self._make_node(rule.codename, nodes))
+        return True
+
+    def token(self, codename, value, source):
+        if value is None:
+            if codename not in self.space_token:
+                value = self.parser.tok_rvalues.get(codename, "unknown op")
+            else:
+                value = ''
+        if self.lineno:
+            self.stack.append((int_map[codename], value, source._token_lnum))
+        else:
+            self.stack.append((int_map[codename], value))
+        return True
+
+
+def ast2tuple(source, line_info=False, convert=None):
+    builder = ConvertingTupleBuilder(parser, lineno=line_info, convert=convert)
+    parser.parse_source(source, 'exec', builder)
+    return builder.stack[-1]
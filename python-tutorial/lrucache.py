@@ -0,0 +1,111 @@
+
+import threading
+
+
+# Positions in the circular doubly linked list entries.
+PREV, NEXT, KEY, VALUE, SIZE = range(5)
+
+
+class LRUCache(object):
+
+    # A least-recently-used cache bounded by the total size of its
+    # values rather than by the number of entries.  Callers supply the
+    # size of each value when storing it, since only they know what is
+    # worth counting (e.g. the length of a marshalled code object).
+
+    def __init__(self, max_bytes):
+        assert max_bytes >= 0, max_bytes
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = {}
+        # Sentinel for the recency list: _root[NEXT] is the least
+        # recently used entry and _root[PREV] the most recently used.
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None, 0]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _unlink(self, entry):
+        entry[PREV][NEXT] = entry[NEXT]
+        entry[NEXT][PREV] = entry[PREV]
+
+    def _link_last(self, entry):
+        last = self._root[PREV]
+        entry[PREV] = last
+        entry[NEXT] = self._root
+        last[NEXT] = entry
+        self._root[PREV] = entry
+
+    def _remove(self, entry):
+        self._unlink(entry)
+        del self._entries[entry[KEY]]
+        self.current_bytes -= entry[SIZE]
+
+    def get(self, key, default=None):
+        self._lock.acquire()
+        try:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._unlink(entry)
+            self._link_last(entry)
+            return entry[VALUE]
+        finally:
+            self._lock.release()
+
+    def set(self, key, value, size):
+        assert size >= 0, size
+        self._lock.acquire()
+        try:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._remove(entry)
+            if size > self.max_bytes:
+                # Storing this would flush everything else out.
+                return False
+            while self.current_bytes + size > self.max_bytes:
+                self._remove(self._root[NEXT])
+                self.evictions += 1
+            entry = [None, None, key, value, size]
+            self._link_last(entry)
+            self._entries[key] = entry
+            self.current_bytes += size
+            return True
+        finally:
+            self._lock.release()
+
+    def delete(self, key):
+        self._lock.acquire()
+        try:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._remove(entry)
+        finally:
+            self._lock.release()
+
+    def clear(self):
+        self._lock.acquire()
+        try:
+            self._entries.clear()
+            self._root[:] = [self._root, self._root, None, None, 0]
+            self.current_bytes = 0
+        finally:
+            self._lock.release()
+
+    def stats(self):
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes}
@@ -0,0 +1,65 @@
+
+import unittest
+
+import lrucache
+
+
+class LRUCacheTest(unittest.TestCase):
+
+    def test_get_and_set(self):
+        cache = lrucache.LRUCache(100)
+        self.assertEquals(cache.get("a"), None)
+        self.assertEquals(cache.get("a", 42), 42)
+        cache.set("a", "value", 10)
+        self.assertEquals(cache.get("a"), "value")
+        self.assertEquals(cache.hits, 1)
+        self.assertEquals(cache.misses, 2)
+        self.assertEquals(cache.current_bytes, 10)
+
+    def test_replace_updates_size(self):
+        cache = lrucache.LRUCache(100)
+        cache.set("a", 1, 10)
+        cache.set("a", 2, 30)
+        self.assertEquals(len(cache), 1)
+        self.assertEquals(cache.current_bytes, 30)
+        self.assertEquals(cache.get("a"), 2)
+
+    def test_evicts_least_recently_used_by_size(self):
+        cache = lrucache.LRUCache(100)
+        cache.set("a", 1, 40)
+        cache.set("b", 2, 40)
+        cache.get("a")
+        cache.set("c", 3, 40)
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        self.assertEquals(cache.evictions, 1)
+        self.assertEquals(cache.current_bytes, 80)
+        # One large entry can push out several small ones.
+        cache.set("d", 4, 100)
+        self.assertEquals(sorted(cache._entries.keys()), ["d"])
+        self.assertEquals(cache.evictions, 3)
+
+    def test_oversized_values_are_not_stored(self):
+        cache = lrucache.LRUCache(100)
+        cache.set("a", 1, 10)
+        self.assertEquals(cache.set("b", 2, 101), False)
+        assert "a" in cache
+        assert "b" not in cache
+
+    def test_delete_and_clear(self):
+        cache = lrucache.LRUCache(100)
+        cache.set("a", 1, 10)
+        cache.set("b", 2, 10)
+        cache.delete("a")
+        cache.delete("missing")
+        self.assertEquals(cache.current_bytes, 10)
+        cache.clear()
+        self.assertEquals(len(cache), 0)
+        self.assertEquals(cache.current_bytes, 0)
+        cache.set("c", 3, 10)
+        self.assertEquals(cache.get("c"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,55 +4,114 @@ from google.appengine.api import memcache
 from google.appengine.api import urlfetch
 from google.appengine.ext import webapp
 from google.appengine.ext.webapp.util import run_wsgi_app
+import cdnproxy
+import executor
 import simplejson
 import traceback
 import tutorial
+import webservice
+
+
+# Lets instances share the compiled code of common submissions.
+tutorial.code_cache.set_memcache(memcache)
+
+# Runs submissions in worker processes with time and memory limits,
+# where the platform allows it.  App Engine does not, and has its own
+# per-request deadline instead.
+if executor.can_fork:
+    job_executor = executor.ProcessPoolExecutor(tutorial.TutorialWebService)
+else:
+    job_executor = executor.InlineExecutor(tutorial.TutorialWebService)
+
+
+CDN_BASE_URL = "http://ajax.googleapis.com/ajax/libs/"
+
+
+def fetch_from_cdn(url, headers):
+    try:
+        response = urlfetch.fetch(url, headers=headers)
+    except urlfetch.Error, exn:
+        raise cdnproxy.FetchError(str(exn))
+    response_headers = dict((name.lower(), value)
+                            for name, value in response.headers.items())
+    return response.status_code, response_headers, response.content
+
+
+cdn_cache = cdnproxy.ProxyCache(fetch_from_cdn, max_bytes=4 * 1024 * 1024,
+                                memcache=memcache)
 
 
 class CdnProxy(webapp.RequestHandler):
 
     def get(self, rel_url):
-        url = "http://ajax.googleapis.com/ajax/libs/" + rel_url
-        data = memcache.get(url)
-        if data is None:
-            response = urlfetch.fetch(url)
-            if response.status_code == 200:
-                data = {"url": url,
-                        "body": response.content,
-                        "content_type": response.headers["Content-Type"],
-                        "result": 200}
-            else:
-                # We put failures into the cache too, to prevent
-                # spinning failures
-                data = {"url": url,
-                        "result": result.status_code}
-            memcache.set(key=url, value=data)
-        if data["result"] == 200:
+        entry = cdn_cache.get(CDN_BASE_URL + rel_url)
+        if entry["result"] == 200:
             self.response.headers.add_header("Content-Type",
-                                             data["content_type"])
-            self.response.out.write(data["body"])
+                                             entry["content_type"])
+            self.response.out.write(entry["body"])
+        else:
+            self.error(entry["result"])
 
 
 class WebService(webapp.RequestHandler):
 
+    # The body is either a single {"method": ..., "params": [...]} call,
+    # answered with its result, or a list of such calls (a batch),
+    # answered with a list of their results in the same order.  The
+    # calls in a batch run concurrently, and one that is not valid gets
+    # an error in its place.
+
     def post(self):
         string = self.request.body.decode("utf-8")
         json = simplejson.loads(string)
-        assert not json[u"method"].startswith(u"_"), json[u"method"]
-        handler = tutorial.TutorialWebService()
-        method = getattr(handler, json[u"method"].encode("ascii"))
-        result = method(*json[u"params"])
         self.response.headers.add_header("Content-Type", 
                                          "application/json; charser=utf-8")
-        self.response.out.write(simplejson.dumps(result).encode("utf-8"))
+        if isinstance(json, list):
+            try:
+                text = webservice.get_batch_text(job_executor, json)
+            except ValueError, exn:
+                self.error(400)
+                self.response.out.write(webservice.get_result_text(
+                        unicode(exn)))
+                return
+            self.response.out.write(text)
+        else:
+            method, params = webservice.get_call(json)
+            try:
+                result = job_executor.call(method, params)
+            except executor.JobError, exn:
+                result = exn
+            self.response.out.write(webservice.get_result_text(result))
+
 
+def stream_web_service(environ, start_response):
+    # Takes a single call like WebService and answers with its output,
+    # sent as the program prints it, and then its result or error, in
+    # the lines described by webservice.iter_stream_lines().  This is
+    # plain WSGI because webapp buffers the whole response.  App Engine
+    # buffers it too, so there the output arrives all at once, but it
+    # is still limited in size.
+    length = int(environ.get("CONTENT_LENGTH") or 0)
+    string = environ["wsgi.input"].read(length).decode("utf-8")
+    method, params = webservice.get_call(simplejson.loads(string))
+    start_response("200 OK", [("Content-Type", "text/plain; charset=utf-8"),
+                              ("Cache-Control", "no-cache")])
+    return webservice.iter_stream_lines(job_executor, method, params)
 
-application = webapp.WSGIApplication([
+
+web_service_application = webapp.WSGIApplication([
         ("/ws", WebService),
         ("/cdn/(.*)", CdnProxy),
         ], debug=True)
 
 
+def application(environ, start_response):
+    if (environ.get("PATH_INFO") == "/ws/stream" and
+        environ.get("REQUEST_METHOD") == "POST"):
+        return stream_web_service(environ, start_response)
+    return web_service_application(environ, start_response)
+
+
 def main():
     run_wsgi_app(application)
 
@@ -0,0 +1,93 @@
+import glob
+import hashlib
+import os
+import sys
+import pyparser
+from pyparser.pythonparse import make_pyparser
+from pyparser.pythonutil import get_grammar_file
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+# Building the parser from the grammar file with pypy's EBNF parser is
+# most of the cost of importing fakeparser, which App Engine does on
+# the first request of every new instance.  So the build pickles the
+# finished parser (its rules, first sets and token and symbol numbers)
+# next to this module, and the snapshot is loaded instead when it was
+# made from the same grammar file and pyparser modules by the same
+# format.  The snapshot holds only the grammar's own numbering, which
+# does not depend on the Python version that wrote it; the mapping to
+# the running Python's symbol and token numbers is left to fakeparser.
+
+# Bump when the contents of the snapshot file change.  Changes to
+# pyparser are caught by the digest.
+FORMAT = 1
+DEFAULT_DIR = os.path.dirname(os.path.abspath(__file__))
+PYPARSER_DIR = os.path.dirname(os.path.abspath(pyparser.__file__))
+
+
+def get_snapshot_path(version, directory=DEFAULT_DIR):
+    return os.path.join(directory, "parser-%s.pickle" % version)
+
+
+def _get_digest(version):
+    # A digest of the grammar file and of pyparser's modules, whose
+    # classes the snapshot pickles.  Also returns the version that
+    # "native" stands for.
+    gramfile, grammar_version = get_grammar_file(version)
+    paths = [gramfile] + sorted(glob.glob(os.path.join(PYPARSER_DIR,
+                                                       "*.py")))
+    digest = hashlib.sha1()
+    for path in paths:
+        fh = open(path, "rb")
+        try:
+            data = fh.read()
+        finally:
+            fh.close()
+        digest.update("%s %i\n" % (os.path.basename(path), len(data)))
+        digest.update(data)
+    return grammar_version, digest.hexdigest()
+
+
+def write_snapshot(version, directory=DEFAULT_DIR):
+    grammar_version, digest = _get_digest(version)
+    parser = make_pyparser(version)
+    path = get_snapshot_path(grammar_version, directory)
+    temp_path = path + ".tmp"
+    fh = open(temp_path, "wb")
+    try:
+        pickle.dump((FORMAT, digest, parser), fh, 2)
+    finally:
+        fh.close()
+    os.rename(temp_path, path)
+    return path
+
+
+def _read_snapshot(path):
+    fh = open(path, "rb")
+    try:
+        return pickle.load(fh)
+    finally:
+        fh.close()
+
+
+def load_parser(version="native", directory=DEFAULT_DIR):
+    grammar_version, digest = _get_digest(version)
+    try:
+        snapshot = _read_snapshot(get_snapshot_path(grammar_version,
+                                                    directory))
+    except Exception:
+        # Missing, or written by other versions of the parser code.
+        snapshot = None
+    if (isinstance(snapshot, tuple) and len(snapshot) == 3 and
+        snapshot[:2] == (FORMAT, digest)):
+        return snapshot[2]
+    return make_pyparser(version)
+
+
+if __name__ == "__main__":
+    for version in sys.argv[1:] or ["native"]:
+        print write_snapshot(version)
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pyparser.tuplebuilder import TupleBuilder
+import parsersnapshot
+
+
+SOURCE = """\
+def f(x, *args):
+    if x:
+        return [y for y in args if y]
+    while False:
+        print x, 'a' + "b"
+"""
+
+
+def parse(parser):
+    builder = TupleBuilder(parser)
+    parser.parse_source(SOURCE, "exec", builder)
+    return builder.stack[-1].as_tuple(True)
+
+
+class ParserSnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="parsersnapshot-test--")
+        self.path = parsersnapshot.write_snapshot("native", self.dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_snapshot_parses_like_a_new_parser(self):
+        parser = parsersnapshot.load_parser("native", self.dir)
+        self.assertEquals(parse(parser),
+                          parse(parsersnapshot.make_pyparser("native")))
+        self.assertEquals(parsersnapshot.load_parser("native",
+                                                     self.dir).symbols,
+                          parser.symbols)
+
+    def test_unusable_snapshots_are_ignored(self):
+        expected = parse(parsersnapshot.make_pyparser("native"))
+        fh = open(self.path, "rb")
+        try:
+            data = fh.read()
+        finally:
+            fh.close()
+        for damaged in (data[:len(data) // 2], "junk", ""):
+            fh = open(self.path, "wb")
+            try:
+                fh.write(damaged)
+            finally:
+                fh.close()
+            self.assertEquals(parse(parsersnapshot.load_parser("native",
+                                                               self.dir)),
+                              expected)
+        # Nor are those of another format, grammar or pyparser.
+        digest = parsersnapshot._get_digest("native")[1]
+        for snapshot in [(parsersnapshot.FORMAT + 1, digest, "parser"),
+                         (parsersnapshot.FORMAT, "0" * 40, "parser")]:
+            fh = open(self.path, "wb")
+            try:
+                parsersnapshot.pickle.dump(snapshot, fh, 2)
+            finally:
+                fh.close()
+            parser = parsersnapshot.load_parser("native", self.dir)
+            self.assertEquals(parse(parser), expected)
+        os.remove(self.path)
+        self.assertEquals(parse(parsersnapshot.load_parser("native",
+                                                           self.dir)),
+                          expected)
+
+    def test_digest_covers_pyparser_modules(self):
+        copy_dir = os.path.join(self.dir, "pyparser")
+        os.mkdir(copy_dir)
+        for name in os.listdir(parsersnapshot.PYPARSER_DIR):
+            if name.endswith(".py"):
+                shutil.copy(os.path.join(parsersnapshot.PYPARSER_DIR, name),
+                            copy_dir)
+        digest = parsersnapshot._get_digest("native")
+        old_dir = parsersnapshot.PYPARSER_DIR
+        parsersnapshot.PYPARSER_DIR = copy_dir
+        try:
+            self.assertEquals(parsersnapshot._get_digest("native"), digest)
+            fh = open(os.path.join(copy_dir, "grammar.py"), "a")
+            try:
+                fh.write("\n# changed\n")
+            finally:
+                fh.close()
+            self.assertNotEquals(parsersnapshot._get_digest("native"),
+                                 digest)
+        finally:
+            parsersnapshot.PYPARSER_DIR = old_dir
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -32,6 +32,79 @@ var write_out = function(output)
 };
 
 
+var stream_execute = function(code, handlers)
+{
+    /*
+     * Runs code through /ws/stream, which answers with one JSON object
+     * per line: {"output": text} for each piece of output as the
+     * program prints it, then {"result": value} or {"error": message}.
+     * Each is passed to handlers.frame as soon as its line is complete.
+     * If the server has no such service, handlers.unavailable is
+     * called instead.
+     */
+    if (typeof XMLHttpRequest == "undefined")
+	{
+	    handlers.unavailable();
+	    return;
+	}
+    var request = new XMLHttpRequest();
+    var seen = 0;
+    var finished = false;
+    var read_lines = function()
+    {
+	var text = request.responseText;
+	var end = text.indexOf("\n", seen);
+	while (end != -1)
+	    {
+		var frame = dojo.fromJson(text.substring(seen, end));
+		seen = end + 1;
+		if (typeof frame.output == "undefined")
+		    {
+			finished = true;
+		    }
+		handlers.frame(frame);
+		end = text.indexOf("\n", seen);
+	    }
+    };
+    request.onreadystatechange = function()
+    {
+	if (request.readyState < 3)
+	    {
+		return;
+	    }
+	try
+	    {
+		var status = request.status;
+	    }
+	catch (e)
+	    {
+		/* Some browsers only have it once the request is done. */
+		return;
+	    }
+	if (status == 404 || status == 405)
+	    {
+		if (request.readyState == 4)
+		    {
+			handlers.unavailable();
+		    }
+		return;
+	    }
+	if (status == 200)
+	    {
+		read_lines();
+	    }
+	if (request.readyState == 4 && !finished)
+	    {
+		handlers.frame({"error": "The connection to the server was " +
+				"lost (status " + status + ")."});
+	    }
+    };
+    request.open("POST", "/ws/stream", true);
+    request.setRequestHeader("Content-Type", "application/json");
+    request.send(dojo.toJson({"method": "execute", "params": [code]}));
+};
+
+
 var emulate_onhashchange = function()
 {
     /*
@@ -210,11 +283,15 @@ var init = function()
     dojo.xhrGet(params).addCallback(cb);
     var codemirror_base = "/static/codemirror";
     var codemirror_python = codemirror_base + "/contrib/python";
-    var editor = new CodeMirror(document.getElementById("code-box"), {
+    // The build bundles client.js with CodeMirror, and sets
+    // codemirror_bundle to load the editor's files as one bundle.
+    var codemirror_files = window.codemirror_bundle || {
 	    path: codemirror_base + "/js/",
 	    parserfile: "../contrib/python/js/parsepython.js",
-	    stylesheet: codemirror_python + "/css/pythoncolors.css",
-	});
+	    stylesheet: codemirror_python + "/css/pythoncolors.css"
+	};
+    var editor = new CodeMirror(document.getElementById("code-box"),
+				codemirror_files);
     var execute = function()
     {
 	var code = editor.getCode();
@@ -224,7 +301,31 @@ var init = function()
 	italics_span.style.fontStyle = "italic";
 	output.appendChild(italics_span);
 	set_text(italics_span, "Executing, please wait...");
-	ws.execute(code).addCallback(write_out);
+	var started = false;
+	var frame = function(frame)
+	{
+	    if (!started)
+		{
+		    clear_element(output);
+		    started = true;
+		}
+	    if (typeof frame.output != "undefined")
+		{
+		    output.appendChild(document.createTextNode(frame.output));
+		}
+	    else if (typeof frame.error != "undefined")
+		{
+		    var error_span = document.createElement("span");
+		    error_span.className = "error";
+		    set_text(error_span, frame.error);
+		    output.appendChild(error_span);
+		}
+	};
+	var unavailable = function()
+	{
+	    ws.execute(code).addCallback(write_out);
+	};
+	stream_execute(code, {"frame": frame, "unavailable": unavailable});
     };
     document.getElementById("execute-button").onclick = execute;
     var fill_in_example = function()
@@ -1,26 +1,75 @@
 
 from StringIO import StringIO
 import cappython.safeeval as safeeval
+import executor
 import fakeparser as parser
 import functools
+import hashlib
+import imp
+import lrucache
+import marshal
 import pypybits.transformer as transformer
 import sourcecodegen
 import symbol
+import sys
 import token
 import traceback
 
 
+def _record_child(frame, index, old, new):
+    # Copies the frame's node only once one of its children changes.
+    # A new child of None drops the child.
+    if frame[2] is None:
+        if new is old:
+            return
+        frame[2] = list(frame[0][:index])
+    if new is not None:
+        frame[2].append(new)
+
+
+def rewrite_tree(tree, rewrite):
+    # Applies rewrite() to the nodes of a parse tree, top-down.  It
+    # returns the node itself to leave it alone and look at its
+    # children, or else a replacement, or None to drop the node.  Only
+    # the nodes on the path to a replaced node are copied; the rest of
+    # the tree is shared with the original.  The walk uses an explicit
+    # stack so that deeply nested code does not hit the recursion
+    # limit.
+    result = rewrite(tree)
+    if result is not tree or type(tree[1]) is not tuple:
+        return result
+    # Each frame is [node, index of next child, copied contents or None].
+    stack = [[tree, 1, None]]
+    while True:
+        frame = stack[-1]
+        node, index, copied = frame
+        if index < len(node):
+            frame[1] = index + 1
+            child = node[index]
+            new_child = rewrite(child)
+            if new_child is child and type(child[1]) is tuple:
+                stack.append([child, 1, None])
+            else:
+                _record_child(frame, index, child, new_child)
+            continue
+        stack.pop()
+        if copied is not None:
+            result = tuple(copied)
+        else:
+            result = node
+        if len(stack) == 0:
+            return result
+        parent = stack[-1]
+        _record_child(parent, parent[1] - 1, node, result)
+
+
 def _replace_node(pattern, node_type, replacement):
-    if pattern[0] == node_type:
-        return replacement
-    if type(pattern[1]) is tuple:
-        replacements = list(_replace_node(t, node_type, replacement) 
-                            for t in pattern[1:])
-        # replacement of None requests that the node is dropped
-        return tuple([pattern[0]] + list(r for r in replacements
-                                         if r is not None))
-    else:
-        return pattern
+    # replacement of None requests that the node is dropped
+    def rewrite(node):
+        if node[0] == node_type:
+            return replacement
+        return node
+    return rewrite_tree(pattern, rewrite)
 
 
 def _find_nodes(tree, node_type):
@@ -44,48 +93,63 @@ __repace_me__(__replace_me_too__)
 """), line_info=1), symbol.expr_stmt))
 
 
+PRINT_FUNCTION_NAMES = {(False, False): "__print__",
+                        (True, False): "__print_file__",
+                        (False, True): "__print_comma__",
+                        (True, True): "__print_file_comma__"}
+
+
+def _convert_print_stmt(parsed, names=PRINT_FUNCTION_NAMES):
+    if len(parsed) > 2 and parsed[2][0] == token.RIGHTSHIFT:
+        has_file = True
+        children = parsed[3:]
+    else:
+        has_file = False
+        children = parsed[2:]
+    args = []
+    for index, child in enumerate(children):
+        if index % 2 == 0:
+            args.append((symbol.argument, child))
+        else:
+            assert child[0] == token.COMMA, child[0]
+            args.append(child)
+    if len(args) == 0:
+        has_comma = False
+        arglist = None
+    else:
+        if len(args) % 2 == 0:
+            has_comma = True
+            args = args[:-1]
+        else:
+            has_comma = False
+        arglist = tuple([symbol.arglist] + args)
+    name_node = (token.NAME, names[(has_file, has_comma)], 1)
+    return _replace_node(_replace_node(EXPR_TEMPLATE, token.NAME,
+                                       name_node), 
+                         symbol.arglist, arglist)
+
+
+# Suitable as the convert argument of fakeparser.ast2tuple(), which
+# applies it to each node while renumbering the tree.
+def convert_print_node(node):
+    if node[0] == symbol.print_stmt:
+        return _convert_print_stmt(node)
+    return node
+
+
 def convert_print_statments(parsed, name="__print__",
                             file="__print_file__",
                             comma="__print_comma__",
                             file_comma="__print_file_comma__"):
-    func_name = name
-    if type(parsed[1]) is tuple:
-        if parsed[0] == symbol.print_stmt:
-            names = {(False, False): name,
-                     (True, False): file,
-                     (False, True): comma,
-                     (True, True): file_comma}
-            if len(parsed) > 2 and parsed[2][0] == token.RIGHTSHIFT:
-                has_file = True
-                children = parsed[3:]
-            else:
-                has_file = False
-                children = parsed[2:]
-            args = []
-            for index, child in enumerate(children):
-                if index % 2 == 0:
-                    args.append((symbol.argument, child))
-                else:
-                    assert child[0] == token.COMMA, child[0]
-                    args.append(child)
-            if len(args) == 0:
-                has_comma = False
-                arglist = None
-            else:
-                if len(args) % 2 == 0:
-                    has_comma = True
-                    args = args[:-1]
-                else:
-                    has_comma = False
-                arglist = tuple([symbol.arglist] + args)
-            name_node = (token.NAME, names[(has_file, has_comma)], 1)
-            return _replace_node(_replace_node(EXPR_TEMPLATE, token.NAME,
-                                               name_node), 
-                                 symbol.arglist, arglist)
-        return tuple([parsed[0]] + list(convert_print_statments(t, name) 
-                                        for t in parsed[1:]))
-    else:
-        return parsed
+    names = {(False, False): name,
+             (True, False): file,
+             (False, True): comma,
+             (True, True): file_comma}
+    def rewrite(node):
+        if node[0] == symbol.print_stmt:
+            return _convert_print_stmt(node, names)
+        return node
+    return rewrite_tree(parsed, rewrite)
 
 
 
@@ -103,13 +167,12 @@ def crazy_print(get_default_fh, fh, extra_comma, *args):
 
 def transforming_parser(code):
     assert type(code) is str
-    print_stmt_tree = parser.ast2tuple(parser.suite(code), line_info=1)
-    print_func_tree = convert_print_statments(print_stmt_tree)
+    print_func_tree = parser.ast2tuple(parser.suite(code), line_info=1,
+                                       convert=convert_print_node)
     return transformer.Transformer().transform(print_func_tree)
 
 
-def run_with_emulated_print(code):
-    data = StringIO()
+def emulated_print_environment(data):
     env = safeeval.safe_environment()
     env.set_importer(no_imports)
     printer = functools.partial(crazy_print, lambda: data)
@@ -117,10 +180,186 @@ def run_with_emulated_print(code):
     env.bind("__print_file__", lambda f, *a: printer(f, False, *a))
     env.bind("__print_comma__", lambda *a: printer(None, True, *a))
     env.bind("__print_file_comma__", lambda f, *a: printer(f, True, *a))
+    return env
+
+
+# Returns (generated_code, code_object, source_map).  A plain tuple so
+# that it can be marshalled into memcache.  Where the runtime allows it,
+# the parse tree is compiled directly and generated_code and source_map
+# are None; otherwise it is turned back into source code which is
+# parsed again and compiled, and source_map relates the lines of that
+# to the lines of the submitted code.
+def compile_with_emulated_print(code, env):
     parsed = transforming_parser(code)
-    generated_code = sourcecodegen.generate_code(parsed)
-    safeeval.safe_eval(generated_code, env)
-    return data.getvalue().decode("utf-8")
+    if safeeval.can_compile_trees:
+        return (None,
+                safeeval.safe_compile_tree(parsed, env, source_code=code),
+                None)
+    generated_code, source_map = sourcecodegen.generate_code(
+        parsed, source_map=True)
+    return (generated_code, safeeval.safe_compile(generated_code, env),
+            source_map)
+
+
+# Formats the exception being handled, as traceback.format_exc() does,
+# but with the program's lines (those in "<string>") taken from the
+# submitted code, after mapping them back to it through source_map if
+# the program was compiled from generated code.
+def format_program_error(code, source_map):
+    exc_type, exc_value, tb = sys.exc_info()
+    entries = traceback.extract_tb(tb)
+    lines = code.splitlines()
+    for index, (filename, lineno, name, line) in enumerate(entries):
+        if filename != "<string>":
+            continue
+        if source_map is not None:
+            lineno = sourcecodegen.map_line(source_map, lineno)
+        if lineno is not None and 0 < lineno <= len(lines):
+            line = lines[lineno - 1].strip()
+        entries[index] = (filename, lineno, name, line)
+    text = "".join(["Traceback (most recent call last):\n"] +
+                   traceback.format_list(entries) +
+                   traceback.format_exception_only(exc_type, exc_value))
+    return text.decode("utf-8", "replace")
+
+
+class ProgramError(Exception):
+
+    # Raised by run_with_emulated_print() when the program fails.  The
+    # message is the formatted traceback of the original exception.
+
+    pass
+
+
+class CodeCache(object):
+
+    # Maps a digest of submitted code to the result of
+    # compile_with_emulated_print(), so that repeated submissions skip
+    # parsing, print rewriting, verification and compilation.  The
+    # in-process tier is an LRU bounded by the marshalled size of the
+    # entries.  If a memcache client is given it is used as a second,
+    # shared tier.  Code that fails to compile or verify is not cached.
+
+    def __init__(self, max_bytes, memcache=None, max_memcache_bytes=1000000):
+        self._local = lrucache.LRUCache(max_bytes)
+        self._memcache = memcache
+        self._max_memcache_bytes = max_memcache_bytes
+        # Marshalled code is specific to the bytecode version and is
+        # only as good as the verifier that passed it.  Entries have
+        # held source maps since format 2.
+        self._prefix = "code2:%s:%s:" % (imp.get_magic().encode("hex"),
+                                         safeeval.CHECKER_VERSION)
+        self.memcache_hits = 0
+        self.memcache_misses = 0
+
+    def set_memcache(self, memcache):
+        self._memcache = memcache
+
+    def _get_key(self, code):
+        return self._prefix + hashlib.sha1(code).hexdigest()
+
+    def get_or_compile(self, code, compile_func):
+        key = self._get_key(code)
+        compiled = self._local.get(key)
+        if compiled is not None:
+            return compiled
+        data = None
+        if self._memcache is not None:
+            data = self._memcache.get(key)
+            if data is None:
+                self.memcache_misses += 1
+            else:
+                self.memcache_hits += 1
+                compiled = marshal.loads(data)
+        if compiled is None:
+            compiled = compile_func()
+            try:
+                data = marshal.dumps(compiled)
+            except ValueError:
+                # Jython cannot marshal its code objects.
+                return compiled
+            if (self._memcache is not None and
+                len(data) <= self._max_memcache_bytes):
+                self._memcache.set(key, data)
+        self._local.set(key, compiled, len(key) + len(data))
+        return compiled
+
+    def stats(self):
+        stats = self._local.stats()
+        stats["memcache_hits"] = self.memcache_hits
+        stats["memcache_misses"] = self.memcache_misses
+        return stats
+
+
+code_cache = CodeCache(max_bytes=8 * 1024 * 1024)
+
+
+class LimitedOutput(object):
+
+    # File-like sink for a program's printed output.  It keeps at most
+    # max_bytes of it, after which it notes that the output was
+    # truncated and drops the rest.  If on_chunk is given, output is
+    # passed to it (as unicode) in pieces of about chunk_bytes as the
+    # program runs, and is not kept here.  Each write is expected to be
+    # whole UTF-8 characters, which is what crazy_print() produces.
+
+    def __init__(self, max_bytes, on_chunk=None, chunk_bytes=4096):
+        self.max_bytes = max_bytes
+        self.bytes_written = 0
+        self.truncated = False
+        self._on_chunk = on_chunk
+        self._chunk_bytes = chunk_bytes
+        self._pending = []
+        self._pending_bytes = 0
+
+    def write(self, data):
+        if self.truncated:
+            return
+        if (self.max_bytes is not None and
+            self.bytes_written + len(data) > self.max_bytes):
+            data = data[:self.max_bytes - self.bytes_written]
+            # Don't leave half a character at the end.
+            data = data.decode("utf-8", "ignore").encode("utf-8")
+            data += "\n[Output truncated after %i bytes]\n" % self.max_bytes
+            self.truncated = True
+        self.bytes_written += len(data)
+        self._pending.append(data)
+        self._pending_bytes += len(data)
+        if self._pending_bytes >= self._chunk_bytes or self.truncated:
+            self.flush()
+
+    def flush(self):
+        if self._on_chunk is not None and self._pending_bytes > 0:
+            chunk = self.getvalue()
+            self._pending = []
+            self._pending_bytes = 0
+            self._on_chunk(chunk)
+
+    def getvalue(self):
+        return "".join(self._pending).decode("utf-8")
+
+
+MAX_OUTPUT_BYTES = 1024 * 1024
+
+
+def run_with_emulated_print(code, code_cache=None,
+                            max_output_bytes=MAX_OUTPUT_BYTES, on_output=None):
+    data = LimitedOutput(max_output_bytes, on_output)
+    env = emulated_print_environment(data)
+    if code_cache is None:
+        compiled = compile_with_emulated_print(code, env)
+    else:
+        compiled = code_cache.get_or_compile(
+            code, lambda: compile_with_emulated_print(code, env))
+    generated_code, code_object, source_map = compiled
+    try:
+        try:
+            safeeval.safe_run(code_object, env)
+        except Exception:
+            raise ProgramError(format_program_error(code, source_map))
+    finally:
+        data.flush()
+    return data.getvalue()
 
 
 def run_straight_cappython(code):
@@ -139,9 +378,26 @@ def run_straight_cappython(code):
 
 class TutorialWebService(object):
 
+    # If write is given, execute() passes the program's output to it as
+    # the program runs and returns u"" once it is done, or raises
+    # JobError with the error message if the program failed.
+
+    def __init__(self, code_cache=code_cache,
+                 max_output_bytes=MAX_OUTPUT_BYTES, write=None):
+        self._code_cache = code_cache
+        self._max_output_bytes = max_output_bytes
+        self._write = write
+
     def execute(self, code):
         code = unicode(code).encode("utf-8") + "\n"
         try:
-            return run_with_emulated_print(code).decode("utf-8")
+            return run_with_emulated_print(code, self._code_cache,
+                                           self._max_output_bytes,
+                                           self._write)
+        except ProgramError, e:
+            error = e.args[0]
         except Exception, e:
-            return unicode(traceback.format_exc())
+            error = unicode(traceback.format_exc())
+        if self._write is not None:
+            raise executor.JobError(error)
+        return error
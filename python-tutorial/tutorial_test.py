@@ -9,7 +9,8 @@ import tempfile
 import shutil
 from pprint import pformat
 from StringIO import StringIO
-import safeeval2 as safeeval
+import cappython.safeeval as safeeval
+import executor
 
 import tutorial
 
@@ -110,6 +111,31 @@ __print__(a, 1, repr(z))
                 raise
 
 
+class TestRewriteTree(unittest.TestCase):
+
+    def test_only_copies_changed_paths(self):
+        tree = parser.ast2tuple(parser.suite("""\
+if x:
+    print y
+z = [1, 2, 3]
+"""), line_info=1)
+        converted = tutorial.convert_print_statments(tree)
+        assert "__print__" in str(converted[1])
+        assert "__print__" not in str(tree)
+        # The statement without a print in it is shared, not copied.
+        assert converted[2] is tree[2], (converted[2], tree[2])
+        assert converted[1] is not tree[1]
+        self.assertEquals(tutorial.convert_print_statments(converted),
+                          converted)
+
+    def test_dropping_nodes(self):
+        tree = (1, (2, "a"), (3, (2, "b"), (4, "c")))
+        self.assertEquals(tutorial._replace_node(tree, 2, None),
+                          (1, (3, (4, "c"))))
+        self.assertEquals(tutorial._replace_node(tree, 4, (5, "d")),
+                          (1, (2, "a"), (3, (2, "b"), (5, "d"))))
+
+
 def run_with_real_print(code):
     child = subprocess.Popen([sys.executable, "-c", code], 
                              stdout=subprocess.PIPE)
@@ -133,5 +159,122 @@ print "hello, world"
             self.assertEquals(actual, expected)
 
 
+class TestLimitedOutput(unittest.TestCase):
+
+    def test_keeps_output(self):
+        output = tutorial.LimitedOutput(max_bytes=100)
+        output.write("hello\n")
+        output.write("world\n")
+        output.flush()
+        self.assertEquals(output.getvalue(), u"hello\nworld\n")
+        self.assertFalse(output.truncated)
+
+    def test_truncates(self):
+        output = tutorial.LimitedOutput(max_bytes=8)
+        output.write("hello\n")
+        output.write(u"w\u00f6rld\n".encode("utf-8"))
+        output.write("more\n")
+        assert output.truncated
+        # The cut falls inside the two-byte character, which is dropped.
+        self.assertEquals(output.getvalue(),
+                          u"hello\nw\n[Output truncated after 8 bytes]\n")
+
+    def test_chunks(self):
+        chunks = []
+        output = tutorial.LimitedOutput(max_bytes=None, on_chunk=chunks.append,
+                                        chunk_bytes=10)
+        for i in range(5):
+            output.write("line %i\n" % i)
+        self.assertEquals(chunks, [u"line 0\nline 1\n", u"line 2\nline 3\n"])
+        output.flush()
+        self.assertEquals(chunks[-1], u"line 4\n")
+        self.assertEquals(output.getvalue(), u"")
+
+    def test_execute_streams_and_limits_output(self):
+        chunks = []
+        service = tutorial.TutorialWebService(code_cache=None,
+                                              max_output_bytes=20,
+                                              write=chunks.append)
+        result = service.execute(u"for i in range(10):\n    print 'line', i")
+        self.assertEquals(result, u"")
+        self.assertEquals(u"".join(chunks),
+                          u"line 0\nline 1\nline 2\n"
+                          u"[Output truncated after 20 bytes]\n")
+        del chunks[:]
+        try:
+            service.execute(u"print 1\nprint undefined")
+        except executor.JobError, exn:
+            assert "NameError" in unicode(exn), unicode(exn)
+        else:
+            self.fail("Expected JobError")
+        self.assertEquals(chunks, [u"1\n"])
+
+    def test_errors_refer_to_submitted_lines(self):
+        service = tutorial.TutorialWebService(code_cache=None)
+        result = service.execute(u"def f(x):\n\n    return [x,\n"
+                                 u"            1 / x]\n"
+                                 u"print 'ok'\nprint f(\n  0)")
+        assert result.startswith(u"Traceback"), result
+        self.assertEquals(result.splitlines()[-5:], [
+            u'  File "<string>", line 6, in <module>',
+            u"    print f(",
+            u'  File "<string>", line 3, in f',
+            u"    return [x,",
+            u"ZeroDivisionError: integer division or modulo by zero"])
+
+
+class FakeMemcache(object):
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+class TestCodeCache(unittest.TestCase):
+
+    def test_repeated_code_is_compiled_once(self):
+        compiled = []
+        def compile_func():
+            compiled.append(1)
+            return ("x = 1\n", compile("x = 1\n", "<string>", "exec"))
+        cache = tutorial.CodeCache(max_bytes=100000)
+        first = cache.get_or_compile("x = 1\n", compile_func)
+        second = cache.get_or_compile("x = 1\n", compile_func)
+        self.assertEquals(len(compiled), 1)
+        assert first is second
+        stats = cache.stats()
+        self.assertEquals((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_memcache_tier(self):
+        memcache = FakeMemcache()
+        cache1 = tutorial.CodeCache(max_bytes=100000, memcache=memcache)
+        cache2 = tutorial.CodeCache(max_bytes=100000, memcache=memcache)
+        code = "print 'hello'\n"
+        env = tutorial.emulated_print_environment(StringIO())
+        compile_func = lambda: tutorial.compile_with_emulated_print(code, env)
+        generated_code, code_object, source_map = cache1.get_or_compile(
+            code, compile_func)
+        self.assertEquals(len(memcache.data), 1)
+        def fail():
+            raise AssertionError("should have come from memcache")
+        self.assertEquals(cache2.get_or_compile(code, fail)[0], generated_code)
+        self.assertEquals(cache2.memcache_hits, 1)
+
+    def test_failures_are_not_cached(self):
+        cache = tutorial.CodeCache(max_bytes=100000)
+        service = tutorial.TutorialWebService(code_cache=cache)
+        assert "VerifyError" in service.execute(u"x.__class__")
+        assert "VerifyError" in service.execute(u"x.__class__")
+        self.assertEquals(len(cache._local), 0)
+        self.assertEquals(service.execute(u"print 1 + 1"), u"2\n")
+        self.assertEquals(service.execute(u"print 1 + 1"), u"2\n")
+        self.assertEquals(cache.stats()["hits"], 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,76 @@
+import executor
+import simplejson
+
+
+# The parts of the web service that do not depend on App Engine, so that
+# they can be tested without it.  A call is {"method": ..., "params":
+# [...]}, where the method is one of the handler's public methods.
+
+# The most calls a batch may have, and how many of them may run at once,
+# so that a batch takes its turn with other requests for the workers.
+MAX_BATCH_CALLS = 200
+MAX_BATCH_RUNNING = 2
+
+
+def get_call(json):
+    # Returns (method, params), or raises ValueError if json is not a
+    # call that may be made.
+    if not isinstance(json, dict):
+        raise ValueError("A call must be an object, not %r" % (json,))
+    method = json.get(u"method")
+    params = json.get(u"params")
+    if not isinstance(method, basestring) or method.startswith(u"_"):
+        raise ValueError("Not a method that can be called: %r" % (method,))
+    if not isinstance(params, list):
+        raise ValueError("The params must be a list, not %r" % (params,))
+    return (method.encode("ascii"), params)
+
+
+def get_result_text(result):
+    if isinstance(result, executor.JobError):
+        result = unicode(result)
+    return simplejson.dumps(result).encode("utf-8")
+
+
+def get_batch_text(job_executor, json, max_calls=MAX_BATCH_CALLS,
+                   max_running=MAX_BATCH_RUNNING):
+    # Runs the calls in the list json concurrently, and returns the list
+    # of their results in the same order.  A call that is not valid gets
+    # an error in its place rather than failing the others.  Raises
+    # ValueError if there are more than max_calls calls.
+    if len(json) > max_calls:
+        raise ValueError("A batch may have at most %i calls, not %i" %
+                         (max_calls, len(json)))
+    calls = []
+    errors = {}
+    for index, call in enumerate(json):
+        try:
+            calls.append(get_call(call))
+        except ValueError, exn:
+            errors[index] = executor.JobError(unicode(exn))
+    results = job_executor.map(calls, max_running=max_running)
+    texts = []
+    for index in range(len(json)):
+        if index in errors:
+            result = errors[index]
+        else:
+            result = results.next()
+        texts.append(get_result_text(result))
+    return "[" + ", ".join(texts) + "]"
+
+
+def iter_stream_lines(job_executor, method, params):
+    # Runs the call and yields its output as it is printed, followed by
+    # its result.  Each is a line holding a JSON object: {"output":
+    # text} for each piece of output, then {"result": value} or, if the
+    # call failed, {"error": message}.  JSON strings have their line
+    # breaks escaped, so the lines can be told apart however little of
+    # the response has arrived.
+    for kind, value in job_executor.stream(method, params):
+        if kind == "output":
+            frame = {"output": value}
+        elif isinstance(value, executor.JobError):
+            frame = {"error": unicode(value)}
+        else:
+            frame = {"result": value}
+        yield simplejson.dumps(frame) + "\n"
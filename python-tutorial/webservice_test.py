@@ -0,0 +1,130 @@
+import os
+import unittest
+
+import executor
+import simplejson
+import webservice
+
+
+class FakeHandler(object):
+
+    def __init__(self, write=None):
+        self._write = write
+
+    def chatter(self, count):
+        for i in range(count):
+            self._write(u"line %i\n" % i)
+        if count > 2:
+            raise executor.JobError(u"too much")
+        return u"done"
+
+    def pid(self):
+        return os.getpid()
+
+    def echo(self, value):
+        return value
+
+    def fail(self):
+        raise ValueError("failed")
+
+    def _private(self):
+        return u"secret"
+
+
+def call(method, *params):
+    return {u"method": method, u"params": list(params)}
+
+
+class GetCallTest(unittest.TestCase):
+
+    def test_valid(self):
+        self.assertEquals(webservice.get_call(call(u"echo", 1)),
+                          ("echo", [1]))
+
+    def test_invalid(self):
+        for json in [call(u"_private"), {u"method": u"echo"},
+                     {u"method": 1, u"params": []},
+                     {u"method": u"echo", u"params": 1}, [], u"echo",
+                     call(u"\xe9cho")]:
+            self.assertRaises(ValueError, webservice.get_call, json)
+
+
+class BatchTest(unittest.TestCase):
+
+    def get_batch(self, json, job_executor=None):
+        if job_executor is None:
+            job_executor = executor.InlineExecutor(FakeHandler)
+        return simplejson.loads(webservice.get_batch_text(job_executor,
+                                                          json))
+
+    def test_results_keep_order(self):
+        self.assertEquals(self.get_batch([call(u"echo", i)
+                                          for i in range(5)]),
+                          range(5))
+        self.assertEquals(self.get_batch([]), [])
+
+    def test_bad_calls_fail_alone(self):
+        results = self.get_batch([call(u"echo", 1), call(u"_private"),
+                                  call(u"echo", 2), 3, call(u"fail"),
+                                  call(u"missing"), call(u"echo", 4)])
+        self.assertEquals(results[0], 1)
+        assert "_private" in results[1], results[1]
+        self.assertEquals(results[2], 2)
+        assert "3" in results[3], results[3]
+        assert "ValueError: failed" in results[4], results[4]
+        assert "missing" in results[5], results[5]
+        self.assertEquals(results[6], 4)
+
+    def test_size_limit(self):
+        self.assertEquals(self.get_batch([call(u"echo", 1)] * 200),
+                          [1] * 200)
+        self.assertRaises(ValueError, self.get_batch,
+                          [call(u"echo", 1)] * 201)
+
+    def test_process_pool(self):
+        if not executor.can_fork:
+            return
+        pool = executor.ProcessPoolExecutor(FakeHandler, num_workers=3)
+        try:
+            results = self.get_batch([call(u"echo", 1), call(u"_private"),
+                                      call(u"fail"), call(u"echo", 2)],
+                                     pool)
+            self.assertEquals(results[0], 1)
+            assert "_private" in results[1], results[1]
+            assert "ValueError: failed" in results[2], results[2]
+            self.assertEquals(results[3], 2)
+            # A batch leaves some workers for other requests.
+            pids = self.get_batch([call(u"pid")] * 10, pool)
+            self.assertEquals(len(set(pids)),
+                              webservice.MAX_BATCH_RUNNING)
+        finally:
+            pool.close()
+
+
+class StreamTest(unittest.TestCase):
+
+    def get_stream(self, method, *params):
+        lines = list(webservice.iter_stream_lines(
+                executor.InlineExecutor(FakeHandler), method, params))
+        for line in lines:
+            self.assertEquals(line.count("\n"), 1)
+            assert line.endswith("\n"), line
+        return [simplejson.loads(line) for line in lines]
+
+    def test_output_then_result(self):
+        self.assertEquals(self.get_stream("chatter", 2),
+                          [{"output": u"line 0\n"}, {"output": u"line 1\n"},
+                           {"result": u"done"}])
+
+    def test_errors_are_marked(self):
+        frames = self.get_stream("chatter", 3)
+        self.assertEquals(frames[:3], [{"output": u"line %i\n" % i}
+                                       for i in range(3)])
+        self.assertEquals(frames[3], {"error": u"too much"})
+        frames = self.get_stream("fail")
+        self.assertEquals(frames[0].keys(), ["error"])
+        assert "ValueError: failed" in frames[0]["error"], frames
+
+
+if __name__ == "__main__":
+    unittest.main()
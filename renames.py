@@ -9,9 +9,16 @@
     ("pypy/lib-python/2.5.2/compiler/__init__.py", "pypybits/compiler.py"),
     ("pypy/lib-python/2.5.2/compiler/ast.py", "pypybits/ast.py"),
     ("pypy/lib-python/2.5.2/compiler/consts.py", "pypybits/compilerconsts.py"),
+    ("pypy/lib-python/2.5.2/compiler/future.py", "pypybits/future.py"),
     ("pypy/lib-python/2.5.2/compiler/misc.py", "pypybits/misc.py"),
+    ("pypy/lib-python/2.5.2/compiler/pyassem.py", "pypybits/pyassem.py"),
+    ("pypy/lib-python/2.5.2/compiler/pycodegen.py", "pypybits/pycodegen.py"),
+    ("pypy/lib-python/2.5.2/compiler/symbols.py", "pypybits/symbols.py"),
+    ("pypy/lib-python/2.5.2/compiler/syntax.py", "pypybits/syntax.py"),
     ("pypy/lib-python/2.5.2/compiler/transformer.py",
      "pypybits/transformer.py"),
+    ("pypy/lib-python/2.5.2/compiler/visitor.py",
+     "pypybits/compilervisitor.py"),
     ("pypy/pypy/interpreter/astcompiler/consts.py", "pypybits/astconsts.py"),
     ("pypy/pypy/interpreter/pyparser", "pyparser"),
     ("pypy/pypy/interpreter/stablecompiler/visitor.py", "pypybits/visitor.py"),
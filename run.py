@@ -9,24 +9,29 @@ Action "push" builds the system and pushes it to the Google App Engine servers
 
 from lxml import etree
 import contextlib
+import errno
+import gzip
+import hashlib
+import json
 import optparse
 import os
+import re
+import select
 import shutil
 import signal
+import struct
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import yaml
 
-def replace(source, destination):
-    if not os.path.exists(os.path.dirname(destination)):
-        os.makedirs(os.path.dirname(destination))
-    if os.path.isdir(source):
-        subprocess.check_call(["rsync", "-q", "-a", source.rstrip("/") + "/",
-                               destination.rstrip("/") + "/"])
-    else:
-        subprocess.check_call(["rsync", "-q", source, destination])
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
 
 def get1(items):
     items = list(items)
@@ -47,37 +52,459 @@ def read_file(path):
         fh.close()
 
 def write_file(path, data):
+    # Replaces rather than overwrites the file, which may be a hard link
+    # to a source file (see _stage()).
+    if os.path.exists(path):
+        os.remove(path)
     fh = open(path, "wb")
     try:
         fh.write(data)
     finally:
         fh.close()
 
-def _build_python(target_dir):
-    assert not os.path.exists(target_dir), target_dir
-    source_dir = os.path.dirname(os.path.abspath(__file__))
+@contextlib.contextmanager
+def timed(stage):
+    start = time.time()
+    yield
+    print "%s: %.3fs" % (stage, time.time() - start)
+
+def _list_tree(source, rel_dest, sources, source_dirs):
+    # Adds the files under source to sources, at their paths under
+    # rel_dest.
+    if not os.path.isdir(source):
+        source_dirs.add(os.path.dirname(source))
+        sources[os.path.normpath(rel_dest)] = source
+        return
+    for dirpath, dirnames, filenames in os.walk(source):
+        source_dirs.add(dirpath)
+        rel_dir = os.path.join(rel_dest, os.path.relpath(dirpath, source))
+        for filename in filenames:
+            sources[os.path.normpath(os.path.join(rel_dir, filename))] = \
+                os.path.join(dirpath, filename)
+
+def _list_sources(source_dir):
+    # Returns the source path for each path in the Python build, and the
+    # directories that the sources are in.  Later renames replace the
+    # files of earlier ones.
     rename_data = read_file(os.path.join(source_dir, "renames.py"))
+    sources = {}
+    source_dirs = set([source_dir])
     for rel_source, rel_dest in eval(rename_data):
-        replace(os.path.abspath(os.path.join(source_dir, rel_source)), 
-                os.path.abspath(os.path.join(target_dir, rel_dest)))
+        _list_tree(os.path.abspath(os.path.join(source_dir, rel_source)),
+                   rel_dest, sources, source_dirs)
+    return sources, source_dirs
+
+def _list_java_sources(source_dir):
+    # Returns the source path for each path in the Java build: the Java
+    # environment, with the Python build's static files in war/static
+    # and the rest of it in war/WEB-INF/python-tutorial.
+    sources = {}
+    source_dirs = set()
+    _list_tree(os.path.join(source_dir, "java-environment"), "", sources,
+               source_dirs)
+    python_sources, python_source_dirs = _list_sources(source_dir)
+    for rel_dest, source in python_sources.iteritems():
+        if rel_dest.split(os.sep)[0] == "static":
+            sources[os.path.join("war", rel_dest)] = source
+        else:
+            sources[os.path.join("war", "WEB-INF", "python-tutorial",
+                                 rel_dest)] = source
+    return sources, source_dirs | python_source_dirs
+
+# Files that the SDK's tools rewrite in place, which are always copied.
+TOOL_WRITTEN_FILES = frozenset(["index.yaml"])
+
+def _link_or_copy(source, destination, link):
+    # Returns True if destination was made a hard link to source, and
+    # False if it is a copy.
+    if link and os.path.basename(destination) not in TOOL_WRITTEN_FILES:
+        try:
+            os.link(source, destination)
+            return True
+        except (AttributeError, OSError):
+            pass
+    shutil.copy2(source, destination)
+    return False
+
+def _stage(sources, target_dir, link, jobs=8):
+    # Puts each source file at its path in target_dir.  With link, files
+    # are hard linked where possible rather than copied, so nothing may
+    # write to them in place (see write_file()).  That is only for trees
+    # that are thrown away after use, since anything else may be
+    # edited.  The files are independent, so they are shared out between
+    # jobs threads, which mostly wait on the file system.
+    with timed("stage %i files" % len(sources)):
+        for rel_dir in sorted(set(os.path.dirname(rel_dest)
+                                  for rel_dest in sources)):
+            path = os.path.join(target_dir, rel_dir)
+            if not os.path.isdir(path):
+                os.makedirs(path)
+        items = sorted(sources.items())
+        results = []
+        def stage_items(items):
+            linked = 0
+            try:
+                for rel_dest, source in items:
+                    linked += _link_or_copy(
+                        source, os.path.join(target_dir, rel_dest), link)
+            except:
+                results.append(sys.exc_info())
+            else:
+                results.append(linked)
+        threads = [threading.Thread(target=stage_items,
+                                    args=(items[i::jobs],))
+                   for i in range(jobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for result in results:
+            if type(result) is tuple:
+                raise result[0], result[1], result[2]
+        linked = sum(results)
+    print "  %i linked, %i copied" % (linked, len(sources) - linked)
+
+# The files of each bundle, relative to the static directory, in the
+# order that they are loaded.  The editor's files are the ones that
+# codemirror.js loads into the editor's frame ("basefiles"), and the
+# parser that client.js asks for.
+PAGE_SCRIPTS = ["codemirror/js/codemirror.js", "client.js"]
+EDITOR_SCRIPTS = ["codemirror/js/util.js", "codemirror/js/stringstream.js",
+                  "codemirror/js/select.js", "codemirror/js/undo.js",
+                  "codemirror/js/editor.js", "codemirror/js/tokenize.js",
+                  "codemirror/contrib/python/js/parsepython.js"]
+EDITOR_STYLESHEET = "codemirror/contrib/python/css/pythoncolors.css"
+PAGE_STYLESHEET = "main.css"
+
+# Bundles are named by their content, so they can be cached forever.
+BUNDLE_DIR = "bundles"
+BUNDLE_EXPIRATION = "365d"
+
+def _minify_js(data):
+    # Drops comment lines, blank lines and indentation, which is as much
+    # as can be done safely without parsing JavaScript.  Line breaks
+    # are kept, as semicolon insertion may depend on them.
+    lines = []
+    in_comment = False
+    for line in data.splitlines():
+        if lines and lines[-1].endswith("\\"):
+            # The rest of a string.
+            lines.append(line)
+            continue
+        line = line.strip()
+        if not in_comment and line.startswith("/*"):
+            in_comment = True
+            line = line[2:]
+        if in_comment:
+            end = line.find("*/")
+            if end < 0:
+                continue
+            in_comment = False
+            line = line[end + 2:].strip()
+        if line and not line.startswith("//"):
+            lines.append(line)
+    return "\n".join(lines) + "\n"
 
-def _build_java(target_dir, sdk_path):
+def _minify_css(data):
+    data = re.sub(r"(?s)/\*.*?\*/", "", data)
+    return "".join(line.strip() + "\n" for line in data.splitlines()
+                   if line.strip())
+
+def _write_bundle(static_dir, name, data):
+    # Writes data to the bundle directory, named for its content, with a
+    # gzipped copy beside it for servers that can send that as it is.
+    # Returns the bundle's URL.
+    root, ext = os.path.splitext(name)
+    filename = "%s-%s%s" % (root, hashlib.sha1(data).hexdigest()[:12], ext)
+    path = os.path.join(static_dir, BUNDLE_DIR, filename)
+    write_file(path, data)
+    fh = gzip.open(path + ".gz", "wb", 9)
+    try:
+        fh.write(data)
+    finally:
+        fh.close()
+    return "/static/%s/%s" % (BUNDLE_DIR, filename)
+
+def _replace1(pattern, replacement, text):
+    text, count = re.subn(pattern, replacement, text)
+    assert count == 1, (pattern, count)
+    return text
+
+def _bundle_assets(static_dir):
+    # Bundles the page's scripts, and the editor's, and points
+    # index.html at them.  The page bundle tells client.js where the
+    # editor's bundle is.  This leaves a page with two scripts where
+    # there were nine, and its two stylesheets, each cached forever.
+    with timed("bundle assets"):
+        def read(names, minify):
+            return [minify(read_file(os.path.join(static_dir, name)))
+                    for name in names]
+        bundle_dir = os.path.join(static_dir, BUNDLE_DIR)
+        if not os.path.isdir(bundle_dir):
+            os.makedirs(bundle_dir)
+        editor_files = {
+            "path": "",
+            "basefiles": [_write_bundle(static_dir, "editor.js", "\n;\n".join(
+                read(EDITOR_SCRIPTS, _minify_js)))],
+            "parserfile": [],
+            "stylesheet": _write_bundle(static_dir, "editor.css", "".join(
+                read([EDITOR_STYLESHEET], _minify_css)))}
+        page_scripts = read(PAGE_SCRIPTS, _minify_js)
+        page_scripts.insert(1, "var codemirror_bundle = %s;\n" %
+                            json.dumps(editor_files, sort_keys=True))
+        page_js = _write_bundle(static_dir, "page.js",
+                                "\n;\n".join(page_scripts))
+        page_css = _write_bundle(static_dir, "page.css", "".join(
+            read([PAGE_STYLESHEET], _minify_css)))
+        index_path = os.path.join(static_dir, "index.html")
+        index = read_file(index_path)
+        index = _replace1(r'<script src="/static/client.js"\s+'
+                          r'type="text/javascript" ?></script>\s*', "",
+                          index)
+        index = _replace1(r'"/static/codemirror/js/codemirror.js"',
+                          '"%s"' % page_js, index)
+        index = _replace1(r'"/static/main.css"', '"%s"' % page_css, index)
+        write_file(index_path, index)
+
+def _write_parser_snapshot(app_dir):
+    # Both App Engine runtimes parse with the Python 2.5 grammar.  The
+    # snapshot does not depend on the Python that writes it.
+    with timed("parser snapshot"):
+        subprocess.check_call([sys.executable, "parsersnapshot.py", "2.5"],
+                              cwd=app_dir)
+
+def _fill_module_cache(app_dir):
+    # The entries are only used by the version of Python that wrote
+    # them, so this runs under App Engine's Python 2.5.  App Engine's
+    # filesystem is read-only, so they can not be written there.
+    code = ("import cappython.safeeval as safeeval\n"
+            "loader = safeeval.ModuleLoader(\n"
+            "    [safeeval.STDLIB_DIR], cache_dir=safeeval.STDLIB_CACHE_DIR)\n"
+            "for filename in loader.fill_cache():\n"
+            "    print 'Not verified:', filename\n")
+    with timed("module cache"):
+        os.mkdir(os.path.join(app_dir, "cappython", "stdlib-cache"))
+        subprocess.check_call(["python2.5", "-c", code], cwd=app_dir)
+
+def _build_python(target_dir, link=False):
     assert not os.path.exists(target_dir), target_dir
-    with mkdtemp() as temp_dir:
-        python_build_dir = os.path.join(temp_dir, "python_build")
-        _build_python(python_build_dir)
-        source_dir = os.path.dirname(os.path.abspath(__file__))
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    with timed("list sources"):
+        sources, source_dirs = _list_sources(source_dir)
+    _stage(sources, target_dir, link)
+    _bundle_assets(os.path.join(target_dir, "static"))
+    _write_parser_snapshot(target_dir)
+    _fill_module_cache(target_dir)
+    with timed("configure"):
+        app_yaml_path = os.path.join(target_dir, "app.yaml")
+        app_yaml = _replace1(r"(?m)^handlers:\n",
+                             "handlers:\n"
+                             "- url: /static/%s\n"
+                             "  static_dir: static/%s\n"
+                             "  expiration: %s\n\n" % (
+                                 BUNDLE_DIR, BUNDLE_DIR, BUNDLE_EXPIRATION),
+                             read_file(app_yaml_path))
+        write_file(app_yaml_path, app_yaml)
+
+class IncrementalBuild(object):
+
+    # Keeps target_dir up to date with the sources as _build_python()
+    # stages them, but copies only the files whose content has changed
+    # since the last update.  Unlike _build_python() it does not bundle
+    # the static files, add their handler to app.yaml, write the parser
+    # snapshot or fill the module cache, so the development server
+    # serves the files as they are and builds the parser itself when it
+    # starts.  The manifest maps each path in target_dir (relative to
+    # it) to the source path, size, mtime and SHA-1 of the file that was
+    # copied there, so that unchanged files cost a stat() and touched
+    # but unchanged files a hash.
+
+    def __init__(self, source_dir, target_dir):
+        self.source_dir = source_dir
+        self.target_dir = target_dir
+        self.manifest = {}
+        self.source_dirs = set()
+
+    def _copy(self, data, source, rel_dest):
+        # Replaces the file in one step, so that the running server
+        # never sees part of it.
+        dest = os.path.join(self.target_dir, rel_dest)
+        dest_dir = os.path.dirname(dest)
+        if not os.path.isdir(dest_dir):
+            os.makedirs(dest_dir)
+        fd, temp_path = tempfile.mkstemp(dir=dest_dir)
+        try:
+            os.write(fd, data)
+            os.close(fd)
+            shutil.copystat(source, temp_path)
+            os.rename(temp_path, dest)
+        except:
+            os.remove(temp_path)
+            raise
+
+    def update(self):
+        # Returns the paths in target_dir that were copied or removed.
+        sources, self.source_dirs = _list_sources(self.source_dir)
+        changed = []
+        for rel_dest, source in sorted(sources.items()):
+            try:
+                stat = os.stat(source)
+            except OSError, e:
+                if e.errno != errno.ENOENT:
+                    raise
+                # Removed since it was listed (an editor's temporary
+                # file, say); the next update deals with it.
+                del sources[rel_dest]
+                continue
+            entry = self.manifest.get(rel_dest)
+            if (entry is not None and entry[0] == source and
+                entry[1:3] == (stat.st_size, stat.st_mtime)):
+                continue
+            data = read_file(source)
+            digest = hashlib.sha1(data).hexdigest()
+            if entry is None or entry[3] != digest:
+                self._copy(data, source, rel_dest)
+                changed.append(rel_dest)
+            self.manifest[rel_dest] = (source, stat.st_size, stat.st_mtime,
+                                       digest)
+        for rel_dest in sorted(set(self.manifest) - set(sources)):
+            try:
+                os.remove(os.path.join(self.target_dir, rel_dest))
+            except OSError, e:
+                if e.errno != errno.ENOENT:
+                    raise
+            del self.manifest[rel_dest]
+            changed.append(rel_dest)
+        return changed
+
+class InotifyWatcher(object):
+
+    # Waits for changes in a set of directories (not their
+    # subdirectories) with Linux's inotify, through ctypes so that no
+    # extension module is needed.  Waiting costs nothing until
+    # something changes.
+
+    IN_MODIFY = 0x2
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_IGNORED = 0x8000
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+            IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF |
+            IN_MOVE_SELF)
+    EVENT = struct.Struct("iIII")
+
+    # An editor's save is often several events; wait for them to stop
+    # for this long before reporting the change.
+    SETTLE_SECONDS = 0.05
+
+    def __init__(self):
+        if ctypes is None:
+            raise OSError(errno.ENOSYS, "ctypes is not available")
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(libc, "inotify_init"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._libc = libc
+        self._fd = libc.inotify_init()
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init failed")
+        self._watches = {}
+        self._watched = set()
+
+    def watch(self, dirs):
+        # Adds watches for any of dirs that are not already watched.
+        # Raises OSError if one can not be added, e.g. when there are
+        # more directories than fs.inotify.max_user_watches.
+        for path in dirs:
+            if path in self._watched:
+                continue
+            wd = self._libc.inotify_add_watch(self._fd, path, self.MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOENT:
+                    # Removed since it was listed; the next update
+                    # will list it again if it comes back.
+                    continue
+                raise OSError(error, "inotify_add_watch failed for %s: %s"
+                              % (path, os.strerror(error)))
+            self._watches[wd] = path
+            self._watched.add(path)
+
+    def _read_events(self):
+        data = os.read(self._fd, 65536)
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size + length
+            if mask & self.IN_IGNORED and wd in self._watches:
+                # The directory was removed, so it can be watched again
+                # if it comes back.
+                self._watched.discard(self._watches.pop(wd))
+
+    def wait(self, timeout):
+        # Returns True if something changed within timeout seconds.
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return False
+        self._read_events()
+        while select.select([self._fd], [], [], self.SETTLE_SECONDS)[0]:
+            self._read_events()
+        return True
+
+    def close(self):
+        os.close(self._fd)
+
+class PollingWatcher(object):
+
+    # Stands in for InotifyWatcher where inotify is not available, by
+    # reporting a possible change every time.
+
+    def watch(self, dirs):
+        pass
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        return True
+
+    def close(self):
+        pass
+
+def make_watcher():
+    try:
+        return InotifyWatcher()
+    except OSError, e:
+        print "Polling for changes:", str(e)
+        return PollingWatcher()
+
+def watch(watcher, dirs):
+    # Returns watcher, watching dirs, or a PollingWatcher if it can not
+    # watch them all.
+    try:
+        watcher.watch(dirs)
+    except OSError, e:
+        print "Polling for changes:", str(e)
+        watcher.close()
+        return PollingWatcher()
+    return watcher
+
+def _build_java(target_dir, sdk_path, link=False):
+    assert not os.path.exists(target_dir), target_dir
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    with timed("list sources"):
+        sources, source_dirs = _list_java_sources(source_dir)
+    _stage(sources, target_dir, link)
+    _bundle_assets(os.path.join(target_dir, "war", "static"))
+    _write_parser_snapshot(os.path.join(target_dir, "war", "WEB-INF",
+                                        "python-tutorial"))
+    with timed("configure"):
         app_yaml = get1(
             yaml.load_all(
-                read_file(os.path.join(python_build_dir, "app.yaml"))))
-        java_dir = os.path.join(source_dir, "java-environment")
-        replace(java_dir, target_dir)
-        replace(os.path.join(python_build_dir, "static"),
-                os.path.join(target_dir, "war", "static"))
-        tutorial_dir = os.path.join(
-            target_dir, "war", "WEB-INF", "python-tutorial")
-        replace(os.path.join(python_build_dir), tutorial_dir)
-        shutil.rmtree(os.path.join(tutorial_dir, "static"))
+                read_file(os.path.join(target_dir, "war", "WEB-INF",
+                                       "python-tutorial", "app.yaml"))))
         build_xml_path = os.path.join(target_dir, "build.xml")
         build_xml = etree.fromstring(read_file(build_xml_path))
         sdk_prop = get1(build_xml.xpath(".//property[@name = 'sdk.dir']"))
@@ -95,7 +522,15 @@ def _build_java(target_dir, sdk_path):
             appengine_xml.xpath(
                 ".//gae:version", 
                 namespaces=NSMAP)).text = str(app_yaml["version"])
+        static_files = etree.SubElement(
+            appengine_xml, "{%s}static-files" % NSMAP["gae"])
+        etree.SubElement(static_files, "{%s}include" % NSMAP["gae"],
+                         path="/static/%s/**" % BUNDLE_DIR,
+                         expiration=BUNDLE_EXPIRATION)
+        etree.SubElement(static_files, "{%s}include" % NSMAP["gae"],
+                         path="/**")
         write_file(appengine_xml_path, etree.tostring(appengine_xml))
+    with timed("ant"):
         subprocess.check_call(["ant", "datanucleusenhance"],
                               cwd=target_dir)
 
@@ -116,49 +551,62 @@ def interruptable():
     except: #KeyboardInterrupt, SystemExit, etc.
         pass
 
-def _run_development_server(build_func, dev_appserver_func, do_refresh=True):
+def _run_development_server(dev_appserver_func, build_func=None):
+    # With build_func, the tree is built once.  Otherwise it is built
+    # incrementally from the sources, and kept up to date with them
+    # while the server runs.
     with mkdtemp() as temp_dir:
-        stage_dir = os.path.join(temp_dir, "staging")
         target_dir = os.path.join(temp_dir, "running")
-        build_func(stage_dir)
-        subprocess.check_call(["rsync", "-q", "-a", 
-                               stage_dir.rstrip("/") + "/",
-                               target_dir.rstrip("/") + "/"])
+        if build_func is not None:
+            build_func(target_dir)
+            build = None
+        else:
+            source_dir = os.path.dirname(os.path.abspath(__file__))
+            build = IncrementalBuild(source_dir, target_dir)
+            build.update()
         child = subprocess.Popen(dev_appserver_func(target_dir))
         try:
             with interruptable():
-                while child.poll() is None:
-                    if do_refresh:
-                        shutil.rmtree(stage_dir)
+                if build is None:
+                    child.wait()
+                    return
+                watcher = make_watcher()
+                try:
+                    watcher = watch(watcher, build.source_dirs)
+                    while child.poll() is None:
+                        if not watcher.wait(1):
+                            continue
+                        start = time.time()
                         try:
-                            build_func(stage_dir)
+                            changed = build.update()
                         except Exception, e:
                             print "Build error.  Transient?", str(e)
-                        else:
-                            subprocess.check_call(
-                                ["rsync", "-r", "-i", "-c",
-                                 stage_dir.rstrip("/") + "/",
-                                 target_dir.rstrip("/") + "/"])
-                    time.sleep(1)
+                            continue
+                        watcher = watch(watcher, build.source_dirs)
+                        for path in changed:
+                            print "Updated", path
+                        if changed:
+                            print "Updated %i files in %.3fs" % (
+                                len(changed), time.time() - start)
+                finally:
+                    watcher.close()
         finally:
             os.kill(child.pid, signal.SIGKILL)
 
 def run_development_server_python(sdk_path):
     _run_development_server(
-        _build_python, 
         lambda t: ["python2.5", os.path.join(sdk_path, "dev_appserver.py"), t])
 
 def run_development_server_java(sdk_path):
     _run_development_server(
-        lambda a: _build_java(a, sdk_path),
         lambda t: [os.path.join(sdk_path, "bin", "dev_appserver.sh"), 
                    os.path.join(t, "war")],
-        do_refresh=False)
+        build_func=lambda a: _build_java(a, sdk_path, link=True))
 
 def deploy_live_python(sdk_path):
     with mkdtemp() as temp_dir:
         target_dir = os.path.join(temp_dir, "python-tutorial")
-        _build_python(target_dir)
+        _build_python(target_dir, link=True)
         subprocess.check_call(["python2.5", 
                                os.path.join(sdk_path, "appcfg.py"),
                                "update", target_dir])
@@ -166,7 +614,7 @@ def deploy_live_python(sdk_path):
 def deploy_live_java(sdk_path):
     with mkdtemp() as temp_dir:
         target_dir = os.path.join(temp_dir, "python-tutorial")
-        _build_java(target_dir, sdk_path)
+        _build_java(target_dir, sdk_path, link=True)
         subprocess.check_call(
             [os.path.join(sdk_path, "bin", "appcfg.sh"), 
              "update", os.path.join(target_dir, "war")])
@@ -196,7 +644,7 @@ def main(prog, argv):
     elif options.platform == "python":
         actions = {"dev": run_development_server_python,
                    "push": deploy_live_python,
-                   "build": lambda sdk: _build_python(output_dir, sdk_path)}
+                   "build": lambda sdk: _build_python(output_dir)}
         default_sdk = os.path.join(os.path.expanduser("~"), "Desktop",
                                    "google_appengine")
     else:
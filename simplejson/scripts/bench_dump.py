@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""Compare writing a chunk at a time, as simplejson.dump used to, with the
+buffered simplejson.dump, for a list of small dicts written to a file and
+to a gzip stream.
+
+    python scripts/bench_dump.py [count]
+
+"""
+import gzip
+import os
+import sys
+import tempfile
+import time
+
+import simplejson
+
+
+def dump_chunks(obj, fp):
+    for chunk in simplejson.JSONEncoder().iterencode(obj):
+        fp.write(chunk)
+
+
+def dump_buffered(obj, fp):
+    simplejson.dump(obj, fp)
+
+
+def main(count=1000000):
+    obj = [{"id": i, "name": "item %d" % (i,), "ok": i % 2 == 0,
+            "score": i / 7.0} for i in xrange(count)]
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        for name, opener in ('file', open), ('gzip', gzip.open):
+            for fn in dump_chunks, dump_buffered:
+                fp = opener(path, 'wb')
+                t = time.time()
+                fn(obj, fp)
+                fp.close()
+                t = time.time() - t
+                print '%-8s %-14s %7.2fs %12d bytes' % (
+                    name, fn.__name__, t, os.path.getsize(path))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+"""Compare the pure Python scanners, as used where the C speedups are not
+available (such as on Jython), by decoding a document of records.
+
+    python scripts/bench_scanner.py [count]
+
+"""
+import sys
+import time
+
+import simplejson
+from simplejson import decoder, scanner
+
+
+def main(count=20000):
+    doc = simplejson.dumps([{"id": i, "name": "item %d" % (i,),
+                             "tags": ["a", "b\n"], "ok": i % 2 == 0,
+                             "score": i / 7.0, "parent": None}
+                            for i in xrange(count)])
+    old_scanstring = decoder.scanstring
+    decoder.scanstring = decoder.py_scanstring
+    try:
+        expect = None
+        for make_scanner in (scanner.py_make_scanner,
+                             scanner.py_make_fast_scanner):
+            dec = simplejson.JSONDecoder()
+            dec.scan_once = make_scanner(dec)
+            t = time.time()
+            value = dec.decode(doc)
+            t = time.time() - t
+            if expect is None:
+                expect = value
+            assert value == expect
+            print '%-22s %7.3fs' % (make_scanner.__name__, t)
+    finally:
+        decoder.scanstring = old_scanstring
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
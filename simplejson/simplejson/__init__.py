@@ -101,13 +101,15 @@ __version__ = '2.1.0'
 __all__ = [
     'dump', 'dumps', 'load', 'loads',
     'JSONDecoder', 'JSONDecodeError', 'JSONEncoder',
-    'OrderedDict',
+    'OrderedDict', 'iterparse', 'iteritems', 'lazy_loads',
 ]
 
 __author__ = 'Bob Ippolito <bob@redivi.com>'
 
 from decoder import JSONDecoder, JSONDecodeError
-from encoder import JSONEncoder
+from encoder import JSONEncoder, DEFAULT_BLOCK_SIZE
+from incremental import iterparse, iteritems
+from lazy import lazy_loads
 try:
     from collections import OrderedDict
 except ImportError:
@@ -126,7 +128,7 @@ _default_encoder = JSONEncoder(
 
 def dump(obj, fp, skipkeys=False, ensure_ascii=True, check_circular=True,
         allow_nan=True, cls=None, indent=None, separators=None,
-        encoding='utf-8', default=None, **kw):
+        encoding='utf-8', default=None, block_size=DEFAULT_BLOCK_SIZE, **kw):
     """Serialize ``obj`` as a JSON formatted stream to ``fp`` (a
     ``.write()``-supporting file-like object).
 
@@ -165,6 +167,9 @@ def dump(obj, fp, skipkeys=False, ensure_ascii=True, check_circular=True,
     ``default(obj)`` is a function that should return a serializable version
     of obj or raise TypeError. The default simply raises TypeError.
 
+    The output is written to ``fp`` in blocks of about ``block_size``
+    characters, so only one block of it is held in memory at a time.
+
     To use a custom ``JSONEncoder`` subclass (e.g. one that overrides the
     ``.default()`` method to serialize additional types), specify it with
     the ``cls`` kwarg.
@@ -175,18 +180,15 @@ def dump(obj, fp, skipkeys=False, ensure_ascii=True, check_circular=True,
         check_circular and allow_nan and
         cls is None and indent is None and separators is None and
         encoding == 'utf-8' and default is None and not kw):
-        iterable = _default_encoder.iterencode(obj)
+        encoder = _default_encoder
     else:
         if cls is None:
             cls = JSONEncoder
-        iterable = cls(skipkeys=skipkeys, ensure_ascii=ensure_ascii,
+        encoder = cls(skipkeys=skipkeys, ensure_ascii=ensure_ascii,
             check_circular=check_circular, allow_nan=allow_nan, indent=indent,
             separators=separators, encoding=encoding,
-            default=default, **kw).iterencode(obj)
-    # could accelerate with writelines in some versions of Python, at
-    # a debuggability cost
-    for chunk in iterable:
-        fp.write(chunk)
+            default=default, **kw)
+    encoder.dump(obj, fp, block_size)
 
 
 def dumps(obj, skipkeys=False, ensure_ascii=True, check_circular=True,
@@ -367,25 +369,32 @@ def loads(s, encoding=None, cls=None, object_hook=None, parse_float=None,
     return cls(encoding=encoding, **kw).decode(s)
 
 
-def _toggle_speedups(enabled):
+def _toggle_speedups(enabled, fast_scanner=True):
     import simplejson.decoder as dec
     import simplejson.encoder as enc
     import simplejson.scanner as scan
+    import simplejson.lazy as lazy
     try:
         from simplejson._speedups import make_encoder as c_make_encoder
     except ImportError:
         c_make_encoder = None
+    if fast_scanner:
+        py_make_scanner = scan.py_make_fast_scanner
+    else:
+        py_make_scanner = scan.py_make_scanner
     if enabled:
         dec.scanstring = dec.c_scanstring or dec.py_scanstring
         enc.c_make_encoder = c_make_encoder
         enc.encode_basestring_ascii = (enc.c_encode_basestring_ascii or 
             enc.py_encode_basestring_ascii)
-        scan.make_scanner = scan.c_make_scanner or scan.py_make_scanner
+        scan.make_scanner = scan.c_make_scanner or py_make_scanner
+        lazy.skip_value = lazy.c_skip_value or lazy.py_skip_value
     else:
         dec.scanstring = dec.py_scanstring
         enc.c_make_encoder = None
         enc.encode_basestring_ascii = enc.py_encode_basestring_ascii
-        scan.make_scanner = scan.py_make_scanner
+        scan.make_scanner = py_make_scanner
+        lazy.skip_value = lazy.py_skip_value
     dec.make_scanner = scan.make_scanner
     global _default_decoder
     _default_decoder = JSONDecoder(
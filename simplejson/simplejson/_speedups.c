@@ -39,6 +39,7 @@ typedef struct _PyScannerObject {
     PyObject *parse_float;
     PyObject *parse_int;
     PyObject *parse_constant;
+    PyObject *memo;
 } PyScannerObject;
 
 static PyMemberDef scanner_members[] = {
@@ -49,6 +50,7 @@ static PyMemberDef scanner_members[] = {
     {"parse_float", T_OBJECT, offsetof(PyScannerObject, parse_float), READONLY, "parse_float"},
     {"parse_int", T_OBJECT, offsetof(PyScannerObject, parse_int), READONLY, "parse_int"},
     {"parse_constant", T_OBJECT, offsetof(PyScannerObject, parse_constant), READONLY, "parse_constant"},
+    {"memo", T_OBJECT, offsetof(PyScannerObject, memo), READONLY, "memo"},
     {NULL}
 };
 
@@ -62,8 +64,14 @@ typedef struct _PyEncoderObject {
     PyObject *item_separator;
     PyObject *sort_keys;
     PyObject *skipkeys;
+    PyObject *dispatch;
     int fast_encode;
     int allow_nan;
+    /* Only set while a call is streaming its output to write() */
+    PyObject *write;
+    Py_ssize_t block_size;
+    Py_ssize_t pending_size;
+    Py_ssize_t pending_counted;
 } PyEncoderObject;
 
 static PyMemberDef encoder_members[] = {
@@ -75,6 +83,7 @@ static PyMemberDef encoder_members[] = {
     {"item_separator", T_OBJECT, offsetof(PyEncoderObject, item_separator), READONLY, "item_separator"},
     {"sort_keys", T_OBJECT, offsetof(PyEncoderObject, sort_keys), READONLY, "sort_keys"},
     {"skipkeys", T_OBJECT, offsetof(PyEncoderObject, skipkeys), READONLY, "skipkeys"},
+    {"dispatch", T_OBJECT, offsetof(PyEncoderObject, dispatch), READONLY, "dispatch"},
     {NULL}
 };
 
@@ -115,6 +124,8 @@ static int
 encoder_listencode_obj(PyEncoderObject *s, PyObject *rval, PyObject *obj, Py_ssize_t indent_level);
 static int
 encoder_listencode_dict(PyEncoderObject *s, PyObject *rval, PyObject *dct, Py_ssize_t indent_level);
+static int
+encoder_flush(PyEncoderObject *s, PyObject *rval, int force);
 static PyObject *
 _encoded_const(PyObject *const);
 static void
@@ -127,6 +138,10 @@ static PyObject *
 _convertPyInt_FromSsize_t(Py_ssize_t *size_ptr);
 static PyObject *
 encoder_encode_float(PyEncoderObject *s, PyObject *obj);
+static Py_ssize_t
+skip_value_str(PyObject *pystr, Py_ssize_t idx);
+static Py_ssize_t
+skip_value_unicode(PyObject *pystr, Py_ssize_t idx);
 
 #define S_CHAR(c) (c >= ' ' && c <= '~' && c != '\\' && c != '"')
 #define IS_WHITESPACE(c) (((c) == ' ') || ((c) == '\t') || ((c) == '\n') || ((c) == '\r'))
@@ -851,6 +866,218 @@ py_scanstring(PyObject* self UNUSED, PyObject *args)
     return _build_rval_index_tuple(rval, next_end);
 }
 
+static Py_ssize_t
+skip_value_str(PyObject *pystr, Py_ssize_t idx)
+{
+    /* Return the index after the JSON value starting at idx, checking only
+    that strings are terminated and brackets match, or -1 with an
+    exception set.  The stack holds the closing bracket for each open
+    container. */
+    char *str = PyString_AS_STRING(pystr);
+    Py_ssize_t len = PyString_GET_SIZE(pystr);
+    char stack_buf[64];
+    char *stack = stack_buf;
+    Py_ssize_t stack_size = 64;
+    Py_ssize_t depth = 0;
+    Py_ssize_t start;
+    char c;
+    if (idx < 0 || idx >= len) {
+        raise_errmsg("Expecting object", pystr, idx);
+        return -1;
+    }
+    c = str[idx];
+    if (c != '"' && c != '[' && c != '{') {
+        /* number or constant, which is checked when it is decoded */
+        start = idx;
+        while (idx < len && !IS_WHITESPACE(str[idx]) && str[idx] != ',' &&
+                str[idx] != ']' && str[idx] != '}')
+            idx++;
+        if (idx == start) {
+            raise_errmsg("Expecting object", pystr, idx);
+            return -1;
+        }
+        return idx;
+    }
+    while (idx < len) {
+        c = str[idx];
+        if (c == '"') {
+            start = idx++;
+            while (idx < len && str[idx] != '"') {
+                if (str[idx] == '\\')
+                    idx++;
+                idx++;
+            }
+            if (idx >= len) {
+                raise_errmsg("Unterminated string starting at", pystr, start);
+                goto bail;
+            }
+        }
+        else if (c == '[' || c == '{') {
+            if (depth == stack_size) {
+                char *new_stack;
+                if (stack == stack_buf) {
+                    new_stack = PyMem_Malloc(stack_size * 2);
+                    if (new_stack != NULL)
+                        memcpy(new_stack, stack, stack_size);
+                }
+                else {
+                    new_stack = PyMem_Realloc(stack, stack_size * 2);
+                }
+                if (new_stack == NULL) {
+                    PyErr_NoMemory();
+                    goto bail;
+                }
+                stack = new_stack;
+                stack_size *= 2;
+            }
+            stack[depth++] = (c == '[') ? ']' : '}';
+        }
+        else if (c == ']' || c == '}') {
+            if (depth == 0 || stack[depth - 1] != c) {
+                raise_errmsg("Expecting object", pystr, idx);
+                goto bail;
+            }
+            depth--;
+        }
+        idx++;
+        if (depth == 0)
+            break;
+    }
+    if (depth != 0) {
+        raise_errmsg("Expecting object", pystr, len);
+        goto bail;
+    }
+    if (stack != stack_buf)
+        PyMem_Free(stack);
+    return idx;
+bail:
+    if (stack != stack_buf)
+        PyMem_Free(stack);
+    return -1;
+}
+
+static Py_ssize_t
+skip_value_unicode(PyObject *pystr, Py_ssize_t idx)
+{
+    /* Return the index after the JSON value starting at idx, checking only
+    that strings are terminated and brackets match, or -1 with an
+    exception set.  The stack holds the closing bracket for each open
+    container. */
+    Py_UNICODE *str = PyUnicode_AS_UNICODE(pystr);
+    Py_ssize_t len = PyUnicode_GET_SIZE(pystr);
+    char stack_buf[64];
+    char *stack = stack_buf;
+    Py_ssize_t stack_size = 64;
+    Py_ssize_t depth = 0;
+    Py_ssize_t start;
+    Py_UNICODE c;
+    if (idx < 0 || idx >= len) {
+        raise_errmsg("Expecting object", pystr, idx);
+        return -1;
+    }
+    c = str[idx];
+    if (c != '"' && c != '[' && c != '{') {
+        /* number or constant, which is checked when it is decoded */
+        start = idx;
+        while (idx < len && !IS_WHITESPACE(str[idx]) && str[idx] != ',' &&
+                str[idx] != ']' && str[idx] != '}')
+            idx++;
+        if (idx == start) {
+            raise_errmsg("Expecting object", pystr, idx);
+            return -1;
+        }
+        return idx;
+    }
+    while (idx < len) {
+        c = str[idx];
+        if (c == '"') {
+            start = idx++;
+            while (idx < len && str[idx] != '"') {
+                if (str[idx] == '\\')
+                    idx++;
+                idx++;
+            }
+            if (idx >= len) {
+                raise_errmsg("Unterminated string starting at", pystr, start);
+                goto bail;
+            }
+        }
+        else if (c == '[' || c == '{') {
+            if (depth == stack_size) {
+                char *new_stack;
+                if (stack == stack_buf) {
+                    new_stack = PyMem_Malloc(stack_size * 2);
+                    if (new_stack != NULL)
+                        memcpy(new_stack, stack, stack_size);
+                }
+                else {
+                    new_stack = PyMem_Realloc(stack, stack_size * 2);
+                }
+                if (new_stack == NULL) {
+                    PyErr_NoMemory();
+                    goto bail;
+                }
+                stack = new_stack;
+                stack_size *= 2;
+            }
+            stack[depth++] = (c == '[') ? ']' : '}';
+        }
+        else if (c == ']' || c == '}') {
+            if (depth == 0 || stack[depth - 1] != c) {
+                raise_errmsg("Expecting object", pystr, idx);
+                goto bail;
+            }
+            depth--;
+        }
+        idx++;
+        if (depth == 0)
+            break;
+    }
+    if (depth != 0) {
+        raise_errmsg("Expecting object", pystr, len);
+        goto bail;
+    }
+    if (stack != stack_buf)
+        PyMem_Free(stack);
+    return idx;
+bail:
+    if (stack != stack_buf)
+        PyMem_Free(stack);
+    return -1;
+}
+
+PyDoc_STRVAR(pydoc_skip_value,
+    "skip_value(basestring, idx) -> end\n"
+    "\n"
+    "Return the index after the JSON value starting at idx, without\n"
+    "decoding it.  Only strings and brackets are checked."
+);
+
+static PyObject *
+py_skip_value(PyObject* self UNUSED, PyObject *args)
+{
+    PyObject *pystr;
+    Py_ssize_t idx;
+    Py_ssize_t end;
+    if (!PyArg_ParseTuple(args, "OO&:skip_value", &pystr, _convertPyInt_AsSsize_t, &idx))
+        return NULL;
+    if (PyString_Check(pystr)) {
+        end = skip_value_str(pystr, idx);
+    }
+    else if (PyUnicode_Check(pystr)) {
+        end = skip_value_unicode(pystr, idx);
+    }
+    else {
+        PyErr_Format(PyExc_TypeError,
+                     "first argument must be a string, not %.80s",
+                     Py_TYPE(pystr)->tp_name);
+        return NULL;
+    }
+    if (end == -1)
+        return NULL;
+    return _convertPyInt_FromSsize_t(&end);
+}
+
 PyDoc_STRVAR(pydoc_encode_basestring_ascii,
     "encode_basestring_ascii(basestring) -> str\n"
     "\n"
@@ -897,6 +1124,7 @@ scanner_traverse(PyObject *self, visitproc visit, void *arg)
     Py_VISIT(s->parse_float);
     Py_VISIT(s->parse_int);
     Py_VISIT(s->parse_constant);
+    Py_VISIT(s->memo);
     return 0;
 }
 
@@ -913,6 +1141,7 @@ scanner_clear(PyObject *self)
     Py_CLEAR(s->parse_float);
     Py_CLEAR(s->parse_int);
     Py_CLEAR(s->parse_constant);
+    Py_CLEAR(s->memo);
     return 0;
 }
 
@@ -935,8 +1164,13 @@ _parse_object_str(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ssize_
     PyObject *val = NULL;
     char *encoding = PyString_AS_STRING(s->encoding);
     int strict = PyObject_IsTrue(s->strict);
+    int has_pairs_hook = (s->pairs_hook != Py_None);
     Py_ssize_t next_idx;
-    pairs = PyList_New(0);
+    /* without object_pairs_hook, build the dict directly */
+    if (has_pairs_hook)
+        pairs = PyList_New(0);
+    else
+        pairs = PyDict_New();
     if (pairs == NULL)
         return NULL;
 
@@ -954,6 +1188,19 @@ _parse_object_str(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ssize_
             key = scanstring_str(pystr, idx + 1, encoding, strict, &next_idx);
             if (key == NULL)
                 goto bail;
+            if (s->memo != Py_None) {
+                /* share one key object between all objects using it */
+                PyObject *memokey = PyDict_GetItem(s->memo, key);
+                if (memokey == NULL) {
+                    if (PyDict_SetItem(s->memo, key, key) < 0)
+                        goto bail;
+                }
+                else {
+                    Py_INCREF(memokey);
+                    Py_DECREF(key);
+                    key = memokey;
+                }
+            }
             idx = next_idx;
 
             /* skip whitespace between key and : delimiter, read :, skip whitespace */
@@ -970,16 +1217,24 @@ _parse_object_str(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ssize_
             if (val == NULL)
                 goto bail;
 
-            item = PyTuple_Pack(2, key, val);
-            if (item == NULL)
-                goto bail;
-            Py_CLEAR(key);
-            Py_CLEAR(val);
-            if (PyList_Append(pairs, item) == -1) {
+            if (has_pairs_hook) {
+                item = PyTuple_Pack(2, key, val);
+                if (item == NULL)
+                    goto bail;
+                Py_CLEAR(key);
+                Py_CLEAR(val);
+                if (PyList_Append(pairs, item) == -1) {
+                    Py_DECREF(item);
+                    goto bail;
+                }
                 Py_DECREF(item);
-                goto bail;
             }
-            Py_DECREF(item);
+            else {
+                if (PyDict_SetItem(pairs, key, val) == -1)
+                    goto bail;
+                Py_CLEAR(key);
+                Py_CLEAR(val);
+            }
             idx = next_idx;
 
             /* skip whitespace before } or , */
@@ -1007,7 +1262,7 @@ _parse_object_str(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ssize_
     }
 
     /* if pairs_hook is not None: rval = object_pairs_hook(pairs) */
-    if (s->pairs_hook != Py_None) {
+    if (has_pairs_hook) {
         val = PyObject_CallFunctionObjArgs(s->pairs_hook, pairs, NULL);
         if (val == NULL)
             goto bail;
@@ -1016,11 +1271,8 @@ _parse_object_str(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ssize_
         return val;
     }
 
-    rval = PyObject_CallFunctionObjArgs((PyObject *)(&PyDict_Type),
-                                        pairs, NULL);
-    if (rval == NULL)
-        goto bail;
-    Py_CLEAR(pairs);
+    rval = pairs;
+    pairs = NULL;
 
     /* if object_hook is not None: rval = object_hook(rval) */
     if (s->object_hook != Py_None) {
@@ -1057,9 +1309,14 @@ _parse_object_unicode(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ss
     PyObject *key = NULL;
     PyObject *val = NULL;
     int strict = PyObject_IsTrue(s->strict);
+    int has_pairs_hook = (s->pairs_hook != Py_None);
     Py_ssize_t next_idx;
 
-    pairs = PyList_New(0);
+    /* without object_pairs_hook, build the dict directly */
+    if (has_pairs_hook)
+        pairs = PyList_New(0);
+    else
+        pairs = PyDict_New();
     if (pairs == NULL)
         return NULL;
     
@@ -1077,6 +1334,19 @@ _parse_object_unicode(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ss
             key = scanstring_unicode(pystr, idx + 1, strict, &next_idx);
             if (key == NULL)
                 goto bail;
+            if (s->memo != Py_None) {
+                /* share one key object between all objects using it */
+                PyObject *memokey = PyDict_GetItem(s->memo, key);
+                if (memokey == NULL) {
+                    if (PyDict_SetItem(s->memo, key, key) < 0)
+                        goto bail;
+                }
+                else {
+                    Py_INCREF(memokey);
+                    Py_DECREF(key);
+                    key = memokey;
+                }
+            }
             idx = next_idx;
 
             /* skip whitespace between key and : delimiter, read :, skip whitespace */
@@ -1093,16 +1363,24 @@ _parse_object_unicode(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ss
             if (val == NULL)
                 goto bail;
 
-            item = PyTuple_Pack(2, key, val);
-            if (item == NULL)
-                goto bail;
-            Py_CLEAR(key);
-            Py_CLEAR(val);
-            if (PyList_Append(pairs, item) == -1) {
+            if (has_pairs_hook) {
+                item = PyTuple_Pack(2, key, val);
+                if (item == NULL)
+                    goto bail;
+                Py_CLEAR(key);
+                Py_CLEAR(val);
+                if (PyList_Append(pairs, item) == -1) {
+                    Py_DECREF(item);
+                    goto bail;
+                }
                 Py_DECREF(item);
-                goto bail;
             }
-            Py_DECREF(item);
+            else {
+                if (PyDict_SetItem(pairs, key, val) == -1)
+                    goto bail;
+                Py_CLEAR(key);
+                Py_CLEAR(val);
+            }
             idx = next_idx;
 
             /* skip whitespace before } or , */
@@ -1131,7 +1409,7 @@ _parse_object_unicode(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ss
     }
 
     /* if pairs_hook is not None: rval = object_pairs_hook(pairs) */
-    if (s->pairs_hook != Py_None) {
+    if (has_pairs_hook) {
         val = PyObject_CallFunctionObjArgs(s->pairs_hook, pairs, NULL);
         if (val == NULL)
             goto bail;
@@ -1140,11 +1418,8 @@ _parse_object_unicode(PyScannerObject *s, PyObject *pystr, Py_ssize_t idx, Py_ss
         return val;
     }
 
-    rval = PyObject_CallFunctionObjArgs((PyObject *)(&PyDict_Type),
-                                        pairs, NULL);
-    if (rval == NULL)
-        goto bail;
-    Py_CLEAR(pairs);
+    rval = pairs;
+    pairs = NULL;
 
     /* if object_hook is not None: rval = object_hook(rval) */
     if (s->object_hook != Py_None) {
@@ -1717,6 +1992,7 @@ scanner_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
         s->parse_float = NULL;
         s->parse_int = NULL;
         s->parse_constant = NULL;
+        s->memo = NULL;
     }
     return (PyObject *)s;
 }
@@ -1768,6 +2044,19 @@ scanner_init(PyObject *self, PyObject *args, PyObject *kwds)
     s->parse_constant = PyObject_GetAttrString(ctx, "parse_constant");
     if (s->parse_constant == NULL)
         goto bail;
+    /* memo is optional, and must be a dict if given */
+    s->memo = PyObject_GetAttrString(ctx, "memo");
+    if (s->memo == NULL) {
+        if (!PyErr_ExceptionMatches(PyExc_AttributeError))
+            goto bail;
+        PyErr_Clear();
+        Py_INCREF(Py_None);
+        s->memo = Py_None;
+    }
+    else if (s->memo != Py_None && !PyDict_Check(s->memo)) {
+        PyErr_SetString(PyExc_TypeError, "memo must be a dict or None");
+        goto bail;
+    }
 
     return 0;
 
@@ -1779,6 +2068,7 @@ bail:
     Py_CLEAR(s->parse_float);
     Py_CLEAR(s->parse_int);
     Py_CLEAR(s->parse_constant);
+    Py_CLEAR(s->memo);
     return -1;
 }
 
@@ -1842,6 +2132,8 @@ encoder_new(PyTypeObject *type, PyObject *args, PyObject *kwds)
         s->item_separator = NULL;
         s->sort_keys = NULL;
         s->skipkeys = NULL;
+        s->dispatch = NULL;
+        s->write = NULL;
     }
     return (PyObject *)s;
 }
@@ -1850,16 +2142,17 @@ static int
 encoder_init(PyObject *self, PyObject *args, PyObject *kwds)
 {
     /* initialize Encoder object */
-    static char *kwlist[] = {"markers", "default", "encoder", "indent", "key_separator", "item_separator", "sort_keys", "skipkeys", "allow_nan", NULL};
+    static char *kwlist[] = {"markers", "default", "encoder", "indent", "key_separator", "item_separator", "sort_keys", "skipkeys", "allow_nan", "dispatch", NULL};
 
     PyEncoderObject *s;
     PyObject *allow_nan;
+    PyObject *dispatch = Py_None;
 
     assert(PyEncoder_Check(self));
     s = (PyEncoderObject *)self;
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OOOOOOOOO:make_encoder", kwlist,
-        &s->markers, &s->defaultfn, &s->encoder, &s->indent, &s->key_separator, &s->item_separator, &s->sort_keys, &s->skipkeys, &allow_nan))
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OOOOOOOOO|O:make_encoder", kwlist,
+        &s->markers, &s->defaultfn, &s->encoder, &s->indent, &s->key_separator, &s->item_separator, &s->sort_keys, &s->skipkeys, &allow_nan, &dispatch))
         return -1;
 
     Py_INCREF(s->markers);
@@ -1870,6 +2163,12 @@ encoder_init(PyObject *self, PyObject *args, PyObject *kwds)
     Py_INCREF(s->item_separator);
     Py_INCREF(s->sort_keys);
     Py_INCREF(s->skipkeys);
+    if (dispatch != Py_None && !PyDict_Check(dispatch)) {
+        PyErr_Format(PyExc_TypeError, "dispatch must be a dict, not %.80s", Py_TYPE(dispatch)->tp_name);
+        return -1;
+    }
+    Py_INCREF(dispatch);
+    s->dispatch = dispatch;
     s->fast_encode = (PyCFunction_Check(s->encoder) && PyCFunction_GetFunction(s->encoder) == (PyCFunction)py_encode_basestring_ascii);
     s->allow_nan = PyObject_IsTrue(allow_nan);
     return 0;
@@ -1879,26 +2178,89 @@ static PyObject *
 encoder_call(PyObject *self, PyObject *args, PyObject *kwds)
 {
     /* Python callable interface to encode_listencode_obj */
-    static char *kwlist[] = {"obj", "_current_indent_level", NULL};
+    static char *kwlist[] = {"obj", "_current_indent_level", "write", "block_size", NULL};
     PyObject *obj;
     PyObject *rval;
+    PyObject *write = Py_None;
+    PyObject *old_write;
     Py_ssize_t indent_level;
+    Py_ssize_t block_size = 0;
+    Py_ssize_t old_block_size, old_pending_size, old_pending_counted;
     PyEncoderObject *s;
+    int err;
     assert(PyEncoder_Check(self));
     s = (PyEncoderObject *)self;
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO&:_iterencode", kwlist,
-        &obj, _convertPyInt_AsSsize_t, &indent_level))
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO&|OO&:_iterencode", kwlist,
+        &obj, _convertPyInt_AsSsize_t, &indent_level,
+        &write, _convertPyInt_AsSsize_t, &block_size))
         return NULL;
     rval = PyList_New(0);
     if (rval == NULL)
         return NULL;
-    if (encoder_listencode_obj(s, rval, obj, indent_level)) {
+    /* write is kept alive by args during the call.  The previous state is
+       restored afterwards in case default() reenters this encoder. */
+    old_write = s->write;
+    old_block_size = s->block_size;
+    old_pending_size = s->pending_size;
+    old_pending_counted = s->pending_counted;
+    if (write == Py_None) {
+        s->write = NULL;
+    }
+    else {
+        s->write = write;
+        s->block_size = block_size;
+        s->pending_size = 0;
+        s->pending_counted = 0;
+    }
+    err = encoder_listencode_obj(s, rval, obj, indent_level);
+    if (!err)
+        err = encoder_flush(s, rval, 1);
+    s->write = old_write;
+    s->block_size = old_block_size;
+    s->pending_size = old_pending_size;
+    s->pending_counted = old_pending_counted;
+    if (err) {
         Py_DECREF(rval);
         return NULL;
     }
     return rval;
 }
 
+static int
+encoder_flush(PyEncoderObject *s, PyObject *rval, int force)
+{
+    /* When streaming, pass the chunks in rval to write() joined together
+       once they add up to block_size characters (or at the end, if force),
+       and empty rval for the chunks that follow. */
+    Py_ssize_t i, n;
+    PyObject *block;
+    PyObject *res;
+    if (s->write == NULL)
+        return 0;
+    n = PyList_GET_SIZE(rval);
+    for (i = s->pending_counted; i < n; i++) {
+        PyObject *chunk = PyList_GET_ITEM(rval, i);
+        if (PyString_Check(chunk))
+            s->pending_size += PyString_GET_SIZE(chunk);
+        else if (PyUnicode_Check(chunk))
+            s->pending_size += PyUnicode_GET_SIZE(chunk);
+    }
+    s->pending_counted = n;
+    if (n == 0 || (!force && s->pending_size < s->block_size))
+        return 0;
+    block = join_list_string(rval);
+    if (block == NULL)
+        return -1;
+    res = PyObject_CallFunctionObjArgs(s->write, block, NULL);
+    Py_DECREF(block);
+    if (res == NULL)
+        return -1;
+    Py_DECREF(res);
+    s->pending_size = 0;
+    s->pending_counted = 0;
+    return PyList_SetSlice(rval, 0, n, NULL);
+}
+
 static PyObject *
 _encoded_const(PyObject *obj)
 {
@@ -1981,6 +2343,7 @@ encoder_listencode_obj(PyEncoderObject *s, PyObject *rval, PyObject *obj, Py_ssi
 {
     /* Encode Python object obj to a JSON term, rval is a PyList */
     PyObject *newobj;
+    PyObject *fn;
     int rv;
 
     if (obj == Py_None || obj == Py_True || obj == Py_False) {
@@ -2033,7 +2396,16 @@ encoder_listencode_obj(PyEncoderObject *s, PyObject *rval, PyObject *obj, Py_ssi
                 return -1;
             }
         }
-        newobj = PyObject_CallFunctionObjArgs(s->defaultfn, obj, NULL);
+        /* A serializer cached for the exact type of obj is used in place
+           of default, which finds and caches it the first time. */
+        fn = NULL;
+        if (s->dispatch != Py_None)
+            fn = PyDict_GetItem(s->dispatch, (PyObject *)Py_TYPE(obj));
+        if (fn == NULL)
+            fn = s->defaultfn;
+        Py_INCREF(fn);
+        newobj = PyObject_CallFunctionObjArgs(fn, obj, NULL);
+        Py_DECREF(fn);
         if (newobj == NULL) {
             Py_XDECREF(ident);
             return -1;
@@ -2162,6 +2534,8 @@ encoder_listencode_dict(PyEncoderObject *s, PyObject *rval, PyObject *dct, Py_ss
             goto bail;
         if (encoder_listencode_obj(s, rval, value, indent_level))
             goto bail;
+        if (encoder_flush(s, rval, 0))
+            goto bail;
         idx += 1;
     }
     if (ident != NULL) {
@@ -2253,6 +2627,8 @@ encoder_listencode_list(PyEncoderObject *s, PyObject *rval, PyObject *seq, Py_ss
         }
         if (encoder_listencode_obj(s, rval, obj, indent_level))
             goto bail;
+        if (encoder_flush(s, rval, 0))
+            goto bail;
     }
     if (ident != NULL) {
         if (PyDict_DelItem(s->markers, ident))
@@ -2299,6 +2675,7 @@ encoder_traverse(PyObject *self, visitproc visit, void *arg)
     Py_VISIT(s->item_separator);
     Py_VISIT(s->sort_keys);
     Py_VISIT(s->skipkeys);
+    Py_VISIT(s->dispatch);
     return 0;
 }
 
@@ -2317,10 +2694,11 @@ encoder_clear(PyObject *self)
     Py_CLEAR(s->item_separator);
     Py_CLEAR(s->sort_keys);
     Py_CLEAR(s->skipkeys);
+    Py_CLEAR(s->dispatch);
     return 0;
 }
 
-PyDoc_STRVAR(encoder_doc, "_iterencode(obj, _current_indent_level) -> iterable");
+PyDoc_STRVAR(encoder_doc, "_iterencode(obj, _current_indent_level[, write, block_size]) -> iterable");
 
 static
 PyTypeObject PyEncoderType = {
@@ -2375,6 +2753,10 @@ static PyMethodDef speedups_methods[] = {
         (PyCFunction)py_scanstring,
         METH_VARARGS,
         pydoc_scanstring},
+    {"skip_value",
+        (PyCFunction)py_skip_value,
+        METH_VARARGS,
+        pydoc_skip_value},
     {NULL, NULL, 0, NULL}
 };
 
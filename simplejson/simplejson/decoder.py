@@ -82,7 +82,7 @@ _CONSTANTS = {
     'NaN': NaN,
 }
 
-STRINGCHUNK = re.compile(r'(.*?)(["\\\x00-\x1f])', FLAGS)
+STRINGCHUNK = re.compile(r'([^"\\\x00-\x1f]*)(["\\\x00-\x1f])', FLAGS)
 BACKSLASH = {
     '"': u'"', '\\': u'\\', '/': u'/',
     'b': u'\b', 'f': u'\f', 'n': u'\n', 'r': u'\r', 't': u'\t',
@@ -175,8 +175,16 @@ WHITESPACE = re.compile(r'[ \t\n\r]*', FLAGS)
 WHITESPACE_STR = ' \t\n\r'
 
 def JSONObject((s, end), encoding, strict, scan_once, object_hook,
-        object_pairs_hook, _w=WHITESPACE.match, _ws=WHITESPACE_STR):
-    pairs = []
+        object_pairs_hook, memo=None, _w=WHITESPACE.match,
+        _ws=WHITESPACE_STR):
+    # Without object_pairs_hook the dict is built directly, rather than
+    # from a list of pairs.
+    if object_pairs_hook is not None:
+        pairs = []
+    else:
+        pairs = {}
+    if memo is not None:
+        memo_get = memo.setdefault
     # Use a slice to prevent IndexError from being raised, the following
     # check will raise a more specific ValueError if the string is empty
     nextchar = s[end:end + 1]
@@ -189,8 +197,7 @@ def JSONObject((s, end), encoding, strict, scan_once, object_hook,
         if nextchar == '}':
             if object_pairs_hook is not None:
                 result = object_pairs_hook(pairs)
-                return result, end
-            pairs = {}
+                return result, end + 1
             if object_hook is not None:
                 pairs = object_hook(pairs)
             return pairs, end + 1
@@ -199,6 +206,9 @@ def JSONObject((s, end), encoding, strict, scan_once, object_hook,
     end += 1
     while True:
         key, end = scanstring(s, end, encoding, strict)
+        if memo is not None:
+            # Share one string between all the objects with this key.
+            key = memo_get(key, key)
 
         # To skip some function call overhead we optimize the fast paths where
         # the JSON key separator is ": " or just ":".
@@ -221,7 +231,10 @@ def JSONObject((s, end), encoding, strict, scan_once, object_hook,
             value, end = scan_once(s, end)
         except StopIteration:
             raise JSONDecodeError("Expecting object", s, end)
-        pairs.append((key, value))
+        if object_pairs_hook is not None:
+            pairs.append((key, value))
+        else:
+            pairs[key] = value
 
         try:
             nextchar = s[end]
@@ -255,7 +268,6 @@ def JSONObject((s, end), encoding, strict, scan_once, object_hook,
     if object_pairs_hook is not None:
         result = object_pairs_hook(pairs)
         return result, end
-    pairs = dict(pairs)
     if object_hook is not None:
         pairs = object_hook(pairs)
     return pairs, end
@@ -328,7 +340,7 @@ class JSONDecoder(object):
 
     def __init__(self, encoding=None, object_hook=None, parse_float=None,
             parse_int=None, parse_constant=None, strict=True,
-            object_pairs_hook=None):
+            object_pairs_hook=None, memo=None):
         """
         *encoding* determines the encoding used to interpret any
         :class:`str` objects decoded by this instance (``'utf-8'`` by
@@ -371,6 +383,12 @@ class JSONDecoder(object):
         ``True`` means that unescaped control characters are parse errors, if
         ``False`` then control characters will be allowed in strings.
 
+        *memo* makes every occurrence of the same object key share one
+        string, which saves memory when decoding many objects of the same
+        shape.  If ``True``, keys are shared within each decode.  If a
+        :class:`dict`, it is used to look up keys and is kept between
+        decodes, so keys are shared across documents as well.
+
         """
         self.encoding = encoding
         self.object_hook = object_hook
@@ -379,6 +397,14 @@ class JSONDecoder(object):
         self.parse_int = parse_int or int
         self.parse_constant = parse_constant or _CONSTANTS.__getitem__
         self.strict = strict
+        self._clear_memo = False
+        if memo is True:
+            self.memo = {}
+            self._clear_memo = True
+        elif memo is False:
+            self.memo = None
+        else:
+            self.memo = memo
         self.parse_object = JSONObject
         self.parse_array = JSONArray
         self.parse_string = scanstring
@@ -405,7 +431,12 @@ class JSONDecoder(object):
 
         """
         try:
-            obj, end = self.scan_once(s, idx)
-        except StopIteration:
-            raise JSONDecodeError("No JSON object could be decoded", s, idx)
+            try:
+                obj, end = self.scan_once(s, idx)
+            except StopIteration:
+                raise JSONDecodeError("No JSON object could be decoded", s,
+                    idx)
+        finally:
+            if self._clear_memo:
+                self.memo.clear()
         return obj, end
@@ -1,6 +1,8 @@
 """Implementation of JSONEncoder
 """
 import re
+from inspect import getmro
+from types import InstanceType
 
 try:
     from simplejson._speedups import encode_basestring_ascii as \
@@ -32,6 +34,13 @@ for i in range(0x20):
 
 FLOAT_REPR = repr
 
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+# Instances of these are encoded without calling default, so serializers
+# can not be registered for them.
+_ENCODED_TYPES = (basestring, int, long, float, list, tuple, dict,
+                  type(None))
+
 def encode_basestring(s):
     """Return a JSON representation of a Python string
 
@@ -163,6 +172,10 @@ class JSONEncoder(object):
         if default is not None:
             self.default = default
         self.encoding = encoding
+        self._type_serializers = {}
+        # The serializer found for each exact type, shared with the C
+        # encoder.
+        self._type_dispatch = {}
 
     def default(self, o):
         """Implement this method in a subclass such that it returns
@@ -184,6 +197,54 @@ class JSONEncoder(object):
         """
         raise TypeError(repr(o) + " is not JSON serializable")
 
+    def register_type(self, cls, serializer):
+        """Call ``serializer(o)`` instead of ``default(o)`` for instances
+        of ``cls`` or its subclasses.  Like ``default``, it should return
+        a serializable object for ``o``.  The serializer is looked up once
+        for each type, so encoding many instances of a type is faster than
+        with a ``default`` that checks for it.
+
+        For example::
+
+            encoder = JSONEncoder()
+            encoder.register_type(decimal.Decimal, str)
+            encoder.register_type(datetime.date, lambda d: d.isoformat())
+
+        """
+        if issubclass(cls, _ENCODED_TYPES):
+            raise TypeError("%r is already JSON serializable" % (cls,))
+        self._type_serializers[cls] = serializer
+        self._type_dispatch.clear()
+
+    def _make_default(self):
+        """Return a function ``f(o)`` to use in place of ``default(o)``,
+        which calls the serializer registered for the type of ``o``, if
+        any, and caches it in ``_type_dispatch`` for the C encoder.
+
+        """
+        default = self.default
+        serializers = self._type_serializers
+        if not serializers:
+            return default
+        dispatch = self._type_dispatch
+
+        def _default(o, _dispatch_get=dispatch.get):
+            cls = type(o)
+            serializer = _dispatch_get(cls)
+            if serializer is None:
+                serializer = default
+                if cls is InstanceType:
+                    # Classic classes all share the one type.
+                    cls = o.__class__
+                for base in getmro(cls):
+                    if base in serializers:
+                        serializer = serializers[base]
+                        break
+                if cls is type(o):
+                    dispatch[cls] = serializer
+            return serializer(o)
+        return _default
+
     def encode(self, o):
         """Return a JSON string representation of a Python data structure.
 
@@ -223,6 +284,48 @@ class JSONEncoder(object):
             for chunk in JSONEncoder().iterencode(bigobject):
                 mysocket.write(chunk)
 
+        """
+        return self._make_iterencode(_one_shot)(o, 0)
+
+    def dump(self, o, fp, block_size=DEFAULT_BLOCK_SIZE):
+        """Encode the given object and write it to ``fp`` (a
+        ``.write()``-supporting file-like object) in blocks of about
+        ``block_size`` characters, rather than a chunk at a time.  Only
+        one block is held in memory, and the C encoder is used when it
+        is available.
+
+        """
+        write = fp.write
+        if (self.__class__.iterencode.im_func is not
+                JSONEncoder.iterencode.im_func):
+            # Respect a subclass that changes the output of iterencode.
+            chunks = self.iterencode(o)
+        else:
+            _iterencode = self._make_iterencode(_one_shot=True)
+            if (c_make_encoder is not None
+                    and isinstance(_iterencode, c_make_encoder)):
+                # The C encoder writes each block itself.
+                _iterencode(o, 0, write, block_size)
+                return
+            chunks = _iterencode(o, 0)
+        block = []
+        append = block.append
+        size = 0
+        for chunk in chunks:
+            append(chunk)
+            size += len(chunk)
+            if size >= block_size:
+                write(''.join(block))
+                del block[:]
+                size = 0
+        if block:
+            write(''.join(block))
+
+    def _make_iterencode(self, _one_shot=False):
+        """Return a function ``f(o, 0)`` that encodes ``o`` in the same way
+        as ``iterencode``.  It can be called repeatedly to encode many
+        objects without setting up the encoder again for each.
+
         """
         if self.check_circular:
             markers = {}
@@ -261,18 +364,23 @@ class JSONEncoder(object):
             return text
 
 
+        _default = self._make_default()
         if (_one_shot and c_make_encoder is not None
                 and not self.indent and not self.sort_keys):
+            if self._type_serializers:
+                dispatch = self._type_dispatch
+            else:
+                dispatch = None
             _iterencode = c_make_encoder(
-                markers, self.default, _encoder, self.indent,
+                markers, _default, _encoder, self.indent,
                 self.key_separator, self.item_separator, self.sort_keys,
-                self.skipkeys, self.allow_nan)
+                self.skipkeys, self.allow_nan, dispatch)
         else:
             _iterencode = _make_iterencode(
-                markers, self.default, _encoder, self.indent, floatstr,
+                markers, _default, _encoder, self.indent, floatstr,
                 self.key_separator, self.item_separator, self.sort_keys,
                 self.skipkeys, _one_shot)
-        return _iterencode(o, 0)
+        return _iterencode
 
 def _make_iterencode(markers, _default, _encoder, _indent, _floatstr,
         _key_separator, _item_separator, _sort_keys, _skipkeys, _one_shot,
@@ -0,0 +1,479 @@
+"""Incremental JSON decoding for documents too large to hold in memory
+"""
+import re
+
+from simplejson.decoder import JSONDecoder, JSONDecodeError, WHITESPACE
+from simplejson.scanner import py_make_fast_scanner
+
+__all__ = ['IncrementalDecoder', 'ArrayItemDecoder', 'iterparse', 'iteritems']
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Matches the rest of a JSON string, up to and including the closing
+# quote, without decoding it.
+STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+
+# Characters that could continue a number.
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+# Scalars that could still be continued by more data.
+_LITERALS = ('null', 'true', 'false', 'NaN', 'Infinity', '-Infinity')
+
+_NEED_MORE = object()
+
+
+class _ChunkedDecoder(object):
+    """Common buffer handling for the incremental decoders.
+
+    Data is passed in with ``feed`` in chunks of any size, which must be
+    either all ``str`` or all ``unicode``.  Only the part of the document
+    that has not been consumed yet is kept.  Positions in errors refer to
+    the whole document.
+
+    """
+    def __init__(self, decoder=None, **kw):
+        if decoder is None:
+            decoder = JSONDecoder(**kw)
+        self.decoder = decoder
+        # Made when first needed to find where an error is.
+        self._py_scan_once = None
+        self._buf = None
+        self._pos = 0
+        # Characters and newlines already dropped from the buffer, and
+        # the position of the last of those newlines.
+        self._offset = 0
+        self._lines = 0
+        self._last_newline = -1
+        # Don't try to parse again before the buffer reaches this size,
+        # so that a long token arriving in small chunks is not rescanned
+        # from its start for every chunk.
+        self._wait_until = 0
+        self._closed = False
+
+    def feed(self, data):
+        """Add ``data`` to the document and return a list of the results
+        that are now complete.
+
+        """
+        if self._closed:
+            raise ValueError("feed() called after close()")
+        if self._buf is None:
+            self._buf = data
+        else:
+            self._buf += data
+        if len(self._buf) < self._wait_until:
+            return []
+        return self._run(False)
+
+    def close(self):
+        """Signal the end of the document and return a list of the
+        remaining results.  Raises ``JSONDecodeError`` if the document is
+        incomplete.
+
+        """
+        if self._closed:
+            return []
+        if self._buf is None:
+            self._buf = ''
+        results = self._run(True)
+        self._closed = True
+        return results
+
+    def _run(self, final):
+        results = []
+        self._parse(final, results)
+        self._compact()
+        return results
+
+    def _need_more(self, token_start):
+        self._pos = token_start
+        self._wait_until = len(self._buf) + (len(self._buf) - token_start)
+
+    def _compact(self):
+        pos = self._pos
+        if pos > 4096 and pos * 2 > len(self._buf):
+            dropped = self._buf[:pos]
+            newlines = dropped.count('\n')
+            if newlines:
+                self._lines += newlines
+                self._last_newline = self._offset + dropped.rindex('\n')
+            self._offset += pos
+            self._buf = self._buf[pos:]
+            self._wait_until -= pos
+            self._pos = 0
+
+    def _error(self, msg, pos):
+        # Like JSONDecodeError(msg, doc, pos) for the whole document,
+        # though only the part still in the buffer is available as doc.
+        buf = self._buf
+        err = JSONDecodeError(msg, buf, pos)
+        abs_pos = self._offset + pos
+        newlines = buf.count('\n', 0, pos)
+        lineno = self._lines + newlines + 1
+        if lineno == 1:
+            colno = abs_pos
+        elif newlines:
+            colno = abs_pos - (self._offset + buf.rindex('\n', 0, pos))
+        else:
+            colno = abs_pos - self._last_newline
+        err.pos = abs_pos
+        err.lineno = lineno
+        err.colno = colno
+        err.args = ('%s: line %d column %d (char %d)' % (
+            msg, lineno, colno, abs_pos),)
+        return err
+
+    def _relocate(self, err):
+        return self._error(err.msg, err.pos)
+
+    def _scan_value(self, pos, final):
+        """Decode the complete value starting at ``pos`` with the
+        decoder's scanner.  Returns ``(value, end)`` or ``_NEED_MORE``.
+
+        """
+        buf = self._buf
+        try:
+            value, end = self.decoder.scan_once(buf, pos)
+        except StopIteration:
+            err = None
+        except JSONDecodeError, err:
+            pass
+        except ValueError:
+            # The C scanner raises a plain ValueError for a string that
+            # starts at the end of the data.
+            if not final:
+                return _NEED_MORE
+            raise self._error("Expecting object", pos)
+        else:
+            if (not final and buf[pos] not in '"{[' and
+                    NUMBER_TAIL.match(buf, end).end() == len(buf)):
+                # A number or constant at the end of the buffer may not
+                # be complete yet.
+                return _NEED_MORE
+            return value, end
+        if err is None or not self._could_be_incomplete(pos, err.pos):
+            # The C scanner stops without a position, or gives that of
+            # an enclosing value, for some errors; the Python scanner
+            # says exactly where they are.
+            err = self._find_error(pos)
+        if err is None:
+            if not final and self._could_continue(pos):
+                return _NEED_MORE
+            raise self._error("Expecting object", pos)
+        if not final and self._could_be_incomplete(pos, err.pos):
+            return _NEED_MORE
+        raise self._relocate(err)
+
+    def _find_error(self, pos):
+        # The error from scanning the value at ``pos`` with the Python
+        # scanner, or None if the value can not even start there.
+        if self._py_scan_once is None:
+            self._py_scan_once = py_make_fast_scanner(self.decoder)
+        try:
+            self._py_scan_once(self._buf, pos)
+        except StopIteration:
+            return None
+        except JSONDecodeError, err:
+            return err
+        except ValueError:
+            # The C string scanner raises a plain ValueError for a
+            # string that starts at the end of the data.
+            return JSONDecodeError("Expecting object", self._buf,
+                                   len(self._buf))
+        return None
+
+    def _could_be_incomplete(self, start, pos):
+        """Return True if the error at ``pos``, in the value starting at
+        ``start``, could be due to the data stopping: it is in a string
+        that has not been closed yet, or the rest of the buffer is a
+        number or constant that more data could complete.  The C
+        scanner also reports the end of the data as an error at the last
+        character.  Any other error will not go away however much more
+        data is fed.
+
+        """
+        buf = self._buf
+        if pos >= len(buf) - 1:
+            return True
+        while True:
+            start = buf.find('"', start)
+            if start < 0 or start > pos:
+                break
+            match = STRING_END.match(buf, start + 1)
+            if match is None:
+                return True
+            start = match.end()
+        pos = WHITESPACE.match(buf, pos).end()
+        return (NUMBER_TAIL.match(buf, pos).end() == len(buf) or
+                self._could_continue(pos))
+
+    def _could_continue(self, pos):
+        rest = self._buf[pos:]
+        if rest == '-':
+            return True
+        for literal in _LITERALS:
+            if len(rest) < len(literal) and literal.startswith(rest):
+                return True
+        return False
+
+
+# States of the event parser
+VALUE, ARRAY_FIRST, OBJECT_FIRST, KEY, COLON, NEXT, DONE = range(7)
+
+
+class IncrementalDecoder(_ChunkedDecoder):
+    """Decodes a JSON document fed to it in chunks into a sequence of
+    ``(event, value)`` pairs, without building the whole document.  The
+    events are:
+
+    ``('start_map', None)``, ``('map_key', key)``, ``('end_map', None)``,
+    ``('start_array', None)``, ``('end_array', None)``,
+    ``('string', s)``, ``('number', n)``, ``('boolean', b)`` and
+    ``('null', None)``.
+
+    Memory use is proportional to the nesting depth plus the largest
+    single string or number, not to the size of the document.  Numbers
+    and strings are decoded with the given (or a new) ``JSONDecoder``,
+    so ``parse_float``, ``parse_int``, ``parse_constant``, ``encoding``
+    and ``strict`` apply; ``object_hook`` and ``object_pairs_hook`` do
+    not, since no objects are built.
+
+        >>> from simplejson.incremental import IncrementalDecoder
+        >>> decoder = IncrementalDecoder()
+        >>> decoder.feed(u'{"a": [1, tr')
+        [('start_map', None), ('map_key', u'a'), ('start_array', None), ('number', 1)]
+        >>> decoder.feed(u'ue]}')
+        [('boolean', True), ('end_array', None), ('end_map', None)]
+        >>> decoder.close()
+        []
+
+    """
+    def __init__(self, decoder=None, **kw):
+        _ChunkedDecoder.__init__(self, decoder, **kw)
+        # True for each enclosing object, False for each array.
+        self._containers = []
+        self._state = VALUE
+
+    def _end_value(self):
+        if self._containers:
+            self._state = NEXT
+        else:
+            self._state = DONE
+
+    def _parse(self, final, results, _w=WHITESPACE.match):
+        buf = self._buf
+        pos = self._pos
+        containers = self._containers
+        append = results.append
+        while True:
+            pos = _w(buf, pos).end()
+            if pos == len(buf):
+                self._pos = pos
+                self._wait_until = 0
+                if final and self._state != DONE:
+                    if self._offset + pos == 0:
+                        raise self._error("No JSON object could be decoded",
+                                          pos)
+                    if self._state in (OBJECT_FIRST, KEY):
+                        raise self._error("Expecting property name", pos)
+                    raise self._error("Expecting object", pos)
+                return
+            state = self._state
+            nextchar = buf[pos]
+            if state == VALUE or state == ARRAY_FIRST:
+                if nextchar == ']' and state == ARRAY_FIRST:
+                    containers.pop()
+                    append(('end_array', None))
+                    pos += 1
+                    self._end_value()
+                elif nextchar == '{':
+                    containers.append(True)
+                    append(('start_map', None))
+                    pos += 1
+                    self._state = OBJECT_FIRST
+                elif nextchar == '[':
+                    containers.append(False)
+                    append(('start_array', None))
+                    pos += 1
+                    self._state = ARRAY_FIRST
+                elif nextchar == '"':
+                    value = self._scan_string(pos, final)
+                    if value is _NEED_MORE:
+                        self._need_more(pos)
+                        return
+                    value, pos = value
+                    append(('string', value))
+                    self._end_value()
+                else:
+                    value = self._scan_value(pos, final)
+                    if value is _NEED_MORE:
+                        self._need_more(pos)
+                        return
+                    value, pos = value
+                    if value is None:
+                        append(('null', None))
+                    elif value is True or value is False:
+                        append(('boolean', value))
+                    else:
+                        append(('number', value))
+                    self._end_value()
+            elif state == OBJECT_FIRST or state == KEY:
+                if nextchar == '}' and state == OBJECT_FIRST:
+                    containers.pop()
+                    append(('end_map', None))
+                    pos += 1
+                    self._end_value()
+                elif nextchar == '"':
+                    key = self._scan_string(pos, final)
+                    if key is _NEED_MORE:
+                        self._need_more(pos)
+                        return
+                    key, pos = key
+                    append(('map_key', key))
+                    self._state = COLON
+                else:
+                    raise self._error("Expecting property name", pos)
+            elif state == COLON:
+                if nextchar != ':':
+                    raise self._error("Expecting : delimiter", pos)
+                pos += 1
+                self._state = VALUE
+            elif state == NEXT:
+                in_object = containers[-1]
+                if nextchar == ',':
+                    pos += 1
+                    if in_object:
+                        self._state = KEY
+                    else:
+                        self._state = VALUE
+                elif nextchar == '}' and in_object:
+                    containers.pop()
+                    append(('end_map', None))
+                    pos += 1
+                    self._end_value()
+                elif nextchar == ']' and not in_object:
+                    containers.pop()
+                    append(('end_array', None))
+                    pos += 1
+                    self._end_value()
+                else:
+                    raise self._error("Expecting , delimiter", pos)
+            else:
+                raise self._error("Extra data", pos)
+
+    def _scan_string(self, pos, final):
+        buf = self._buf
+        if not final and STRING_END.match(buf, pos + 1) is None:
+            return _NEED_MORE
+        decoder = self.decoder
+        try:
+            return decoder.parse_string(buf, pos + 1, decoder.encoding,
+                decoder.strict)
+        except JSONDecodeError, err:
+            raise self._relocate(err)
+
+
+class ArrayItemDecoder(_ChunkedDecoder):
+    """Decodes a JSON document consisting of an array, fed to it in
+    chunks, into the elements of that array.  Each element is decoded
+    as a whole by the given (or a new) ``JSONDecoder``, using the C
+    speedups if they are available, so all of the decoder's options
+    apply.  Memory use is proportional to the largest element.
+
+        >>> from simplejson.incremental import ArrayItemDecoder
+        >>> decoder = ArrayItemDecoder()
+        >>> decoder.feed(u'[{"a": 1}, [2, ')
+        [{u'a': 1}]
+        >>> decoder.feed(u'3], 4]')
+        [[2, 3], 4]
+        >>> decoder.close()
+        []
+
+    """
+    def __init__(self, decoder=None, **kw):
+        _ChunkedDecoder.__init__(self, decoder, **kw)
+        self._state = None
+
+    def _parse(self, final, results, _w=WHITESPACE.match):
+        buf = self._buf
+        pos = self._pos
+        append = results.append
+        while True:
+            pos = _w(buf, pos).end()
+            if pos == len(buf):
+                self._pos = pos
+                self._wait_until = 0
+                if final and self._state != DONE:
+                    if self._state is None:
+                        raise self._error("Expecting [", pos)
+                    raise self._error("Expecting object", pos)
+                return
+            state = self._state
+            nextchar = buf[pos]
+            if state is None:
+                if nextchar != '[':
+                    raise self._error("Expecting [", pos)
+                pos += 1
+                self._state = ARRAY_FIRST
+            elif state == VALUE or state == ARRAY_FIRST:
+                if nextchar == ']' and state == ARRAY_FIRST:
+                    pos += 1
+                    self._state = DONE
+                    continue
+                value = self._scan_value(pos, final)
+                if value is _NEED_MORE:
+                    self._need_more(pos)
+                    return
+                value, pos = value
+                append(value)
+                self._state = NEXT
+            elif state == NEXT:
+                if nextchar == ',':
+                    pos += 1
+                    self._state = VALUE
+                elif nextchar == ']':
+                    pos += 1
+                    self._state = DONE
+                else:
+                    raise self._error("Expecting , delimiter", pos)
+            else:
+                raise self._error("Extra data", pos)
+
+
+def _iterdecode(decoder, fp, chunk_size):
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            break
+        for result in decoder.feed(chunk):
+            yield result
+    for result in decoder.close():
+        yield result
+
+
+def iterparse(fp, chunk_size=DEFAULT_CHUNK_SIZE, cls=None, **kw):
+    """Read the JSON document in ``fp`` (a ``.read()``-supporting
+    file-like object) in chunks of ``chunk_size`` and yield the
+    ``(event, value)`` pairs described in ``IncrementalDecoder``.
+
+    The other arguments are used to make the ``JSONDecoder`` (or ``cls``)
+    that decodes strings and numbers, as for ``simplejson.load``.
+
+    """
+    if cls is None:
+        cls = JSONDecoder
+    return _iterdecode(IncrementalDecoder(cls(**kw)), fp, chunk_size)
+
+
+def iteritems(fp, chunk_size=DEFAULT_CHUNK_SIZE, cls=None, **kw):
+    """Read a JSON document consisting of an array from ``fp`` (a
+    ``.read()``-supporting file-like object) in chunks of ``chunk_size``
+    and yield its elements as each is completed.
+
+    The other arguments are used to make the ``JSONDecoder`` (or ``cls``)
+    that decodes the elements, as for ``simplejson.load``.
+
+    """
+    if cls is None:
+        cls = JSONDecoder
+    return _iterdecode(ArrayItemDecoder(cls(**kw)), fp, chunk_size)
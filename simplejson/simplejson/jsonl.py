@@ -0,0 +1,180 @@
+"""Reading and writing JSON Lines, one JSON document per line
+"""
+from collections import deque
+
+from simplejson.decoder import JSONDecoder, JSONDecodeError
+from simplejson.encoder import JSONEncoder
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+__all__ = ['iterload', 'iterdump', 'dump']
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+DEFAULT_BATCH_LINES = 1000
+
+
+def _line_error(err, lineno):
+    # Report the line of the file rather than the position in the line.
+    err.lineno = lineno
+    err.args = ('%s: line %d column %d' % (err.msg, lineno, err.colno),)
+    return err
+
+
+def _decode_lines(decoder, lines, first_lineno):
+    """Decode the non-blank ``lines`` into a list.  Returns ``(values,
+    None)``, or ``(values, (lineno, msg, line, pos))`` for the first line
+    that is not valid JSON, with the values of the lines before it.
+
+    """
+    decode = decoder.decode
+    values = []
+    append = values.append
+    lineno = first_lineno
+    for line in lines:
+        if line.strip():
+            try:
+                append(decode(line))
+            except JSONDecodeError, err:
+                return values, (lineno, err.msg, line, err.pos)
+        lineno += 1
+    return values, None
+
+
+def _decode_batch((cls, kw, lines, first_lineno)):
+    # Runs in a pool worker.  JSONDecodeError can't be unpickled, so
+    # errors are passed back as data.
+    return _decode_lines(cls(**kw), lines, first_lineno)
+
+
+def _read_batches(fp, batch_lines):
+    lineno = 1
+    batch = []
+    for line in fp:
+        batch.append(line)
+        if len(batch) == batch_lines:
+            yield batch, lineno
+            lineno += len(batch)
+            batch = []
+    if batch:
+        yield batch, lineno
+
+
+def _iter_batch((values, error)):
+    # The lines before a bad one are yielded before it is reported.
+    for value in values:
+        yield value
+    if error is not None:
+        lineno, msg, line, pos = error
+        raise _line_error(JSONDecodeError(msg, line, pos), lineno)
+
+
+def iterload(fp, cls=None, processes=None, batch_lines=DEFAULT_BATCH_LINES,
+        **kw):
+    """Yield the Python object for each line of JSON in ``fp`` (an iterable
+    of lines such as a file object).  Blank lines are skipped.  A line
+    that is not valid JSON raises ``JSONDecodeError`` with ``lineno`` set
+    to its line in ``fp``.
+
+    The other arguments are used to make one ``JSONDecoder`` (or ``cls``)
+    that decodes every line, as for ``simplejson.load``.
+
+    If ``processes`` is given and the ``multiprocessing`` module is
+    available, lines are decoded in batches of ``batch_lines`` by a pool
+    of that many processes, and are still yielded in order.  Only a few
+    batches per process are read ahead.  ``cls`` and the arguments in
+    ``kw`` are then passed to the processes, so hooks such as
+    ``object_hook`` must be module-level functions that can be pickled.
+
+    """
+    if cls is None:
+        cls = JSONDecoder
+    if processes is None or multiprocessing is None:
+        return _iterload(fp, cls(**kw), batch_lines)
+    return _iterload_pool(fp, cls, kw, processes, batch_lines)
+
+
+def _iterload(fp, decoder, batch_lines):
+    for lines, first_lineno in _read_batches(fp, batch_lines):
+        for value in _iter_batch(_decode_lines(decoder, lines,
+                first_lineno)):
+            yield value
+
+
+def _iterload_pool(fp, cls, kw, processes, batch_lines):
+    # If the caller stops early the pool is terminated when it is
+    # garbage collected.
+    pool = multiprocessing.Pool(processes)
+    batches = _read_batches(fp, batch_lines)
+    pending = deque()
+    while True:
+        try:
+            while len(pending) < processes * 2:
+                try:
+                    lines, first_lineno = batches.next()
+                except StopIteration:
+                    break
+                pending.append(pool.apply_async(_decode_batch,
+                    ((cls, kw, lines, first_lineno),)))
+            if not pending:
+                pool.close()
+                pool.join()
+                return
+            batch = pending.popleft().get()
+        except:
+            pool.terminate()
+            raise
+        if batch[1] is not None:
+            pool.terminate()
+        for value in _iter_batch(batch):
+            yield value
+
+
+def iterdump(objs, cls=None, **kw):
+    """Yield a line of JSON, ending with ``'\\n'``, for each object in
+    ``objs``.  The other arguments are used to make one ``JSONEncoder``
+    (or ``cls``) that encodes every object, as for ``simplejson.dumps``,
+    except that ``indent`` is not allowed.
+
+    """
+    if kw.get('indent') is not None:
+        raise ValueError("JSON Lines can not be indented")
+    if cls is None:
+        cls = JSONEncoder
+    encoder = cls(**kw)
+    iterencode = encoder._make_iterencode(_one_shot=True)
+    if encoder.ensure_ascii:
+        join = ''.join
+    else:
+        join = u''.join
+    for obj in objs:
+        chunks = iterencode(obj, 0)
+        if not isinstance(chunks, list):
+            chunks = list(chunks)
+        chunks.append('\n')
+        yield join(chunks)
+
+
+def dump(objs, fp, cls=None, block_size=DEFAULT_BLOCK_SIZE, **kw):
+    """Write each object in ``objs`` to ``fp`` (a ``.write()``-supporting
+    file-like object) as a line of JSON, and return the number of lines
+    written.  Lines are written in blocks of about ``block_size``
+    characters.  The other arguments are as for ``iterdump``.
+
+    """
+    count = 0
+    size = 0
+    block = []
+    for line in iterdump(objs, cls=cls, **kw):
+        block.append(line)
+        size += len(line)
+        if size >= block_size:
+            fp.write(''.join(block))
+            count += len(block)
+            block = []
+            size = 0
+    if block:
+        fp.write(''.join(block))
+        count += len(block)
+    return count
@@ -0,0 +1,292 @@
+"""Lazy JSON decoding, for reading a few values from a large document
+"""
+import re
+
+from simplejson.decoder import JSONDecoder, JSONDecodeError, WHITESPACE
+
+__all__ = ['lazy_loads', 'LazyObject', 'LazyArray']
+
+try:
+    from simplejson._speedups import skip_value as c_skip_value
+except ImportError:
+    c_skip_value = None
+
+# A whole string, or a bracket.  A lone quote is an unterminated string.
+# A backslash may escape any character here, a line break included, as
+# in c_skip_value; what it escapes is checked when the string is decoded.
+TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}"]', re.DOTALL)
+
+# The extent of a number or constant, which is checked when it is decoded.
+SCALAR = re.compile(r'[^\s,\]}]+')
+
+_CLOSE = {'[': ']', '{': '}'}
+
+
+def py_skip_value(s, idx):
+    """Return the index after the JSON value starting at ``idx`` in ``s``,
+    without decoding it.  Only strings and brackets are checked.
+
+    """
+    nextchar = s[idx:idx + 1]
+    if nextchar in _CLOSE or nextchar == '"':
+        stack = []
+        for m in TOKEN.finditer(s, idx):
+            start = m.start()
+            nextchar = s[start]
+            if nextchar == '"':
+                if m.end() == start + 1:
+                    raise JSONDecodeError("Unterminated string starting at",
+                        s, start)
+            elif nextchar in _CLOSE:
+                stack.append(_CLOSE[nextchar])
+            elif not stack or nextchar != stack.pop():
+                raise JSONDecodeError("Expecting object", s, start)
+            if not stack:
+                return m.end()
+        raise JSONDecodeError("Expecting object", s, len(s))
+    m = SCALAR.match(s, idx)
+    if m is None:
+        raise JSONDecodeError("Expecting object", s, idx)
+    return m.end()
+
+skip_value = c_skip_value or py_skip_value
+
+
+class _Document(object):
+    """The text of a lazily decoded document, with the decoder used for
+    the parts of it that are accessed.
+
+    """
+    def __init__(self, s, decoder):
+        self.s = s
+        self.decoder = decoder
+
+    def value(self, start, end):
+        """Return the value from ``start`` to ``end``: a lazy proxy for a
+        container, otherwise the decoded value.  The end of a container
+        may be None until its members are indexed.
+
+        """
+        s = self.s
+        nextchar = s[start]
+        if nextchar == '{':
+            return LazyObject(self, start, end)
+        elif nextchar == '[':
+            return LazyArray(self, start, end)
+        return self.decode(start, end)
+
+    def decode(self, start, end):
+        s = self.s
+        try:
+            value, value_end = self.decoder.scan_once(s, start)
+        except StopIteration:
+            raise JSONDecodeError("Expecting object", s, start)
+        if value_end != end:
+            raise JSONDecodeError("Expecting , delimiter", s, value_end)
+        return value
+
+
+class _LazyContainer(object):
+    __slots__ = ('_doc', '_start', '_end', '_index', '_values')
+
+    def __init__(self, doc, start, end):
+        self._doc = doc
+        self._start = start
+        self._end = end
+        self._index = None
+        self._values = {}
+
+    def decode(self):
+        """Decode the whole container, as ``JSONDecoder.decode`` would.
+        """
+        return self._doc.decode(self._start, self._end)
+
+    def __len__(self):
+        return len(self._get_index())
+
+    def __repr__(self):
+        return '<%s at char %d>' % (self.__class__.__name__, self._start)
+
+    def _members(self, close, _w=WHITESPACE.match):
+        # Yields (key start, value start, value end) for each member,
+        # where the key start is None in an array.
+        doc = self._doc
+        s = doc.s
+        pos = _w(s, self._start + 1).end()
+        if s[pos:pos + 1] == close:
+            self._end = pos + 1
+            return
+        is_object = close == '}'
+        while True:
+            key_start = None
+            if is_object:
+                if s[pos:pos + 1] != '"':
+                    raise JSONDecodeError("Expecting property name", s, pos)
+                key_start = pos
+                pos = _w(s, skip_value(s, pos)).end()
+                if s[pos:pos + 1] != ':':
+                    raise JSONDecodeError("Expecting : delimiter", s, pos)
+                pos = _w(s, pos + 1).end()
+            start = pos
+            pos = skip_value(s, pos)
+            yield key_start, start, pos
+            pos = _w(s, pos).end()
+            nextchar = s[pos:pos + 1]
+            if nextchar == close:
+                self._end = pos + 1
+                return
+            elif nextchar != ',':
+                raise JSONDecodeError("Expecting , delimiter", s, pos)
+            pos = _w(s, pos + 1).end()
+
+    def _get_value(self, key, span):
+        try:
+            return self._values[key]
+        except KeyError:
+            value = self._values[key] = self._doc.value(*span)
+            return value
+
+
+class LazyObject(_LazyContainer):
+    """A JSON object from ``lazy_loads``.  It can be used like a read-only
+    ``dict``, but only the keys of the object are decoded until a value is
+    looked up, and then only that value is decoded.  Objects and arrays
+    within it are returned as ``LazyObject`` and ``LazyArray`` in turn.
+
+    """
+    __slots__ = ('_keys',)
+
+    def _get_index(self):
+        if self._index is None:
+            doc = self._doc
+            s = doc.s
+            decoder = doc.decoder
+            parse_string = decoder.parse_string
+            encoding = decoder.encoding
+            strict = decoder.strict
+            index = {}
+            keys = []
+            for key_start, start, end in self._members('}'):
+                key = parse_string(s, key_start + 1, encoding, strict)[0]
+                if key not in index:
+                    keys.append(key)
+                index[key] = (start, end)
+            self._keys = keys
+            self._index = index
+        return self._index
+
+    def __getitem__(self, key):
+        return self._get_value(key, self._get_index()[key])
+
+    def get(self, key, default=None):
+        span = self._get_index().get(key)
+        if span is None:
+            return default
+        return self._get_value(key, span)
+
+    def __contains__(self, key):
+        return key in self._get_index()
+
+    has_key = __contains__
+
+    def keys(self):
+        self._get_index()
+        return list(self._keys)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    iterkeys = __iter__
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def itervalues(self):
+        for key in self.keys():
+            yield self[key]
+
+    def iteritems(self):
+        for key in self.keys():
+            yield key, self[key]
+
+
+class LazyArray(_LazyContainer):
+    """A JSON array from ``lazy_loads``.  It can be indexed and iterated
+    like a read-only ``list``, decoding only the elements that are used.
+    Objects and arrays within it are returned as ``LazyObject`` and
+    ``LazyArray`` in turn.
+
+    """
+    __slots__ = ()
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = [(start, end)
+                for key_start, start, end in self._members(']')]
+        return self._index
+
+    def __getitem__(self, i):
+        index = self._get_index()
+        if isinstance(i, slice):
+            return [self[j] for j in xrange(*i.indices(len(index)))]
+        if i < 0:
+            i += len(index)
+        if not 0 <= i < len(index):
+            raise IndexError("list index out of range")
+        return self._get_value(i, index[i])
+
+    def __iter__(self):
+        for i in xrange(len(self._get_index())):
+            yield self[i]
+
+
+def lazy_loads(s, cls=None, _w=WHITESPACE.match, **kw):
+    """Return the value of the JSON document ``s`` (a ``str`` or
+    ``unicode`` instance), without decoding any object or array in it until
+    it is used.
+
+    An object is returned as a ``LazyObject`` and an array as a
+    ``LazyArray``; other values are decoded as usual.  Looking a path up
+    in the result, such as ``doc["a"][3]["b"]``, scans the enclosing
+    containers for the keys and extents of their members, but only decodes
+    the value at the end of the path.  ``decode()`` on either returns the
+    container fully decoded.
+
+    Only the structure of the document (strings and brackets) is checked
+    up front, so other errors are raised only when the parts of the
+    document containing them are used.
+
+    The other arguments are used to make the ``JSONDecoder`` (or ``cls``)
+    for the values that are decoded, as for ``simplejson.loads``, except
+    that ``object_hook`` and ``object_pairs_hook`` only apply to objects
+    decoded with ``decode()``.
+
+        >>> from simplejson import lazy_loads
+        >>> doc = lazy_loads(u'{"method": "execute", "params": [1, {"a": 2}]}')
+        >>> doc['params'][1]['a']
+        2
+        >>> doc['params'].decode()
+        [1, {u'a': 2}]
+
+    """
+    if cls is None:
+        cls = JSONDecoder
+    doc = _Document(s, cls(**kw))
+    start = _w(s, 0).end()
+    if start == len(s):
+        raise JSONDecodeError("No JSON object could be decoded", s, start)
+    if s[start] in _CLOSE:
+        # Indexing the members finds the end, without a separate scan.
+        value = doc.value(start, None)
+        value._get_index()
+        end = value._end
+    else:
+        end = skip_value(s, start)
+        value = doc.value(start, end)
+    extra = _w(s, end).end()
+    if extra != len(s):
+        raise JSONDecodeError("Extra data", s, extra, len(s))
+    return value
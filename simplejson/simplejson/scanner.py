@@ -24,6 +24,7 @@ def py_make_scanner(context):
     parse_constant = context.parse_constant
     object_hook = context.object_hook
     object_pairs_hook = context.object_pairs_hook
+    memo = getattr(context, 'memo', None)
 
     def _scan_once(string, idx):
         try:
@@ -35,7 +36,7 @@ def py_make_scanner(context):
             return parse_string(string, idx + 1, encoding, strict)
         elif nextchar == '{':
             return parse_object((string, idx + 1), encoding, strict,
-                _scan_once, object_hook, object_pairs_hook)
+                _scan_once, object_hook, object_pairs_hook, memo)
         elif nextchar == '[':
             return parse_array((string, idx + 1), _scan_once)
         elif nextchar == 'n' and string[idx:idx + 4] == 'null':
@@ -64,4 +65,187 @@ def py_make_scanner(context):
 
     return _scan_once
 
-make_scanner = c_make_scanner or py_make_scanner
+# A value that can be decoded from the match alone, or the bracket that
+# opens a container.  Strings with escapes and invalid values don't match
+# and are handled as py_make_scanner does, so errors are the same.
+_VALUE = (r'(?:"([^"\\\x00-\x1f]*)"'
+          r'|(-?(?:0|[1-9]\d*)(?:\.\d+(?:[eE][-+]?\d+)?|[eE][-+]?\d+))'
+          r'|(-?(?:0|[1-9]\d*))'
+          r'|(true|false|null)'
+          r'|(NaN|Infinity|-Infinity)'
+          r'|([\[{]))')
+_WS = r'[ \t\n\r]*'
+_KEY = r'"([^"\\\x00-\x1f]*)"' + _WS + ':' + _WS
+# Group 1 is the key (always empty in arrays), groups 2 to 7 are the
+# alternatives of _VALUE, and group 8 is the closing bracket.
+_STRING, _FLOAT, _INT, _LITERAL, _CONSTANT, _OPEN, _CLOSE = range(2, 9)
+VALUE_RE = re.compile('()' + _VALUE)
+ARRAY_FIRST_RE = re.compile(_WS + r'(?:()' + _VALUE + r'|(\]))')
+ARRAY_NEXT_RE = re.compile(_WS + r'(?:,' + _WS + '()' + _VALUE + r'|(\]))')
+OBJECT_FIRST_RE = re.compile(_WS + r'(?:' + _KEY + _VALUE + r'|(\}))')
+OBJECT_NEXT_RE = re.compile(_WS + r'(?:,' + _WS + _KEY + _VALUE + r'|(\}))')
+
+_LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+def py_make_fast_scanner(context):
+    """Return a scanner that decodes the same values and raises the same
+    errors as ``py_make_scanner(context)``, but faster.  Each array
+    element or object member with a simple value is matched by a single
+    regular expression, together with the whitespace, separators and key
+    before it, and nested containers are kept on an explicit stack rather
+    than decoded recursively.  Like the C scanner, it does not call the
+    ``parse_object`` and ``parse_array`` of the context.
+
+    """
+    from simplejson.decoder import JSONDecodeError, WHITESPACE
+    parse_string = context.parse_string
+    encoding = context.encoding or 'utf-8'
+    strict = context.strict
+    parse_float = context.parse_float
+    parse_int = context.parse_int
+    parse_constant = context.parse_constant
+    object_hook = context.object_hook
+    object_pairs_hook = context.object_pairs_hook
+    memo = getattr(context, 'memo', None)
+    match_value = VALUE_RE.match
+    match_array_first = ARRAY_FIRST_RE.match
+    match_array_next = ARRAY_NEXT_RE.match
+    match_object_first = OBJECT_FIRST_RE.match
+    match_object_next = OBJECT_NEXT_RE.match
+    _w = WHITESPACE.match
+    literals = _LITERALS
+
+    def _scan_container(s, pos, is_object):
+        # pos is just after the opening bracket.  Each step matches the
+        # next member, or the closing bracket, from pos.
+        is_str = not isinstance(s, unicode)
+        stack = []
+        if is_object:
+            if object_pairs_hook is not None:
+                container = []
+            else:
+                container = {}
+            match = match_object_first
+        else:
+            container = []
+            match = match_array_first
+        first = True
+        while True:
+            m = match(s, pos)
+            if m is not None:
+                i = m.lastindex
+                pos = m.end()
+                if is_object and i != _CLOSE:
+                    key = m.group(1)
+                    if is_str:
+                        key = unicode(key, encoding)
+            else:
+                # Not a simple member, so take it a step at a time.
+                pos = _w(s, pos).end()
+                nextchar = s[pos:pos + 1]
+                if not first:
+                    if nextchar != ',':
+                        if is_object:
+                            raise JSONDecodeError("Expecting , delimiter",
+                                s, pos)
+                        raise JSONDecodeError("Expecting , delimiter", s,
+                            pos + 1)
+                    pos = _w(s, pos + 1).end()
+                    nextchar = s[pos:pos + 1]
+                if is_object:
+                    if nextchar != '"':
+                        raise JSONDecodeError("Expecting property name", s,
+                            pos)
+                    key, pos = parse_string(s, pos + 1, encoding, strict)
+                    pos = _w(s, pos).end()
+                    if s[pos:pos + 1] != ':':
+                        raise JSONDecodeError("Expecting : delimiter", s,
+                            pos)
+                    pos = _w(s, pos + 1).end()
+                m = match_value(s, pos)
+                if m is not None:
+                    i = m.lastindex
+                    pos = m.end()
+                elif s[pos:pos + 1] == '"':
+                    value, pos = parse_string(s, pos + 1, encoding, strict)
+                    i = None
+                else:
+                    raise JSONDecodeError("Expecting object", s, pos)
+            if i == _STRING:
+                value = m.group(_STRING)
+                if is_str:
+                    value = unicode(value, encoding)
+            elif i == _INT:
+                value = parse_int(m.group(_INT))
+            elif i == _FLOAT:
+                value = parse_float(m.group(_FLOAT))
+            elif i == _LITERAL:
+                value = literals[m.group(_LITERAL)]
+            elif i == _CONSTANT:
+                value = parse_constant(m.group(_CONSTANT))
+            elif i == _OPEN:
+                if not is_object:
+                    key = None
+                stack.append((container, is_object, key))
+                is_object = m.group(_OPEN) == '{'
+                if is_object:
+                    if object_pairs_hook is not None:
+                        container = []
+                    else:
+                        container = {}
+                    match = match_object_first
+                else:
+                    container = []
+                    match = match_array_first
+                first = True
+                continue
+            elif i == _CLOSE:
+                value = container
+                if is_object:
+                    if object_pairs_hook is not None:
+                        value = object_pairs_hook(value)
+                    elif object_hook is not None:
+                        value = object_hook(value)
+                if not stack:
+                    return value, pos
+                container, is_object, key = stack.pop()
+            if is_object:
+                if memo is not None:
+                    key = memo.setdefault(key, key)
+                if object_pairs_hook is not None:
+                    container.append((key, value))
+                else:
+                    container[key] = value
+                match = match_object_next
+            else:
+                container.append(value)
+                match = match_array_next
+            first = False
+
+    def scan_once(string, idx):
+        m = match_value(string, idx)
+        if m is None:
+            if string[idx:idx + 1] == '"':
+                return parse_string(string, idx + 1, encoding, strict)
+            raise StopIteration
+        i = m.lastindex
+        if i == _STRING:
+            value = m.group(_STRING)
+            if not isinstance(value, unicode):
+                value = unicode(value, encoding)
+        elif i == _INT:
+            value = parse_int(m.group(_INT))
+        elif i == _FLOAT:
+            value = parse_float(m.group(_FLOAT))
+        elif i == _LITERAL:
+            value = literals[m.group(_LITERAL)]
+        elif i == _CONSTANT:
+            value = parse_constant(m.group(_CONSTANT))
+        else:
+            return _scan_container(string, m.end(), m.group(_OPEN) == '{')
+        return value, m.end()
+
+    return scan_once
+
+make_scanner = c_make_scanner or py_make_fast_scanner
@@ -9,6 +9,8 @@ class OptionalExtensionTestSuite(unittest.TestSuite):
         run(self, result)
         simplejson._toggle_speedups(False)
         run(self, result)
+        simplejson._toggle_speedups(False, fast_scanner=False)
+        run(self, result)
         simplejson._toggle_speedups(True)
         return result
 
@@ -17,9 +19,12 @@ def additional_tests(suite=None):
     import simplejson
     import simplejson.encoder
     import simplejson.decoder
+    import simplejson.incremental
+    import simplejson.lazy
     if suite is None:
         suite = unittest.TestSuite()
-    for mod in (simplejson, simplejson.encoder, simplejson.decoder):
+    for mod in (simplejson, simplejson.encoder, simplejson.decoder,
+                simplejson.incremental, simplejson.lazy):
         suite.addTest(doctest.DocTestSuite(mod))
     suite.addTest(doctest.DocFileSuite('../../index.rst'))
     return suite
@@ -34,13 +39,18 @@ def all_tests_suite():
         'simplejson.tests.test_encode_basestring_ascii',
         'simplejson.tests.test_fail',
         'simplejson.tests.test_float',
+        'simplejson.tests.test_incremental',
         'simplejson.tests.test_indent',
+        'simplejson.tests.test_jsonl',
+        'simplejson.tests.test_lazy',
         'simplejson.tests.test_pass1',
         'simplejson.tests.test_pass2',
         'simplejson.tests.test_pass3',
         'simplejson.tests.test_recursion',
+        'simplejson.tests.test_scanner',
         'simplejson.tests.test_scanstring',
         'simplejson.tests.test_separators',
+        'simplejson.tests.test_tool',
         'simplejson.tests.test_unicode',
     ])
     suite = additional_tests(suite)
@@ -47,3 +47,29 @@ class TestDecode(TestCase):
                                     object_pairs_hook=OrderedDict,
                                     object_hook=lambda x: None),
                          OrderedDict(p))
+        self.assertEqual(json.loads('[{}, {"a": {}}]',
+                                    object_pairs_hook=lambda x: x),
+                         [[], [(u'a', [])]])
+
+    def test_memo(self):
+        s = '[{"key": 1, "other": 2}, {"key": 3}, {"other": {"key": 4}}]'
+        rval = json.loads(s, memo=True)
+        self.assertEqual(rval, json.loads(s))
+        keys = [k for k in rval[0] if k == 'key']
+        keys += [k for k in rval[1]] + [k for k in rval[2]['other']]
+        self.assert_(keys[0] is keys[1] is keys[2])
+        # Without a memo each object has its own copy of the key.
+        rval = json.loads(s)
+        self.assert_([k for k in rval[1]][0] is not
+                     [k for k in rval[2]['other']][0])
+
+    def test_memo_lifetime(self):
+        decoder = json.JSONDecoder(memo=True)
+        self.assertEqual(decoder.decode('{"a": 1}'), {'a': 1})
+        self.assertEqual(decoder.memo, {})
+        memo = {}
+        decoder = json.JSONDecoder(memo=memo)
+        first = decoder.decode('{"a": 1}')
+        second = decoder.decode('{"a": 2}')
+        self.assert_(first.keys()[0] is second.keys()[0])
+        self.assertEqual(memo.keys(), ['a'])
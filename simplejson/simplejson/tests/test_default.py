@@ -7,3 +7,38 @@ class TestDefault(TestCase):
         self.assertEquals(
             json.dumps(type, default=repr),
             json.dumps(repr(type)))
+
+    def test_register_type(self):
+        import datetime
+        import decimal
+        class Point(object):
+            def __init__(self, x, y):
+                self.x = x
+                self.y = y
+        class Point3(Point):
+            pass
+        class Classic:
+            pass
+        enc = json.JSONEncoder(default=repr)
+        enc.register_type(decimal.Decimal, str)
+        enc.register_type(datetime.date, lambda d: d.isoformat())
+        enc.register_type(Point, lambda p: [p.x, p.y])
+        obj = [decimal.Decimal('1.5'), datetime.date(2010, 1, 2),
+               datetime.datetime(2010, 1, 2, 3, 4), Point(1, 2),
+               {"p": Point3(decimal.Decimal('3'), 4)}, type]
+        expect = ('["1.5", "2010-01-02", "2010-01-02T03:04:00", [1, 2], '
+                  '{"p": ["3", 4]}, "<type \'type\'>"]')
+        self.assertEquals(enc.encode(obj), expect)
+        # Again, with the serializers found for each type cached.
+        self.assertEquals(enc.encode(obj), expect)
+        self.assertEquals(enc._type_dispatch[Point3], enc._type_dispatch[Point])
+        self.assertEquals(''.join(enc.iterencode(obj)), expect)
+        # Registering again replaces the cached serializers.
+        enc.register_type(Point3, lambda p: {"x": p.x})
+        self.assertEquals(enc.encode(obj[3:5]), '[[1, 2], {"p": {"x": "3"}}]')
+        enc.register_type(Classic, lambda o: "classic")
+        self.assertEquals(enc.encode([Classic(), object]),
+                          '["classic", "<type \'object\'>"]')
+        self.assertRaises(TypeError, enc.register_type, bool, str)
+        self.assertRaises(TypeError, json.JSONEncoder().encode,
+                          decimal.Decimal('1'))
@@ -19,3 +19,34 @@ class TestDump(TestCase):
         self.assertEquals(json.dumps(
                 {2: 3.0, 4.0: 5L, False: 1, 6L: True, "7": 0}, sort_keys=True),
                 '{"false": 1, "2": 3.0, "4.0": 5, "6": true, "7": 0}')
+
+    def test_dump_blocks(self):
+        class Writer(object):
+            def __init__(self):
+                self.blocks = []
+            def write(self, s):
+                self.blocks.append(s)
+        obj = [{"a": i, "b": [None, "x" * (i % 5)]} for i in range(500)]
+        obj.append({"c": [self, 1.5]})
+        for kw in ({}, {'sort_keys': True}, {'indent': 2},
+                   {'ensure_ascii': False}, {'check_circular': False}):
+            kw['default'] = lambda o: {"d": [2]}
+            expect = json.dumps(obj, **kw)
+            fp = Writer()
+            json.dump(obj, fp, block_size=500, **kw)
+            self.assert_(''.join(fp.blocks) == expect)
+            # Blocks end at the first item boundary past the block size.
+            self.assert_(len(fp.blocks) > 10)
+            self.assert_(max(map(len, fp.blocks)) < 600)
+            fp = Writer()
+            json.dump(obj, fp, **kw)
+            self.assert_(fp.blocks == [expect])
+
+    def test_dump_iterencode_subclass(self):
+        class Encoder(json.JSONEncoder):
+            def iterencode(self, o, _one_shot=False):
+                chunks = json.JSONEncoder.iterencode(self, o, _one_shot)
+                return ['<'] + list(chunks) + ['>']
+        sio = StringIO()
+        json.dump([1], sio, cls=Encoder)
+        self.assertEquals(sio.getvalue(), '<[1]>')
@@ -0,0 +1,141 @@
+import decimal
+from unittest import TestCase
+from StringIO import StringIO
+
+import simplejson as json
+from simplejson.incremental import IncrementalDecoder, ArrayItemDecoder
+
+
+def feed_in_chunks(decoder, s, size):
+    results = []
+    for i in range(0, len(s), size):
+        results.extend(decoder.feed(s[i:i + size]))
+    results.extend(decoder.close())
+    return results
+
+
+class TestIncremental(TestCase):
+    DOC = ('{"a": [1, 2.5, -3e2, true, false, null], "b": {}, "c": [],\n'
+           ' "d": {"e": "f\\"g\\u00e9"}, "h": [[{"i": [-Infinity]}]]}')
+    EVENTS = [
+        ('start_map', None),
+        ('map_key', u'a'), ('start_array', None),
+        ('number', 1), ('number', 2.5), ('number', -300.0),
+        ('boolean', True), ('boolean', False), ('null', None),
+        ('end_array', None),
+        ('map_key', u'b'), ('start_map', None), ('end_map', None),
+        ('map_key', u'c'), ('start_array', None), ('end_array', None),
+        ('map_key', u'd'), ('start_map', None),
+        ('map_key', u'e'), ('string', u'f"g\xe9'), ('end_map', None),
+        ('map_key', u'h'), ('start_array', None), ('start_array', None),
+        ('start_map', None), ('map_key', u'i'), ('start_array', None),
+        ('number', float('-inf')), ('end_array', None), ('end_map', None),
+        ('end_array', None), ('end_array', None),
+        ('end_map', None)]
+
+    def test_events(self):
+        for size in (1, 2, 3, 7, len(self.DOC)):
+            self.assertEquals(
+                feed_in_chunks(IncrementalDecoder(), self.DOC, size),
+                self.EVENTS)
+        self.assertEquals(list(json.iterparse(StringIO(self.DOC),
+                                              chunk_size=5)),
+                          self.EVENTS)
+
+    def test_scalars(self):
+        for s, event in [('12', ('number', 12)), (' "x" ', ('string', u'x')),
+                         ('null', ('null', None))]:
+            self.assertEquals(feed_in_chunks(IncrementalDecoder(), s, 1),
+                              [event])
+
+    def test_split_number(self):
+        decoder = IncrementalDecoder(parse_float=decimal.Decimal)
+        self.assertEquals(decoder.feed('[1'), [('start_array', None)])
+        self.assertEquals(decoder.feed('2.'), [])
+        self.assertEquals(decoder.feed('5e'), [])
+        self.assertEquals(decoder.feed('1, '),
+                          [('number', decimal.Decimal('12.5e1'))])
+        self.assertEquals(decoder.feed('3'), [])
+        self.assertEquals(decoder.feed(']'),
+                          [('number', 3), ('end_array', None)])
+        self.assertEquals(decoder.close(), [])
+
+    def test_items(self):
+        s = '[{"a": [1, 2]}, "b\\n", 3.25, [], {}, null, -Infinity]'
+        expected = [{u'a': [1, 2]}, u'b\n', 3.25, [], {}, None,
+                    float('-inf')]
+        for size in (1, 4, len(s)):
+            self.assertEquals(feed_in_chunks(ArrayItemDecoder(), s, size),
+                              expected)
+        self.assertEquals(list(json.iteritems(StringIO(' [ ] '))), [])
+        self.assertEquals(
+            list(json.iteritems(StringIO('[{"b": 1, "a": 2}]'),
+                                object_pairs_hook=lambda x: x)),
+            [[(u'b', 1), (u'a', 2)]])
+
+    def test_long_document(self):
+        s = json.dumps([{"n": i, "s": "x" * (i % 100)} for i in range(5000)])
+        decoder = ArrayItemDecoder()
+        count = 0
+        for i in range(0, len(s), 1000):
+            count += len(decoder.feed(s[i:i + 1000]))
+            # Consumed input is dropped.
+            self.assert_(len(decoder._buf) < 20000)
+        count += len(decoder.close())
+        self.assertEquals(count, 5000)
+
+    def test_errors(self):
+        for cls, doc, msg, lineno, colno, pos in [
+            (IncrementalDecoder, '', 'No JSON object could be decoded',
+             1, 0, 0),
+            (IncrementalDecoder, '{"a": 1,]', 'Expecting property name',
+             1, 8, 8),
+            (IncrementalDecoder, '[1 2]', 'Expecting , delimiter', 1, 3, 3),
+            (IncrementalDecoder, '{"a" 1}', 'Expecting : delimiter', 1, 5, 5),
+            (IncrementalDecoder, '[1, 2', 'Expecting object', 1, 5, 5),
+            (IncrementalDecoder, '[1]\n[2]', 'Extra data', 2, 1, 4),
+            (IncrementalDecoder, '[tru]', 'Expecting object', 1, 1, 1),
+            (ArrayItemDecoder, '{}', 'Expecting [', 1, 0, 0),
+            (ArrayItemDecoder, '[1, {"a"]', 'Expecting : delimiter',
+             1, 8, 8),
+            (ArrayItemDecoder, '[1] 2', 'Extra data', 1, 4, 4),
+            ]:
+            try:
+                feed_in_chunks(cls(), doc, 2)
+            except json.JSONDecodeError, e:
+                self.assertEquals((e.msg, e.lineno, e.colno, e.pos),
+                                  (msg, lineno, colno, pos))
+            else:
+                self.fail("Unexpected success parsing %r" % (doc,))
+
+    def test_errors_are_found_before_close(self):
+        # A malformed element is reported once the data after it shows
+        # that it can not be completed, rather than the rest of the
+        # document being kept in case it can.
+        tail = '{"b": 2}, ' * 10000
+        for doc, pos in [('[{"a" 1}, ', 6), ('[1, [2 3], ', 8),
+                         ('[{"a": [1, }, ', 11), ('[["a", "b" "c"], ', 12),
+                         ('[{"a": tx}, ', 7), ('[{"a"', 5)]:
+            for size in (1, 100):
+                decoder = ArrayItemDecoder()
+                s = doc + tail
+                try:
+                    for i in range(0, len(s), size):
+                        decoder.feed(s[i:i + size])
+                except json.JSONDecodeError, e:
+                    self.assertEquals(e.pos, pos)
+                    self.assert_(len(decoder._buf) < 1000)
+                else:
+                    self.fail("Unexpected success parsing %r" % (doc,))
+
+    def test_error_position_after_compaction(self):
+        s = '[' + ',\n'.join(['1'] * 10000) + ',\n  x]'
+        decoder = ArrayItemDecoder()
+        try:
+            feed_in_chunks(decoder, s, 1000)
+        except json.JSONDecodeError, e:
+            self.assertEquals((e.lineno, e.colno, e.pos),
+                              (10001, 3, len(s) - 2))
+            self.assert_(decoder._offset > 0)
+        else:
+            self.fail("Unexpected success")
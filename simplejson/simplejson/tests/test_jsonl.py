@@ -0,0 +1,75 @@
+import decimal
+from unittest import TestCase
+from StringIO import StringIO
+
+import simplejson as json
+from simplejson import jsonl
+
+
+class TestJSONLines(TestCase):
+    RECORDS = [{"a": 1, "b": [1.5, None, True]}, [], "x\ny", 3,
+               {"c": u"\xe9"}]
+
+    def test_roundtrip(self):
+        fp = StringIO()
+        self.assertEquals(jsonl.dump(self.RECORDS, fp, block_size=10), 5)
+        lines = fp.getvalue().splitlines()
+        self.assertEquals(len(lines), 5)
+        self.assertEquals(lines[0], json.dumps(self.RECORDS[0]))
+        self.assertEquals(list(jsonl.iterload(StringIO(fp.getvalue()))),
+                          self.RECORDS)
+
+    def test_options(self):
+        lines = list(jsonl.iterdump([{"b": 1, "a": u"\xe9"}],
+                                    sort_keys=True, ensure_ascii=False,
+                                    separators=(',', ':')))
+        self.assertEquals(lines, [u'{"a":"\xe9","b":1}\n'])
+        self.assertRaises(ValueError, list, jsonl.iterdump([[]], indent=2))
+        values = list(jsonl.iterload(StringIO('1.5\n\n  \n[2.5]\n'),
+                                     parse_float=decimal.Decimal))
+        self.assertEquals(values, [decimal.Decimal('1.5'),
+                                   [decimal.Decimal('2.5')]])
+
+    def test_error_line(self):
+        doc = '1\n2\n\n{"a" 3}\n4\n'
+        for batch_lines in (1, 2, 1000):
+            try:
+                list(jsonl.iterload(StringIO(doc), batch_lines=batch_lines))
+            except json.JSONDecodeError, e:
+                self.assertEquals((e.msg, e.lineno, e.colno),
+                                  ('Expecting : delimiter', 4, 5))
+            else:
+                self.fail("Unexpected success")
+
+    def test_values_before_error(self):
+        for kw in ({}, {'batch_lines': 2}, {'processes': 2}):
+            if 'processes' in kw and jsonl.multiprocessing is None:
+                continue
+            values = []
+            try:
+                for value in jsonl.iterload(StringIO('1\n2\n3\n{bad\n5\n'),
+                                            **kw):
+                    values.append(value)
+            except json.JSONDecodeError, e:
+                self.assertEquals(e.lineno, 4)
+            else:
+                self.fail("Unexpected success")
+            self.assertEquals(values, [1, 2, 3])
+
+    def test_processes(self):
+        if jsonl.multiprocessing is None:
+            return
+        records = [{"n": i, "s": "x" * (i % 7)} for i in range(2500)]
+        fp = StringIO()
+        jsonl.dump(records, fp)
+        self.assertEquals(
+            list(jsonl.iterload(StringIO(fp.getvalue()), processes=2,
+                                batch_lines=100)),
+            records)
+        try:
+            list(jsonl.iterload(StringIO(fp.getvalue() + '[\n'),
+                                processes=2, batch_lines=100))
+        except json.JSONDecodeError, e:
+            self.assertEquals(e.lineno, 2501)
+        else:
+            self.fail("Unexpected success")
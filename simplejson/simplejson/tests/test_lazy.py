@@ -0,0 +1,90 @@
+import decimal
+from unittest import TestCase
+
+import simplejson as json
+from simplejson.lazy import LazyObject, LazyArray
+
+
+class TestLazy(TestCase):
+    DOC = ('{"a": [0, 1, 2, {"b": "x\\"]}", "c": [true, null]}],'
+           ' "d": 1.5, "e": {}, "f": [], "a\\u00e9": "\\u00e9"}')
+
+    def test_paths(self):
+        doc = json.lazy_loads(self.DOC)
+        self.assert_(isinstance(doc, LazyObject))
+        self.assert_(isinstance(doc['a'], LazyArray))
+        self.assertEquals(doc['a'][3]['b'], u'x"]}')
+        self.assertEquals(doc['a'][-1]['c'][0], True)
+        self.assertEquals(doc['a'][1:3], [1, 2])
+        self.assertEquals(doc['d'], 1.5)
+        self.assertEquals(doc[u'a\xe9'], u'\xe9')
+        self.assertEquals(doc.keys(), [u'a', u'd', u'e', u'f', u'a\xe9'])
+        self.assertEquals(len(doc['a']), 4)
+        self.assertEquals(len(doc['e']), 0)
+        self.assertEquals(list(doc['f']), [])
+        self.assert_('d' in doc and 'z' not in doc)
+        self.assertEquals(doc.get('z', 7), 7)
+        self.assertRaises(KeyError, doc.__getitem__, 'z')
+        self.assertRaises(IndexError, doc['a'].__getitem__, 4)
+        # Values are decoded once.
+        self.assert_(doc['a'] is doc['a'])
+
+    def test_decode(self):
+        doc = json.lazy_loads(self.DOC)
+        self.assertEquals(doc.decode(), json.loads(self.DOC))
+        self.assertEquals(doc['a'][3].decode(), {'b': u'x"]}',
+                                                 'c': [True, None]})
+        self.assertEquals(json.lazy_loads(' "x" '), u'x')
+        self.assertEquals(json.lazy_loads('12'), 12)
+        doc = json.lazy_loads('{"n": 1.5}', parse_float=decimal.Decimal)
+        self.assertEquals(doc['n'], decimal.Decimal('1.5'))
+
+    def test_siblings_not_decoded(self):
+        # The bad number is only found when it is used.
+        doc = json.lazy_loads('[{"a": 1}, 01, [2]]')
+        self.assertEquals(doc[0]['a'], 1)
+        self.assertEquals(doc[2][0], 2)
+        self.assertRaises(json.JSONDecodeError, doc.__getitem__, 1)
+
+    def test_errors(self):
+        for doc, msg in [('', 'No JSON object could be decoded'),
+                         ('[1, 2', 'Expecting , delimiter'),
+                         ('[1, 2}', 'Expecting , delimiter'),
+                         ('[[1, 2}]', 'Expecting object'),
+                         ('["a]', 'Unterminated string starting at'),
+                         ('[1] 2', 'Extra data')]:
+            try:
+                json.lazy_loads(doc)
+            except json.JSONDecodeError, e:
+                self.assertEquals(e.msg, msg)
+            else:
+                self.fail("Unexpected success parsing %r" % (doc,))
+        # The members of nested containers are only checked when used.
+        doc = json.lazy_loads('[{"a" 1}]')
+        self.assertRaises(json.JSONDecodeError, doc[0].keys)
+        doc = json.lazy_loads('{"a": [1 2]}')
+        self.assertRaises(json.JSONDecodeError, len, doc['a'])
+
+    def test_skip_value(self):
+        from simplejson import lazy
+        s = u' [{"a": "]\\"", "b": [[], {}]}, 1] "x\\\\" 12 '
+        for skip_value in (lazy.py_skip_value, lazy.c_skip_value):
+            if skip_value is None:
+                continue
+            for text in (s, s.encode('ascii')):
+                self.assertEquals(skip_value(text, 1), 33)
+                self.assertEquals(skip_value(text, 34), 39)
+                self.assertEquals(skip_value(text, 40), 42)
+                # An escaped line break is only an error once decoded.
+                self.assertEquals(skip_value(text[:1] + '"a\\\nb"', 1), 7)
+                for doc, msg, pos in [('[1, {]', 'Expecting object', 5),
+                                      ('[1', 'Expecting object', 2),
+                                      ('["a', 'Unterminated string starting at',
+                                       1),
+                                      (',', 'Expecting object', 0)]:
+                    try:
+                        skip_value(doc, 0)
+                    except json.JSONDecodeError, e:
+                        self.assertEquals((e.msg, e.pos), (msg, pos))
+                    else:
+                        self.fail("Unexpected success parsing %r" % (doc,))
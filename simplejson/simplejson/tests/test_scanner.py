@@ -0,0 +1,59 @@
+import decimal
+from unittest import TestCase
+
+import simplejson as json
+from simplejson import decoder, scanner
+
+
+class TestFastScanner(TestCase):
+    DOCS = [
+        '{"a": [1, 2.5, -3e2, {"b\\n": "x\\"y", "c": null}], "d": true,'
+        ' "e": false, "f": "\\u00e9", "g": NaN, "h": -Infinity, "i": []}',
+        ' [ 1 , { "a" : [ ] , "b" : { } } ] ',
+        '[{"k": {}}, [[], [1]], "s", 0, -0.5E+3, Infinity]',
+        '"\\u00e9x"', '-0', '12.5e1', 'true', '{}', '[]',
+        '{"a": 1, "a": 2}',
+    ]
+    BAD_DOCS = [
+        '', ' 1', '[', '[1', '[1 ', '[1,', '[1,]', '[1 2]', '[01]',
+        '{', '{"a"', '{"a" 1}', '{"a": }', '{"a": 1,}', '{"a": 1 "b": 2}',
+        '{1: 2}', '["a\\x"]', '["a', '{"a\\n": 1 2}', '[-]', '[1.]', '[tru]',
+        '["\x01"]',
+    ]
+
+    def scan(self, make_scanner, doc, **kw):
+        # As without the C speedups, which return str for some strings.
+        old_scanstring = decoder.scanstring
+        decoder.scanstring = decoder.py_scanstring
+        try:
+            dec = json.JSONDecoder(**kw)
+            dec.parse_string = decoder.py_scanstring
+            dec.scan_once = make_scanner(dec)
+            try:
+                return dec.raw_decode(doc)
+            except json.JSONDecodeError, e:
+                return e.msg, e.pos
+            except StopIteration:
+                return StopIteration
+        finally:
+            decoder.scanstring = old_scanstring
+
+    def test_same_as_py_scanner(self):
+        for doc in self.DOCS + self.BAD_DOCS:
+            for text in (doc, doc.decode('ascii')):
+                for kw in ({}, {'object_pairs_hook': list}, {'memo': True},
+                           {'parse_float': decimal.Decimal},
+                           {'strict': False}):
+                    self.assertEquals(
+                        repr(self.scan(scanner.py_make_fast_scanner, text,
+                                       **kw)),
+                        repr(self.scan(scanner.py_make_scanner, text, **kw)))
+
+    def test_deep_nesting(self):
+        depth = 10000
+        doc = '[{"a": ' * depth + '1' + '}]' * depth
+        value, end = self.scan(scanner.py_make_fast_scanner, doc)
+        self.assertEquals(end, len(doc))
+        for i in xrange(depth):
+            value = value[0]['a']
+        self.assertEquals(value, 1)
@@ -0,0 +1,122 @@
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+from StringIO import StringIO
+
+from simplejson import tool
+
+
+class TestTool(TestCase):
+    DOCS = {
+        'a.json': '{"b": 1, "a": [1, 2, {"c": null}]}',
+        'sub/array.json': '[{"z": 1, "y": 2}, [], "s"]\n',
+        'sub/empty.json': ' []',
+        'sub/bad.json': '[1, {"a" 2}]',
+        'notes.txt': 'not json',
+    }
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.dir, 'sub'))
+        for name, doc in self.DOCS.items():
+            self.write(name, doc)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, *name.split('/'))
+
+    def write(self, name, doc):
+        f = open(self.path(name), 'wb')
+        try:
+            f.write(doc)
+        finally:
+            f.close()
+
+    def read(self, name):
+        f = open(self.path(name), 'rb')
+        try:
+            return f.read()
+        finally:
+            f.close()
+
+    def settings(self, **kw):
+        settings = {'compact': False, 'sort_keys': False, 'in_place': False,
+                    'stream_size': tool.DEFAULT_STREAM_SIZE}
+        settings.update(kw)
+        return settings
+
+    def test_check(self):
+        for stream_size in (1, tool.DEFAULT_STREAM_SIZE):
+            for jobs in (1, 2):
+                out = StringIO()
+                failed = tool.process_files(
+                    tool._find_files([self.dir]),
+                    self.settings(stream_size=stream_size), jobs=jobs,
+                    stats=True, out=out)
+                self.assertEquals(failed, 1)
+                lines = out.getvalue().splitlines()
+                self.assert_(lines[0].startswith(self.path('a.json') +
+                                                 ': 34 bytes in '))
+                self.assertEquals(
+                    [line for line in lines if 'Expecting' in line],
+                    [self.path('sub/bad.json') +
+                     ': Expecting : delimiter: line 1 column 9 (char 9)'])
+                self.assert_(lines[-1].startswith('4 files, '))
+                self.assert_(lines[-1].endswith(', 1 invalid'))
+
+    def test_in_place(self):
+        for stream_size in (1, tool.DEFAULT_STREAM_SIZE):
+            for kw, expect in [
+                    ({}, '[\n    {\n        "z": 1, \n        "y": 2\n'
+                         '    }, \n    [], \n    "s"\n]\n'),
+                    ({'compact': True, 'sort_keys': True},
+                     '[{"y":2,"z":1},[],"s"]\n')]:
+                self.write('sub/array.json', self.DOCS['sub/array.json'])
+                settings = self.settings(in_place=True,
+                                         stream_size=stream_size, **kw)
+                paths = [self.path('sub/array.json'),
+                         self.path('sub/empty.json')]
+                self.assertEquals(tool.process_files(paths, settings,
+                                                     jobs=1), 0)
+                self.assertEquals(self.read('sub/array.json'), expect)
+                self.assertEquals(self.read('sub/empty.json'), '[]\n')
+                # The same again changes nothing.
+                out = StringIO()
+                tool.process_files(paths, settings, jobs=1, stats=True,
+                                   out=out)
+                self.assert_(out.getvalue().endswith(', 0 changed\n'))
+        self.assertEquals(sorted(os.listdir(self.path('sub'))),
+                          ['array.json', 'bad.json', 'empty.json'])
+
+    def test_in_place_invalid(self):
+        out = StringIO()
+        settings = self.settings(in_place=True)
+        self.assertEquals(tool.process_files([self.path('sub/bad.json')],
+                                             settings, out=out), 1)
+        self.assertEquals(self.read('sub/bad.json'), self.DOCS['sub/bad.json'])
+
+    def test_main(self):
+        out = self.path('out.json')
+        tool.main([self.path('a.json'), out])
+        self.assertEquals(self.read('out.json'),
+            '{\n    "b": 1, \n    "a": [\n        1, \n        2, \n'
+            '        {\n            "c": null\n        }\n    ]\n}\n')
+        tool.main(['--compact', '--sort-keys', self.path('a.json'), out])
+        self.assertEquals(self.read('out.json'),
+                          '{"a":[1,2,{"c":null}],"b":1}\n')
+        self.assertRaises(SystemExit, tool.main, [self.path('sub/bad.json'),
+                                                  out])
+        tool.main(['--check', '-j', '1', self.path('a.json')])
+        stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            self.assertRaises(SystemExit, tool.main,
+                              ['--check', '-j', '1', self.path('sub')])
+            self.assert_(sys.stderr.getvalue().startswith(
+                self.path('sub/bad.json') + ': Expecting'))
+        finally:
+            sys.stderr = stderr
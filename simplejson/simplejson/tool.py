@@ -9,28 +9,300 @@ Usage::
     $ echo '{ 1.2:3.4}' | python -m simplejson.tool
     Expecting property name: line 1 column 2 (char 2)
 
+Many files, or directories of ``.json`` files, can be checked or
+reformatted in place across a pool of processes::
+
+    $ python -m simplejson.tool --check --stats fixtures/
+    $ python -m simplejson.tool --in-place --sort-keys fixtures/
+
 """
+import filecmp
+import optparse
+import os
+import stat
 import sys
+import tempfile
+import time
+from itertools import imap
+
 import simplejson as json
+try:
+    import multiprocessing
+except ImportError:
+    multiprocessing = None
+
+USAGE = """%prog [options] [infile [outfile]]
+       %prog --check|--in-place [options] file-or-directory ..."""
+
+# Files at least this large are streamed rather than read into memory.
+DEFAULT_STREAM_SIZE = 16 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def _make_encoder(settings):
+    if settings['compact']:
+        return json.JSONEncoder(sort_keys=settings['sort_keys'],
+            separators=(',', ':'))
+    return json.JSONEncoder(sort_keys=settings['sort_keys'], indent='    ')
+
+
+def _first_char(infile):
+    # The first non-whitespace character, leaving infile at the start.
+    char = ''
+    while True:
+        data = infile.read(DEFAULT_CHUNK_SIZE)
+        if not data:
+            break
+        data = data.lstrip()
+        if data:
+            char = data[0]
+            break
+    infile.seek(0)
+    return char
+
+
+def _write_array(infile, outfile, encoder):
+    """Reformat the array in ``infile`` one element at a time, in the
+    same way that ``encoder`` would reformat the whole array.
+
+    """
+    iterencode = encoder._make_iterencode(_one_shot=True)
+    if encoder.indent is None:
+        newline_indent = ''
+    else:
+        newline_indent = '\n' + encoder.indent
+    buf = '[' + newline_indent
+    first = True
+    for item in json.iteritems(infile, object_pairs_hook=json.OrderedDict):
+        block = [buf]
+        block.extend(iterencode(item, 1))
+        outfile.write(''.join(block))
+        buf = encoder.item_separator + newline_indent
+        first = False
+    if first:
+        outfile.write('[]')
+    elif encoder.indent is None:
+        outfile.write(']')
+    else:
+        outfile.write('\n]')
+
+
+def _reformat(infile, outfile, settings, size):
+    """Write the document in ``infile`` to ``outfile``, formatted as
+    given by ``settings``, or only check it if ``outfile`` is None.
+    Large documents are decoded incrementally.
+
+    """
+    if size is not None and size >= settings['stream_size']:
+        if outfile is None:
+            for event in json.iterparse(infile):
+                pass
+            return
+        if _first_char(infile) == '[':
+            _write_array(infile, outfile, _make_encoder(settings))
+            outfile.write('\n')
+            return
+    obj = json.load(infile, object_pairs_hook=json.OrderedDict)
+    if outfile is not None:
+        _make_encoder(settings).dump(obj, outfile)
+        outfile.write('\n')
+
+
+def _rewrite(path, settings, size):
+    # Write to a new file beside the old one, and replace it only if the
+    # output differs.  Returns True if the file was changed.
+    infile = open(path, 'rb')
+    try:
+        if size < settings['stream_size']:
+            data = infile.read()
+            obj = json.loads(data, object_pairs_hook=json.OrderedDict)
+            output = _make_encoder(settings).encode(obj) + '\n'
+            if output == data:
+                return False
+    finally:
+        infile.close()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+    try:
+        outfile = os.fdopen(fd, 'wb')
+        try:
+            if size < settings['stream_size']:
+                outfile.write(output)
+            else:
+                infile = open(path, 'rb')
+                try:
+                    _reformat(infile, outfile, settings, size)
+                finally:
+                    infile.close()
+        finally:
+            outfile.close()
+        if (size >= settings['stream_size']
+                and filecmp.cmp(tmp_path, path, shallow=False)):
+            os.remove(tmp_path)
+            return False
+        os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        os.rename(tmp_path, path)
+    except:
+        os.remove(tmp_path)
+        raise
+    return True
+
+
+def _process((path, settings)):
+    """Check or rewrite the file at ``path``.  Runs in a pool worker, so
+    errors are returned as messages.  Returns ``(path, error, changed,
+    size, seconds)``.
+
+    """
+    start = time.time()
+    error = None
+    changed = False
+    size = 0
+    try:
+        size = os.path.getsize(path)
+        if settings['in_place']:
+            changed = _rewrite(path, settings, size)
+        else:
+            infile = open(path, 'rb')
+            try:
+                _reformat(infile, None, settings, size)
+            finally:
+                infile.close()
+    except (ValueError, EnvironmentError), e:
+        error = str(e)
+    return path, error, changed, size, time.time() - start
+
+
+def _find_files(args):
+    for arg in args:
+        if os.path.isdir(arg):
+            for dirpath, dirnames, filenames in os.walk(arg):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.endswith('.json'):
+                        yield os.path.join(dirpath, filename)
+        else:
+            yield arg
+
+
+def _rate(size, seconds):
+    if seconds <= 0:
+        return 0.0
+    return size / seconds / (1024 * 1024)
+
 
-def main():
-    if len(sys.argv) == 1:
+def process_files(paths, settings, jobs=None, stats=False, out=None):
+    """Check (or with ``settings['in_place']``, reformat) each of
+    ``paths``, using a pool of ``jobs`` processes if there is more than
+    one.  Errors, and the time taken for each file if ``stats`` is true,
+    are reported to ``out``.  Returns the number of invalid files.
+
+    """
+    if out is None:
+        out = sys.stderr
+    start = time.time()
+    tasks = [(path, settings) for path in paths]
+    if jobs is None and multiprocessing is not None:
+        jobs = multiprocessing.cpu_count()
+    pool = None
+    if jobs > 1 and len(tasks) > 1 and multiprocessing is not None:
+        pool = multiprocessing.Pool(jobs)
+        # Send small files to the workers in batches, while keeping each
+        # worker busy until the end.
+        results = pool.imap(_process, tasks,
+                            max(1, min(64, len(tasks) // (jobs * 4))))
+    else:
+        results = imap(_process, tasks)
+    failed = changed = total_size = 0
+    try:
+        for path, error, file_changed, size, seconds in results:
+            total_size += size
+            if error is not None:
+                failed += 1
+                out.write('%s: %s\n' % (path, error))
+            elif file_changed:
+                changed += 1
+            if stats:
+                out.write('%s: %d bytes in %.3fs (%.1f MB/s)\n' % (
+                    path, size, seconds, _rate(size, seconds)))
+    except:
+        if pool is not None:
+            pool.terminate()
+        raise
+    if pool is not None:
+        pool.close()
+        pool.join()
+    if stats:
+        seconds = time.time() - start
+        out.write('%d files, %d bytes in %.3fs (%.1f MB/s), %d invalid' % (
+            len(tasks), total_size, seconds, _rate(total_size, seconds),
+            failed))
+        if settings['in_place']:
+            out.write(', %d changed' % (changed,))
+        out.write('\n')
+    return failed
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage=USAGE)
+    parser.add_option('-c', '--check', action='store_true', default=False,
+        help='only check that each file is valid JSON')
+    parser.add_option('-i', '--in-place', action='store_true', default=False,
+        help='reformat each file in place, if it changes')
+    parser.add_option('--compact', action='store_true', default=False,
+        help='write without indentation or spaces')
+    parser.add_option('--sort-keys', action='store_true', default=False,
+        help='sort the keys of objects')
+    parser.add_option('-j', '--jobs', type='int', default=None,
+        help='number of processes to use (default: one per CPU)')
+    parser.add_option('--stats', action='store_true', default=False,
+        help='report the time taken for each file, and the throughput')
+    parser.add_option('--stream-size', type='int',
+        default=DEFAULT_STREAM_SIZE, metavar='BYTES',
+        help='decode files of at least this size incrementally')
+    options, args = parser.parse_args(argv)
+    settings = {
+        'compact': options.compact,
+        'sort_keys': options.sort_keys,
+        'in_place': options.in_place,
+        'stream_size': options.stream_size,
+    }
+    if options.check and options.in_place:
+        parser.error('--check and --in-place can not be used together')
+    if options.in_place and not args:
+        parser.error('--in-place needs files to reformat')
+    if options.check and not args:
+        try:
+            _reformat(sys.stdin, None, settings, None)
+        except ValueError, e:
+            raise SystemExit(e)
+        return
+    if options.check or options.in_place:
+        failed = process_files(_find_files(args), settings,
+            jobs=options.jobs, stats=options.stats)
+        if failed:
+            raise SystemExit(1)
+        return
+    if len(args) > 2 or (args and os.path.isdir(args[0])):
+        parser.error('use --check or --in-place for many files')
+    size = None
+    if not args:
         infile = sys.stdin
-        outfile = sys.stdout
-    elif len(sys.argv) == 2:
-        infile = open(sys.argv[1], 'rb')
-        outfile = sys.stdout
-    elif len(sys.argv) == 3:
-        infile = open(sys.argv[1], 'rb')
-        outfile = open(sys.argv[2], 'wb')
     else:
-        raise SystemExit(sys.argv[0] + " [infile [outfile]]")
+        infile = open(args[0], 'rb')
+        size = os.path.getsize(args[0])
+    if len(args) == 2:
+        outfile = open(args[1], 'wb')
+    else:
+        outfile = sys.stdout
+    start = time.time()
     try:
-        obj = json.load(infile, object_pairs_hook=json.OrderedDict)
+        _reformat(infile, outfile, settings, size)
     except ValueError, e:
         raise SystemExit(e)
-    json.dump(obj, outfile, sort_keys=True, indent='    ')
-    outfile.write('\n')
+    if options.stats and size is not None:
+        seconds = time.time() - start
+        sys.stderr.write('%s: %d bytes in %.3fs (%.1f MB/s)\n' % (
+            args[0], size, seconds, _rate(size, seconds)))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""Time source-code generation for the test corpus and for real modules,
+parsed as the tutorial parses them.
+
+    python scripts/bench_generate.py [repeat] [module.py ...]
+
+Without module paths, the largest modules of the Python 2.5 library in
+the pypy checkout beside this one that the generator supports are used.
+Modules which do not parse, or which use constructs that the generator
+does not support, are reported and skipped.
+
+"""
+import os
+import sys
+import time
+
+import pypybits.transformer as transformer
+import pyparser.error
+import sourcecodegen
+import sourcecodegen.tests.base
+
+LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                       os.pardir, os.pardir, 'pypy', 'lib-python', '2.5.2')
+MODULES = ['optparse', 'difflib', 'pickle', 'Cookie', 'ConfigParser',
+           'smtplib', 'sunau', 'webbrowser', 'stringprep', 'bdb']
+
+
+def default_paths():
+    paths = [os.path.splitext(sourcecodegen.tests.base.__file__)[0] + '.py']
+    for name in MODULES:
+        paths.append(os.path.join(LIBRARY, name + '.py'))
+    return paths
+
+
+def main(repeat=5, *paths):
+    repeat = int(repeat)
+    total = 0.0
+    for path in paths or default_paths():
+        try:
+            tree = transformer.parse(open(path).read())
+            source = sourcecodegen.generate_code(tree)
+        except (pyparser.error.SyntaxError, AttributeError,
+                NotImplementedError), e:
+            print '%-24s unsupported: %s' % (os.path.basename(path), e)
+            continue
+        best = None
+        for i in xrange(repeat):
+            t = time.time()
+            sourcecodegen.generate_code(tree)
+            t = time.time() - t
+            if best is None or t < best:
+                best = t
+        total += best
+        print '%-24s %7.3fs %9d bytes' % (os.path.basename(path), best,
+                                          len(source))
+    print '%-24s %7.3fs' % ('total', total)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
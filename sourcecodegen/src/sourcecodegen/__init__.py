@@ -1,4 +1,5 @@
 from sourcecodegen.generation import ModuleSourceCodeGenerator
 from sourcecodegen.generation import generate_code
+from sourcecodegen.generation import map_line
 
 
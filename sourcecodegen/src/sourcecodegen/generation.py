@@ -1,3 +1,6 @@
+import sys
+from bisect import bisect_right
+
 from visitor import ASTVisitor
 
 class ModuleSourceCodeGenerator(object):
@@ -11,5 +14,25 @@ class ModuleSourceCodeGenerator(object):
         visitor = ASTVisitor(self.tree)
         return visitor()
 
-def generate_code(tree):
-    return ModuleSourceCodeGenerator(tree).getSourceCode()
+    def getSourceCodeAndMap(self):
+        """Returns the source code and a source map, which relates its
+        lines to the ``lineno`` of the nodes they were generated
+        from (see ``map_line``)."""
+
+        visitor = ASTVisitor(self.tree)
+        return visitor(source_map=True)
+
+def generate_code(tree, source_map=False):
+    generator = ModuleSourceCodeGenerator(tree)
+    if source_map:
+        return generator.getSourceCodeAndMap()
+    return generator.getSourceCode()
+
+def map_line(source_map, line):
+    """Returns the line of the original source that a line of generated
+    code was written for, or ``None`` if it is not known."""
+
+    index = bisect_right(source_map, (line, sys.maxint)) - 1
+    if index < 0 or not source_map[index][1]:
+        return None
+    return source_map[index][1]
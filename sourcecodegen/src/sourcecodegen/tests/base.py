@@ -12,6 +12,7 @@ from compiler import parse
 from compiler import pycodegen
 
 from sourcecodegen.generation import ModuleSourceCodeGenerator
+from sourcecodegen.generation import map_line
 
 version = sys.version_info[:3]
 
@@ -335,6 +336,28 @@ class TestSourceCodeGeneration(unittest.TestCase):
         self.assertEqual(verify_source(
             "'0'\n0"), None)
 
+    def testSourceMap(self):
+        source = textwrap.dedent("""\
+            def foo(bar,
+                    boo):
+                if bar:
+
+                    return boo
+                elif boo(bar,
+                         bar):
+                    pass
+                else:
+                    moo = [
+                        bar]
+            """)
+        generator = ModuleSourceCodeGenerator(fix_tree(parse(source, 'exec')))
+        code, source_map = generator.getSourceCodeAndMap()
+        self.assertEqual(code, generator.getSourceCode())
+        self.assertEqual(len(code.splitlines()), 7)
+        self.assertEqual([map_line(source_map, line) for line in range(1, 8)],
+                         [1, 3, 5, 6, 8, 3, 10])
+        self.assertEqual(map_line(source_map, 0), None)
+
     @verify
     def testIndentation(self):
         for abc in abc:
@@ -2,8 +2,6 @@ import sys
 
 import pypybits.ast as ast
 
-from cStringIO import StringIO
-
 version = sys.version_info[:3]
 
 def triple_quote(doc):
@@ -20,9 +18,12 @@ def format_ass(node):
     return node.name
 
 class prioritized(object):
-    def __init__(self, generator, priority):
+    __slots__ = ('generator', 'priority', 'lineno')
+
+    def __init__(self, generator, priority, lineno=None):
         self.generator = generator
         self.priority = priority
+        self.lineno = lineno
 
     def __iter__(self):
         return self.generator
@@ -77,70 +78,190 @@ def n_ary(symbol, priority):
         yield ')'
     return visit
 
+def mark_line(lines, line, lineno):
+    if not lines or lines[-1][1] != lineno:
+        lines.append((line, lineno))
+
 class CodeStream(object):
-    def __init__(self, indentation_string="\t"):
+    """Writes code fragments to a list of strings which is joined once
+    at the end.
+
+    A value is a fragment of code (a string), ``None`` to end the line,
+    or an iterable of values.  Tuples are indented one level further
+    unless they start a new line.  Nested values are walked with an
+    explicit stack of iterators rather than by recursion, so that
+    deeply nested code does not hit the recursion limit.
+
+    If ``source_map`` is true, the stream also records the line number
+    of the node that each line of code was written for (see
+    ``getsourcemap``)."""
+
+    def __init__(self, indentation_string="\t", source_map=False):
         self.indentation_string = indentation_string
         self.indentation = 0
-        self.stream = StringIO()
+        self.fragments = []
         self.clear = True
+        if source_map:
+            self.lines = []
+        else:
+            self.lines = None
+        self.line = 1
+        self.lineno = 0
+        self.pending = True
 
     def __call__(self, value):
-        if value is None:
-            return self.write(None)
-
-        if isinstance(value, basestring):
-            return self.out(value)
-
-        if isinstance(value, tuple) and self.clear is False:
-            self.write()
-            self.clear = True
-            self.indentation += 1
-            self(value)
-            self.indentation -= 1
-        else:
-            for part in value:
-                self(part)
+        append = self.fragments.append
+        indentation_string = self.indentation_string
+        indentation = self.indentation
+        clear = self.clear
+
+        # A line is mapped to the first node with a line number that
+        # is entered on it, or else to the node it was written in.
+        lines = self.lines
+        line = self.line
+        lineno = self.lineno
+        pending = self.pending
+
+        # The stack holds the iterators of the enclosing values; a
+        # ``None`` entry above an iterator marks an indented block, and
+        # a line number the one to return to at the end of a node.
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        iterator = iter((value,))
+        try:
+            while True:
+                for value in iterator:
+                    if value is None:
+                        if clear is False:
+                            append('\n')
+                            clear = True
+                            if lines is not None:
+                                if pending:
+                                    mark_line(lines, line, lineno)
+                                line += 1
+                                pending = True
+                    elif value.__class__ is prioritized:
+                        push(iterator)
+                        iterator = value.generator
+                        if lines is not None and value.lineno is not None:
+                            push(lineno)
+                            lineno = value.lineno
+                            if pending:
+                                mark_line(lines, line, lineno)
+                                pending = False
+                        break
+                    elif isinstance(value, basestring):
+                        if clear is True:
+                            append(indentation_string * indentation)
+                            clear = False
+                        append(value)
+                    elif isinstance(value, tuple) and clear is False:
+                        append('\n')
+                        clear = True
+                        if lines is not None:
+                            if pending:
+                                mark_line(lines, line, lineno)
+                            line += 1
+                            pending = True
+                        indentation += 1
+                        push(iterator)
+                        push(None)
+                        iterator = iter(value)
+                        break
+                    else:
+                        push(iterator)
+                        iterator = iter(value)
+                        break
+                else:
+                    if not stack:
+                        break
+                    iterator = pop()
+                    if iterator is None:
+                        indentation -= 1
+                        iterator = pop()
+                    elif iterator.__class__ is int:
+                        lineno = iterator
+                        iterator = pop()
+        finally:
+            self.clear = clear
+            self.indentation = indentation
+            self.line = line
+            self.lineno = lineno
+            self.pending = pending
 
     def write(self, text=None):
         if text or self.clear == False:
             self.out(text)
-            self.stream.write('\n')
+            self.fragments.append('\n')
         self.clear = True
-    
+
     def out(self, text):
         if self.clear is True:
-            indentation = self.indentation_string * self.indentation
-            self.stream.write(indentation)
+            self.fragments.append(self.indentation_string * self.indentation)
             self.clear = False
-        self.stream.write(text or "")
+        self.fragments.append(text or "")
 
     def getvalue(self):
-        return self.stream.getvalue()
-    
+        return "".join(self.fragments)
+
+    def getsourcemap(self):
+        """Returns a tuple of ``(line, lineno)`` pairs, in order of
+        ``line``: the lines of code from ``line`` up to the next pair
+        were written for nodes at line ``lineno`` of the original
+        source, or 0 where that is not known."""
+
+        lines = list(self.lines)
+        if self.pending and self.clear is False:
+            mark_line(lines, self.line, self.lineno)
+        return tuple(lines)
+
+# Maps each visitor class to its table of visit methods, by node class.
+_dispatch_tables = {}
+
 class ASTVisitor(object):
     def __init__(self, tree):
         self.tree = tree
-
-    def __call__(self):
-        stream = CodeStream()
-        stream(self.visit(self.tree))            
+        cls = self.__class__
+        try:
+            self._dispatch = _dispatch_tables[cls]
+        except KeyError:
+            self._dispatch = _dispatch_tables[cls] = {}
+
+    def __call__(self, source_map=False):
+        stream = CodeStream(source_map=source_map)
+        stream(self.visit(self.tree))
+        if source_map:
+            return stream.getvalue(), stream.getsourcemap()
         return stream.getvalue()
-        
+
     def visit(self, node):
+        try:
+            func = self._dispatch[node.__class__]
+        except KeyError:
+            func = self._lookup(node)
+
+        gen = func(self, node)
+
+        if gen.__class__ is prioritized:
+            gen.lineno = node.lineno
+            return gen
+
+        return prioritized(gen, 0, node.lineno)
+
+    def _lookup(self, node):
+        # Finds the visit method for the class of node, the first time
+        # that one is seen.
         name = node.__class__.__name__
 
         try:
-            func = getattr(self, 'visit%s' % name)
+            method = getattr(self.__class__, 'visit%s' % name)
         except AttributeError:
             raise NotImplementedError(
                 "Unable to visit `%s`." % repr(node))
 
-        gen = func(node)
-
-        if isinstance(gen, prioritized):
-            return gen
-
-        return prioritized(gen, 0)
+        func = self._dispatch[node.__class__] = method.im_func
+        return func
 
     def visitModule(self, node):
         if node.doc is not None: